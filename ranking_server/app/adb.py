@@ -0,0 +1,142 @@
+# app/adb.py
+import re
+import time
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
+
+from .db import Q_REPORT_JOB, Q_REPORT_ROWS
+from .startup import lazy_import
+from .extractors import EXTRACTOR_VERSION
+from . import metrics
+from .config import DB_DSN, ADB_POOL_MIN, ADB_POOL_MAX, DB_POOL_TIMEOUT, FETCH_ITERSIZE, REPORT_CHUNK_ROWS
+
+# asyncpg pool for queries issued straight from the event loop (report header and rows, cache
+# maintenance, health pings); the ranking pipeline keeps using the psycopg2 pool in app/db.py
+
+_pool = None
+_pool_lock: Optional[asyncio.Lock] = None
+
+
+def _pg(sql: str) -> str:
+    """psycopg2-style %s placeholders -> asyncpg's $1, $2, ..."""
+    counter = iter(range(1, sql.count("%s") + 1))
+    return re.sub(r"%s", lambda _: f"${next(counter)}", sql)
+
+
+_A_REPORT_JOB = _pg(Q_REPORT_JOB)
+_A_REPORT_ROWS = _pg(Q_REPORT_ROWS)
+
+
+async def get_pool():
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            asyncpg = lazy_import("asyncpg")
+            _pool = await asyncpg.create_pool(DB_DSN, min_size=ADB_POOL_MIN, max_size=ADB_POOL_MAX,
+                                              timeout=DB_POOL_TIMEOUT)
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+
+
+def pool_stats() -> Dict:
+    if _pool is None:
+        return {"open": False, "min": ADB_POOL_MIN, "max": ADB_POOL_MAX}
+    size, idle = _pool.get_size(), _pool.get_idle_size()
+    return {"open": True, "min": ADB_POOL_MIN, "max": ADB_POOL_MAX, "size": size, "idle": idle,
+            "in_use": size - idle}
+
+
+async def ping(timeout: float) -> Dict:
+    """Round-trip a SELECT 1 within `timeout` seconds; never raises."""
+    started = time.perf_counter()
+    try:
+        async def probe():
+            pool = await get_pool()
+            return await pool.fetchval("SELECT 1")
+
+        await asyncio.wait_for(probe(), timeout)
+        return {"ok": True, "ms": round((time.perf_counter() - started) * 1000, 1)}
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": f"no reply within {timeout}s"}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+async def fetch_report_job(job_id: int) -> Optional[Dict]:
+    """Job header plus the id/time of its latest ranking run and its report fingerprint."""
+    pool = await get_pool()
+    with metrics.stage("db_fetch"):
+        row = await pool.fetchrow(_A_REPORT_JOB, job_id)
+    return dict(row) if row else None
+
+
+async def fetch_employer_job_ids(employer_id: int, job_ids: Optional[List[int]] = None) -> List[int]:
+    """Ids of the employer's jobs (only those in `job_ids` when given), ascending."""
+    pool = await get_pool()
+    with metrics.stage("db_fetch"):
+        rows = await pool.fetch(
+            """
+            SELECT job_id FROM job_description
+            WHERE employer_id = $1 AND ($2::int[] IS NULL OR job_id = ANY($2::int[]))
+            ORDER BY job_id
+            """,
+            employer_id, job_ids,
+        )
+    return [r["job_id"] for r in rows]
+
+
+async def fetch_ranked_application(job_id: int, job_seeker_id: int) -> Optional[Dict]:
+    """Persisted ranking columns of one application; None when it is missing or unranked."""
+    pool = await get_pool()
+    with metrics.stage("db_fetch"):
+        row = await pool.fetchrow(
+            """
+            SELECT ja.rank, ja.job_seeker_id, js.resume_name, ja.extract_status, ja.score,
+                   ja.cosine_score, ja.skill_ratio, ja.matched_skills, ja.ranking_run_id
+            FROM job_applied ja
+            JOIN job_seeker js ON js.job_seeker_id = ja.job_seeker_id
+            WHERE ja.job_id = $1 AND ja.job_seeker_id = $2 AND ja.rank > 0
+            """,
+            job_id, job_seeker_id,
+        )
+    return dict(row) if row else None
+
+
+async def iter_report_chunks(job_id: int, chunk_rows: int = REPORT_CHUNK_ROWS) -> AsyncIterator[List]:
+    """
+    The job's report rows as lists of up to `chunk_rows` rows, read through a cursor that
+    prefetches FETCH_ITERSIZE rows; the connection goes back to the pool when the
+    generator is closed (end of stream or client disconnect).
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction(readonly=True):
+            chunk = []
+            async for row in conn.cursor(_A_REPORT_ROWS, job_id, prefetch=FETCH_ITERSIZE):
+                chunk.append(row)
+                if len(chunk) >= chunk_rows:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+
+async def invalidate_text_cache(keep_version: Optional[str] = EXTRACTOR_VERSION) -> int:
+    """Delete cached texts produced by other extractor versions (all of them if keep_version is None)."""
+    pool = await get_pool()
+    if keep_version is None:
+        status = await pool.execute("DELETE FROM resume_text_cache")
+    else:
+        status = await pool.execute("DELETE FROM resume_text_cache WHERE extractor_version <> $1", keep_version)
+    # command tag, e.g. "DELETE 42"
+    return int(status.split()[-1])
@@ -16,11 +16,79 @@ if not DATABASE_URL:
 
 DB_DSN = DATABASE_URL
 
+# Connection pool
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))        # seconds to wait for a free connection
+DB_POOL_PING_AFTER = float(os.environ.get("DB_POOL_PING_AFTER", 30))  # ping connections idle longer than this
+
+# Async request path: asyncpg pool for queries made on the event loop, health-check ping budget (seconds)
+ADB_POOL_MIN = int(os.environ.get("ADB_POOL_MIN", 1))
+ADB_POOL_MAX = int(os.environ.get("ADB_POOL_MAX", 10))
+HEALTH_DB_TIMEOUT = float(os.environ.get("HEALTH_DB_TIMEOUT", 1.0))
+
+# CPU-bound request work (scoring, rendering) runs on its own executor: at most CPU_WORKERS at once,
+# CPU_QUEUE_DEPTH more may wait before requests get 429; disconnects are noticed within DISCONNECT_POLL_SECONDS
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", min(4, os.cpu_count() or 1)))
+CPU_QUEUE_DEPTH = int(os.environ.get("CPU_QUEUE_DEPTH", 32))
+DISCONNECT_POLL_SECONDS = float(os.environ.get("DISCONNECT_POLL_SECONDS", 0.5))
+
+# Streaming applicant fetch: rows (and resume blobs) are pulled FETCH_ITERSIZE at a time
+FETCH_STREAMING = os.environ.get("FETCH_STREAMING", "1") == "1"
+FETCH_ITERSIZE = int(os.environ.get("FETCH_ITERSIZE", 200))
+
+# Instrumentation: /metrics (Prometheus text format) and Server-Timing headers; 0 turns every probe into a no-op
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+
 # TF-IDF / Ranking tuning
 TFIDF_MAX_FEATURES = int(os.environ.get("TFIDF_MAX_FEATURES", 5000))
 TFIDF_NGRAM = (1, 2)
 SKILL_BOOST_WEIGHT = float(os.environ.get("SKILL_BOOST_WEIGHT", 0.20))
 TOP_K = int(os.environ.get("TOP_K", 10))
+# Incremental scoring refits the whole job once added applications exceed this share of the fitted corpus
+INCREMENTAL_REFIT_RATIO = float(os.environ.get("INCREMENTAL_REFIT_RATIO", 0.2))
+
+# Startup: NLTK data must be present locally unless auto-download is enabled; warm-up
+# preloads WordNet, heavy modules and the lemma cache before /health reports ok
+NLTK_AUTO_DOWNLOAD = os.environ.get("NLTK_AUTO_DOWNLOAD", "0") == "1"
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "1") == "1"
+WARMUP_SEED_JDS = int(os.environ.get("WARMUP_SEED_JDS", 500))
+
+# Preprocessing: bounded token -> lemma memo shared by all requests
+LEMMA_CACHE_SIZE = int(os.environ.get("LEMMA_CACHE_SIZE", 200000))
+
+# Derived JD skills + compiled matchers kept per distinct JD text
+SKILL_ARTIFACT_CACHE_SIZE = int(os.environ.get("SKILL_ARTIFACT_CACHE_SIZE", 256))
+
+# Resume extraction: PDF/DOCX files are parsed one at a time in killable sandbox worker processes
+# (EXTRACT_WORKERS of them), each file within EXTRACT_TIMEOUT_SECONDS and EXTRACT_MEMORY_MB of address
+# space; at most EXTRACT_MAX_PAGES pages / EXTRACT_MAX_CHARS characters are kept per resume.
+# EXTRACT_SANDBOX=0 parses in-process (caps still apply, no timeout or memory limit).
+# These replace EXTRACT_CHUNKSIZE / EXTRACT_PARALLEL_MIN: sandbox workers take one file at a time (a
+# chunk would share one deadline) and even a single file is sandboxed, since one file can stall a request.
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", os.cpu_count() or 1))
+EXTRACT_SANDBOX = os.environ.get("EXTRACT_SANDBOX", "1") == "1"
+EXTRACT_TIMEOUT_SECONDS = float(os.environ.get("EXTRACT_TIMEOUT_SECONDS", 15))
+EXTRACT_MEMORY_MB = int(os.environ.get("EXTRACT_MEMORY_MB", 1024))
+EXTRACT_MAX_PAGES = int(os.environ.get("EXTRACT_MAX_PAGES", 20))
+EXTRACT_MAX_CHARS = int(os.environ.get("EXTRACT_MAX_CHARS", 100000))
+
+# Report exports: rows per streamed chunk / Parquet row group, XLSX bytes kept in memory before spilling to disk
+REPORT_CHUNK_ROWS = int(os.environ.get("REPORT_CHUNK_ROWS", 500))
+REPORT_SPOOL_BYTES = int(os.environ.get("REPORT_SPOOL_BYTES", 8 * 1024 * 1024))
+# Rendered HTML/XLSX reports kept in memory (LRU, total bytes) and the largest single body worth keeping
+REPORT_CACHE_BYTES = int(os.environ.get("REPORT_CACHE_BYTES", 64 * 1024 * 1024))
+REPORT_CACHE_MAX_ENTRY = int(os.environ.get("REPORT_CACHE_MAX_ENTRY", 16 * 1024 * 1024))
+
+# Background ranking tasks: concurrent pipelines, extra queued jobs, finished tasks remembered
+RANK_TASK_WORKERS = int(os.environ.get("RANK_TASK_WORKERS", 2))
+RANK_TASK_QUEUE_DEPTH = int(os.environ.get("RANK_TASK_QUEUE_DEPTH", 16))
+RANK_TASK_HISTORY = int(os.environ.get("RANK_TASK_HISTORY", 200))
+
+# Job recommendations: hashed JD index (features), refresh interval, candidates re-ranked by skill overlap
+JOB_INDEX_FEATURES = int(os.environ.get("JOB_INDEX_FEATURES", 2 ** 20))
+JOB_INDEX_REFRESH_SECONDS = float(os.environ.get("JOB_INDEX_REFRESH_SECONDS", 60))
+JOB_INDEX_SHORTLIST = int(os.environ.get("JOB_INDEX_SHORTLIST", 50))
 
 # CORS / Frontend
 FRONTEND_ORIGIN = os.environ.get("FRONTEND_ORIGIN", "http://localhost:3000")
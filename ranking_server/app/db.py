@@ -1,58 +1,645 @@
 # app/db.py
+import time
+import threading
+from contextlib import contextmanager
 import psycopg2
 import psycopg2.extras
-from typing import List
-from .config import DB_DSN
-
-def get_db_conn():
-    return psycopg2.connect(DB_DSN)
-
-def fetch_job_and_applicants(job_id: int):
-    q_job = "SELECT job_title, job_description, job_role FROM job_description WHERE job_id = %s"
-
-    q_apps = """
-        SELECT 
-            ja.id AS application_id,
-            ja.job_seeker_id,
-            js.name,
-            js.degree,
-            js.college,
-            js.graduation_year,
-            js.resume_name,
-            js.resume_data,
-            ja.rank
-        FROM job_applied ja
-        JOIN job_seeker js 
-            ON ja.job_seeker_id = js.job_seeker_id
+import psycopg2.pool
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from typing import TYPE_CHECKING, Dict, List, Tuple, Optional
+from .config import DB_DSN, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, DB_POOL_PING_AFTER, FETCH_ITERSIZE
+from .extractors import EXTRACTOR_VERSION
+from .startup import lazy_import
+from . import metrics
+
+if TYPE_CHECKING:
+    from .ranker import RankedResults
+
+RANK_LOCK_NAMESPACE = 4201  # first key of pg_advisory_xact_lock(ns, job_id) for rank writes
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_last_used = {}  # id(conn) -> monotonic time it was returned to the pool
+_stats = {"checkouts": 0, "in_use": 0, "peak_in_use": 0, "waits": 0,
+          "wait_seconds": 0.0, "timeouts": 0, "health_check_failures": 0}
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = psycopg2.pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DB_DSN)
+        return _pool
+
+def _healthy(conn) -> bool:
+    if conn.closed:
+        return False
+    last_used = _last_used.get(id(conn))
+    if last_used is None or time.monotonic() - last_used < DB_POOL_PING_AFTER:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def _checkout(pool):
+    # a stale connection is discarded and replaced; a second failure is a real outage
+    for _ in range(2):
+        conn = pool.getconn()
+        if _healthy(conn):
+            return conn
+        with _pool_lock:
+            _stats["health_check_failures"] += 1
+        _last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+    return pool.getconn()
+
+@contextmanager
+def db_conn(timeout: Optional[float] = None):
+    """
+    Check a connection out of the process-wide pool. Waits up to `timeout` seconds (default
+    DB_POOL_TIMEOUT; 0 = fail at once) when all DB_POOL_MAX connections are busy, then raises
+    PoolError; any open transaction is rolled back on return.
+    """
+    timeout = DB_POOL_TIMEOUT if timeout is None else timeout
+    started = time.monotonic()
+    if not _slots.acquire(blocking=False):
+        if not timeout:  # an opportunistic checkout, not a wait: keep it out of the wait stats
+            raise psycopg2.pool.PoolError("no database connection free")
+        with _pool_lock:
+            _stats["waits"] += 1
+        if not _slots.acquire(timeout=timeout):
+            with _pool_lock:
+                _stats["timeouts"] += 1
+            raise psycopg2.pool.PoolError(f"no database connection available after {timeout}s")
+    try:
+        pool = _get_pool()
+        conn = _checkout(pool)
+    except Exception:
+        _slots.release()
+        raise
+    with _pool_lock:
+        _stats["checkouts"] += 1
+        _stats["wait_seconds"] += time.monotonic() - started
+        _stats["in_use"] += 1
+        _stats["peak_in_use"] = max(_stats["peak_in_use"], _stats["in_use"])
+    broken = False
+    try:
+        yield conn
+    except psycopg2.InterfaceError:
+        broken = True
+        raise
+    finally:
+        try:
+            if not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            broken = True
+        broken = broken or bool(conn.closed)
+        if broken:
+            _last_used.pop(id(conn), None)
+        else:
+            _last_used[id(conn)] = time.monotonic()
+        pool.putconn(conn, close=broken)
+        with _pool_lock:
+            _stats["in_use"] -= 1
+        _slots.release()
+
+@contextmanager
+def borrow_conn(conn=None):
+    """Use the caller's connection when given, otherwise check one out for the block."""
+    if conn is not None:
+        yield conn
+    else:
+        with db_conn() as c:
+            yield c
+
+@contextmanager
+def rank_lock(conn, job_ids: List[int]):
+    """
+    Hold the jobs' rank-write advisory locks on `conn` for the whole block, across commits, so a
+    read-modify-write of rankings and job_rank_state (load state, slot, count the addition) is atomic with
+    respect to other writers. The transaction-level locks save_rankings and slot_ranked_application
+    take on the same connection are re-entrant and granted immediately.
+    """
+    ids = sorted(set(job_ids))
+    with conn.cursor() as cur:
+        for job_id in ids:
+            cur.execute("SELECT pg_advisory_lock(%s, %s)", (RANK_LOCK_NAMESPACE, job_id))
+    conn.commit()
+    try:
+        yield conn
+    finally:
+        try:
+            conn.rollback()
+            with conn.cursor() as cur:
+                for job_id in ids:
+                    cur.execute("SELECT pg_advisory_unlock(%s, %s)", (RANK_LOCK_NAMESPACE, job_id))
+            conn.commit()
+        except psycopg2.Error as e:
+            # a broken connection is discarded by the pool; its session locks go with it
+            print(f"[WARN] failed to release rank locks for jobs {ids}: {e}")
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+        _last_used.clear()
+
+def pool_stats() -> dict:
+    with _pool_lock:
+        stats = dict(_stats)
+    stats["min"] = DB_POOL_MIN
+    stats["max"] = DB_POOL_MAX
+    stats["saturation"] = stats["in_use"] / DB_POOL_MAX if DB_POOL_MAX else 0.0
+    return stats
+
+# resume_data is only returned when no cached text exists for the current extractor version
+_Q_APPLICANTS = """
+    SELECT 
+        ja.id AS application_id,
+        ja.job_seeker_id,
+        js.name,
+        js.degree,
+        js.college,
+        js.graduation_year,
+        js.resume_name,
+        js.resume_hash,
+        rtc.text AS cached_text,
+        rtc.extract_status AS cached_status,
+        CASE WHEN rtc.text IS NULL THEN js.resume_data END AS resume_data,
+        ja.rank
+    FROM job_applied ja
+    JOIN job_seeker js 
+        ON ja.job_seeker_id = js.job_seeker_id
+    LEFT JOIN resume_text_cache rtc
+        ON rtc.content_hash = js.resume_hash AND rtc.extractor_version = %s
+"""
+
+_Q_JOB = "SELECT job_title, job_description, job_role FROM job_description WHERE job_id = %s"
+
+def fetch_job_and_applicants(job_id: int, conn=None):
+    q_apps = _Q_APPLICANTS + """
         WHERE ja.job_id = %s
         ORDER BY ja.rank ASC NULLS LAST
     """
 
-    conn = get_db_conn()
-    try:
+    with borrow_conn(conn) as conn, metrics.stage("db_fetch"):
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(q_job, (job_id,))
+            cur.execute(_Q_JOB, (job_id,))
             job = cur.fetchone()
 
-            cur.execute(q_apps, (job_id,))
+            cur.execute(q_apps, (EXTRACTOR_VERSION, job_id))
             apps = cur.fetchall()
 
-    finally:
-        conn.close()
-
     return job, apps
 
 
-def update_ranks(job_id: int, ordered_job_seeker_ids: List[int]):
-    conn = get_db_conn()
-    try:
+def fetch_job(job_id: int, conn=None):
+    with borrow_conn(conn) as conn, metrics.stage("db_fetch"):
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(_Q_JOB, (job_id,))
+            return cur.fetchone()
+
+
+def iter_job_applicants(job_id: int, conn, itersize: int = FETCH_ITERSIZE):
+    """
+    Yield the job's applicant rows in batches of `itersize` from a server-side cursor,
+    so only one batch of resume blobs is held in memory at a time. The cursor lives in
+    the connection's current transaction: do not commit on `conn` until exhausted.
+    """
+    q_apps = _Q_APPLICANTS + """
+        WHERE ja.job_id = %s
+        ORDER BY ja.rank ASC NULLS LAST, ja.id
+    """
+    with conn.cursor(name=f"applicants_{job_id}", cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.itersize = itersize
+        with metrics.stage("db_fetch"):
+            cur.execute(q_apps, (EXTRACTOR_VERSION, job_id))
+        while True:
+            with metrics.stage("db_fetch"):
+                batch = cur.fetchmany(itersize)
+            if not batch:
+                break
+            yield batch
+
+
+def fetch_employer_jobs(employer_id: int, job_ids: Optional[List[int]] = None, conn=None) -> List[dict]:
+    """The employer's jobs (only those in `job_ids` when given), by job_id."""
+    with borrow_conn(conn) as conn, metrics.stage("db_fetch"):
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT job_id, job_title, job_description, job_role
+                FROM job_description
+                WHERE employer_id = %s AND (%s::int[] IS NULL OR job_id = ANY(%s::int[]))
+                ORDER BY job_id
+                """,
+                (employer_id, job_ids, job_ids),
+            )
+            return cur.fetchall()
+
+
+def fetch_job_applications(job_ids: List[int], conn=None) -> List[dict]:
+    """(job_id, job_seeker_id) of every application to the jobs, in iter_job_applicants order per job."""
+    with borrow_conn(conn) as conn, metrics.stage("db_fetch"):
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT ja.job_id, ja.job_seeker_id
+                FROM job_applied ja
+                JOIN job_seeker js ON ja.job_seeker_id = js.job_seeker_id
+                WHERE ja.job_id = ANY(%s::int[])
+                ORDER BY ja.job_id, ja.rank ASC NULLS LAST, ja.id
+                """,
+                (job_ids,),
+            )
+            return cur.fetchall()
+
+
+def iter_applicant_resumes(job_ids: List[int], conn, itersize: int = FETCH_ITERSIZE):
+    """
+    Like iter_job_applicants, but one row per distinct job seeker who applied to any of the
+    jobs, so a resume shared by several applications is fetched (and extracted) once.
+    """
+    q_seekers = """
+        SELECT
+            js.job_seeker_id,
+            js.resume_name,
+            js.resume_hash,
+            rtc.text AS cached_text,
+            rtc.extract_status AS cached_status,
+            CASE WHEN rtc.text IS NULL THEN js.resume_data END AS resume_data
+        FROM job_seeker js
+        LEFT JOIN resume_text_cache rtc
+            ON rtc.content_hash = js.resume_hash AND rtc.extractor_version = %s
+        WHERE js.job_seeker_id IN (SELECT job_seeker_id FROM job_applied WHERE job_id = ANY(%s::int[]))
+        ORDER BY js.job_seeker_id
+    """
+    with conn.cursor(name="applicant_resumes", cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.itersize = itersize
+        with metrics.stage("db_fetch"):
+            cur.execute(q_seekers, (EXTRACTOR_VERSION, job_ids))
+        while True:
+            with metrics.stage("db_fetch"):
+                batch = cur.fetchmany(itersize)
+            if not batch:
+                break
+            yield batch
+
+
+def fetch_job_texts(limit: int, conn=None) -> List[str]:
+    """Most recent job descriptions (used to warm the lemma cache)."""
+    with borrow_conn(conn) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT job_description FROM job_description WHERE job_description IS NOT NULL "
+                "ORDER BY job_id DESC LIMIT %s",
+                (limit,),
+            )
+            return [r[0] for r in cur.fetchall()]
+
+
+def count_applicants(job_id: int, conn=None) -> int:
+    with borrow_conn(conn) as conn, metrics.stage("db_fetch"):
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM job_applied WHERE job_id = %s", (job_id,))
+            return cur.fetchone()[0]
+
+
+def fetch_job_and_application(job_id: int, job_seeker_id: int, conn=None):
+    """Job header plus the single application of one seeker (None when they have not applied)."""
+    q_app = _Q_APPLICANTS + """
+        WHERE ja.job_id = %s AND ja.job_seeker_id = %s
+        ORDER BY ja.id
+        LIMIT 1
+    """
+
+    with borrow_conn(conn) as conn, metrics.stage("db_fetch"):
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(_Q_JOB, (job_id,))
+            job = cur.fetchone()
+
+            cur.execute(q_app, (EXTRACTOR_VERSION, job_id, job_seeker_id))
+            app = cur.fetchone()
+
+    return job, app
+
+
+def fetch_seeker_resume(job_seeker_id: int, conn=None) -> Optional[dict]:
+    """A job seeker's resume row, shaped like _Q_APPLICANTS rows (cached text or the blob)."""
+    with borrow_conn(conn) as conn, metrics.stage("db_fetch"):
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT
+                    js.job_seeker_id,
+                    js.resume_name,
+                    js.resume_hash,
+                    rtc.text AS cached_text,
+                    rtc.extract_status AS cached_status,
+                    CASE WHEN rtc.text IS NULL THEN js.resume_data END AS resume_data
+                FROM job_seeker js
+                LEFT JOIN resume_text_cache rtc
+                    ON rtc.content_hash = js.resume_hash AND rtc.extractor_version = %s
+                WHERE js.job_seeker_id = %s
+                """,
+                (EXTRACTOR_VERSION, job_seeker_id),
+            )
+            return cur.fetchone()
+
+
+def fetch_applied_job_ids(job_seeker_id: int, conn=None) -> List[int]:
+    with borrow_conn(conn) as conn, metrics.stage("db_fetch"):
         with conn.cursor() as cur:
-            cur.execute("UPDATE job_applied SET rank = 0 WHERE job_id = %s", (job_id,))
-            for idx, jsid in enumerate(ordered_job_seeker_ids, start=1):
+            cur.execute("SELECT DISTINCT job_id FROM job_applied WHERE job_seeker_id = %s", (job_seeker_id,))
+            return [r[0] for r in cur.fetchall()]
+
+
+# text a job is indexed by for recommendations; md5 of it detects added/edited jobs
+_JOB_INDEX_TEXT = "concat_ws(E'\\n', job_title, job_role, job_description)"
+
+def fetch_job_fingerprints(job_ids: Optional[List[int]] = None, conn=None) -> Dict[int, str]:
+    """job_id -> md5 of the job's indexed text, for all jobs or only `job_ids`."""
+    with borrow_conn(conn) as conn, metrics.stage("db_fetch"):
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT job_id, md5({_JOB_INDEX_TEXT}) FROM job_description
+                WHERE %s::int[] IS NULL OR job_id = ANY(%s::int[])
+                """,
+                (job_ids, job_ids),
+            )
+            return dict(cur.fetchall())
+
+
+def fetch_jobs_by_id(job_ids: List[int], conn=None) -> List[dict]:
+    """Job headers plus indexed text and its md5 for the given ids."""
+    with borrow_conn(conn) as conn, metrics.stage("db_fetch"):
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                f"""
+                SELECT job_id, job_title, job_role, job_description,
+                       {_JOB_INDEX_TEXT} AS index_text, md5({_JOB_INDEX_TEXT}) AS index_hash
+                FROM job_description
+                WHERE job_id = ANY(%s::int[])
+                """,
+                (job_ids,),
+            )
+            return cur.fetchall()
+
+
+def store_cached_texts(entries: List[Tuple[str, str, str]], conn=None):
+    """Insert (content_hash, text, extract_status) entries for the current extractor version."""
+    if not entries:
+        return
+    with borrow_conn(conn) as conn, metrics.stage("db_cache_write"):
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
+                """
+                INSERT INTO resume_text_cache (content_hash, extractor_version, text, extract_status)
+                VALUES %s
+                ON CONFLICT (content_hash, extractor_version) DO NOTHING
+                """,
+                [(h, EXTRACTOR_VERSION, t, status) for h, t, status in entries],
+            )
+        conn.commit()
+
+
+def save_ranking(job_id: int, ranked: "RankedResults", conn=None) -> dict:
+    """
+    Record a ranking run and persist rank, score, cosine_score, skill_ratio, matched_skills
+    and extract_status for every application of the job in one statement.
+    Applicants missing from `ranked` get rank 0 and no scores. Rows whose values did not
+    change are skipped, so an application's ranking_run_id is the run that last changed it.
+    """
+    return save_rankings({job_id: ranked}, conn=conn)[job_id]
+
+
+def save_rankings(ranked_by_job: Dict[int, "RankedResults"], conn=None) -> Dict[int, dict]:
+    """
+    save_ranking for several jobs in one transaction: one ranking_run per job and a single
+    UPDATE over all of their applications. Returns {job_id: run}.
+    """
+    np = lazy_import("numpy")
+    job_ids = sorted(ranked_by_job)
+    counts = []
+    cols = {"job_id": [], "job_seeker_id": [], "rank": [], "score": [], "cosine_score": [], "skill_ratio": []}
+    skills, statuses = [], []
+    for job_id in job_ids:
+        ranked = ranked_by_job[job_id]
+        # a seeker listed twice keeps its first (best) rank
+        _, first = np.unique(ranked.job_seeker_ids, return_index=True)
+        rows = np.sort(first)
+        counts.append(len(rows))
+        cols["job_id"].append(np.full(len(rows), job_id, dtype=np.int64))
+        cols["job_seeker_id"].append(ranked.job_seeker_ids[rows])
+        cols["rank"].append(rows + 1)
+        cols["score"].append(ranked.scores[rows])
+        cols["cosine_score"].append(ranked.cosine_scores[rows])
+        cols["skill_ratio"].append(ranked.skill_ratios[rows])
+        # skills are preprocessed tokens (letters and spaces), so ',' is a safe separator
+        skills.extend(",".join(ranked.matched_skills(i)) for i in rows.tolist())
+        statuses.extend(ranked.extract_statuses[i] for i in rows.tolist())
+    job_col, seeker_ids, ranks, scores, cosines, ratios = (
+        np.concatenate(c).tolist() if c else [] for c in cols.values())
+
+    with borrow_conn(conn) as conn, metrics.stage("db_persist"):
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            # serialize concurrent rank writes for the same job (across server processes too);
+            # always in job_id order so overlapping batches cannot deadlock
+            for job_id in job_ids:
+                cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", (RANK_LOCK_NAMESPACE, job_id))
+            cur.execute(
+                """
+                INSERT INTO ranking_run (job_id, applicant_count)
+                SELECT * FROM unnest(%s::int[], %s::int[])
+                RETURNING run_id, job_id, created_at
+                """,
+                (job_ids, counts),
+            )
+            runs = {r["job_id"]: {"run_id": r["run_id"], "created_at": r["created_at"]} for r in cur.fetchall()}
+            cur.execute(
+                """
+                UPDATE job_applied ja
+                SET rank = COALESCE(v.rank, 0),
+                    score = v.score,
+                    cosine_score = v.cosine_score,
+                    skill_ratio = v.skill_ratio,
+                    matched_skills = string_to_array(NULLIF(v.skills, ''), ','),
+                    extract_status = v.extract_status,
+                    ranking_run_id = r.run_id,
+                    ranked_at = r.created_at
+                FROM job_applied cur
+                JOIN unnest(%s::int[], %s::int[], %s::timestamp[]) AS r(job_id, run_id, created_at)
+                    ON r.job_id = cur.job_id
+                LEFT JOIN unnest(%s::int[], %s::int[], %s::int[], %s::float8[], %s::float8[], %s::float8[], %s::text[],
+                                 %s::text[])
+                    AS v(job_id, job_seeker_id, rank, score, cosine_score, skill_ratio, skills, extract_status)
+                    ON v.job_id = cur.job_id AND v.job_seeker_id = cur.job_seeker_id
+                WHERE cur.id = ja.id
+                  -- rows the run did not change keep their run id and are not rewritten
+                  AND (ja.rank, ja.score, ja.cosine_score, ja.skill_ratio, ja.matched_skills, ja.extract_status)
+                      IS DISTINCT FROM
+                      (COALESCE(v.rank, 0), v.score, v.cosine_score, v.skill_ratio,
+                       string_to_array(NULLIF(v.skills, ''), ','), v.extract_status)
+                """,
+                (job_ids, [runs[j]["run_id"] for j in job_ids], [runs[j]["created_at"] for j in job_ids],
+                 job_col, seeker_ids, ranks, scores, cosines, ratios, skills, statuses),
+            )
+        conn.commit()
+    return runs
+
+
+# report queries, public because app/adb.py runs them: the job header with the id/time of its latest ranking run, and
+# the persisted ranking columns of every applicant (no resume blobs), ranked-first by rank, then score.
+# `fingerprint` changes whenever the report would: the JD text, the latest ranking run, and each
+# application's row versions (xmin moves on every update of job_applied/job_seeker, so new
+# applications, persisted scores, resume uploads and profile edits all count) -- without
+# reading a single resume blob
+Q_REPORT_JOB = """
+    SELECT jd.job_title, jd.job_description, jd.job_role,
+           rr.run_id AS ranking_run_id, rr.created_at AS ranked_at,
+           md5(concat_ws('|', md5(concat_ws(E'\\n', jd.job_title, jd.job_role, jd.job_description)),
+                         rr.run_id, apps.versions)) AS fingerprint
+    FROM job_description jd
+    LEFT JOIN LATERAL (
+        SELECT run_id, created_at FROM ranking_run
+        WHERE job_id = jd.job_id ORDER BY run_id DESC LIMIT 1
+    ) rr ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT md5(string_agg(concat_ws(':', ja.job_seeker_id, ja.xmin, js.xmin), ',' ORDER BY ja.job_seeker_id))
+               AS versions
+        FROM job_applied ja
+        JOIN job_seeker js ON js.job_seeker_id = ja.job_seeker_id
+        WHERE ja.job_id = jd.job_id
+    ) apps ON TRUE
+    WHERE jd.job_id = %s
+"""
+
+Q_REPORT_ROWS = """
+    SELECT
+        ja.rank,
+        ja.job_seeker_id,
+        js.name,
+        js.degree,
+        js.college,
+        js.graduation_year,
+        js.resume_name,
+        ja.score,
+        ja.cosine_score,
+        ja.skill_ratio,
+        ja.matched_skills,
+        ja.extract_status,
+        ja.ranking_run_id
+    FROM job_applied ja
+    JOIN job_seeker js
+        ON ja.job_seeker_id = js.job_seeker_id
+    WHERE ja.job_id = %s
+    ORDER BY (CASE WHEN ja.rank > 0 THEN ja.rank END) ASC NULLS LAST, ja.score DESC NULLS LAST
+"""
+
+
+def load_rank_state(job_id: int, conn=None) -> Optional[dict]:
+    with borrow_conn(conn) as conn:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT job_id, ranking_run_id, state, fitted_count, added_since_fit, updated_at
+                FROM job_rank_state WHERE job_id = %s
+                """,
+                (job_id,),
+            )
+            return cur.fetchone()
+
+
+def save_rank_state(job_id: int, ranking_run_id: int, state: bytes,
+                    fitted_count: int, added_since_fit: int, conn=None):
+    with borrow_conn(conn) as conn, metrics.stage("db_persist"):
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO job_rank_state (job_id, ranking_run_id, state, fitted_count, added_since_fit, updated_at)
+                VALUES (%s, %s, %s, %s, %s, NOW())
+                ON CONFLICT (job_id) DO UPDATE
+                SET ranking_run_id = EXCLUDED.ranking_run_id,
+                    state = EXCLUDED.state,
+                    fitted_count = EXCLUDED.fitted_count,
+                    added_since_fit = EXCLUDED.added_since_fit,
+                    updated_at = EXCLUDED.updated_at
+                """,
+                (job_id, ranking_run_id, psycopg2.Binary(state), fitted_count, added_since_fit),
+            )
+        conn.commit()
+
+
+def count_rank_state_addition(job_id: int, conn=None):
+    """Record one application scored incrementally on top of the job's last fit (added_since_fit + 1)."""
+    with borrow_conn(conn) as conn, metrics.stage("db_persist"):
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE job_rank_state
+                SET added_since_fit = added_since_fit + 1, updated_at = NOW()
+                WHERE job_id = %s
+                """,
+                (job_id,),
+            )
+        conn.commit()
+
+
+def slot_ranked_application(job_id: int, job_seeker_id: int, ranking_run_id: int, result: dict, conn=None) -> int:
+    """
+    Insert one freshly scored application into the job's existing order: rows ranked
+    below it move down by one and everything above keeps its rank. Returns the new rank.
+    """
+    score = float(result["score"])
+    cosine = float(result["cosine_score"])
+    with borrow_conn(conn) as conn, metrics.stage("db_persist"):
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", (RANK_LOCK_NAMESPACE, job_id))
+            # take this seeker out of the order first (re-scoring an already ranked application)
+            cur.execute(
+                "SELECT rank FROM job_applied WHERE job_id = %s AND job_seeker_id = %s FOR UPDATE",
+                (job_id, job_seeker_id),
+            )
+            old = cur.fetchone()
+            if old and old[0] and old[0] > 0:
                 cur.execute(
-                    "UPDATE job_applied SET rank = %s WHERE job_id = %s AND job_seeker_id = %s",
-                    (idx, job_id, jsid),
+                    "UPDATE job_applied SET rank = rank - 1 WHERE job_id = %s AND rank > %s",
+                    (job_id, old[0]),
                 )
+
+            cur.execute(
+                """
+                SELECT COUNT(*) FROM job_applied
+                WHERE job_id = %s AND job_seeker_id <> %s AND rank > 0
+                  AND (score > %s OR (score = %s AND cosine_score >= %s))
+                """,
+                (job_id, job_seeker_id, score, score, cosine),
+            )
+            new_rank = cur.fetchone()[0] + 1
+
+            cur.execute(
+                "UPDATE job_applied SET rank = rank + 1 WHERE job_id = %s AND job_seeker_id <> %s AND rank >= %s",
+                (job_id, job_seeker_id, new_rank),
+            )
+            cur.execute(
+                """
+                UPDATE job_applied
+                SET rank = %s, score = %s, cosine_score = %s, skill_ratio = %s,
+                    matched_skills = %s, extract_status = %s, ranking_run_id = %s, ranked_at = NOW()
+                WHERE job_id = %s AND job_seeker_id = %s
+                """,
+                (new_rank, score, cosine, float(result["skill_ratio"]),
+                 list(result.get("matched_skills") or []), result.get("extract_status"), ranking_run_id,
+                 job_id, job_seeker_id),
+            )
         conn.commit()
-    finally:
-        conn.close()
+    return new_rank
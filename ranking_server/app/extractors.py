@@ -1,62 +1,257 @@
 # app/extractors.py
+import io
+import zipfile
 from pathlib import Path
-import tempfile
-import docx
-from pdfminer.high_level import extract_text as pdf_extract_text
-from typing import Union
+import threading
+from typing import Dict, Union, List, Tuple, BinaryIO
+from .config import (EXTRACT_WORKERS, EXTRACT_SANDBOX, EXTRACT_TIMEOUT_SECONDS, EXTRACT_MEMORY_MB,
+                     EXTRACT_MAX_PAGES, EXTRACT_MAX_CHARS, METRICS_ENABLED)
+from .startup import lazy_import
+from .sandbox import SandboxPool, OK, TIMED_OUT, CRASHED
+from . import metrics
 
-def extract_text_from_pdf(path: Path) -> str:
-    try:
-        return pdf_extract_text(str(path)) or ""
-    except Exception as e:
-        print(f"[WARN] pdfminer failed on {path.name}: {e}")
-        return ""
+# Bump whenever extraction output can change so cached texts are re-extracted.
+EXTRACTOR_VERSION = "3"
 
-def extract_text_from_docx(path: Path) -> str:
-    try:
-        doc = docx.Document(str(path))
-        return "\n".join([p.text for p in doc.paragraphs if p.text])
-    except Exception as e:
-        print(f"[WARN] python-docx failed on {path.name}: {e}")
-        return ""
+# Extraction outcome of one resume, stored with its cached text and on job_applied
+EXTRACT_OK = "ok"
+EXTRACT_TRUNCATED = "truncated"      # page or character cap reached; the text is the first part
+EXTRACT_TIMED_OUT = "timed_out"      # parser killed after EXTRACT_TIMEOUT_SECONDS; no text
+EXTRACT_UNSUPPORTED = "unsupported"  # legacy .doc or a non-DOCX zip; no text
+EXTRACT_FAILED = "failed"            # parser error, memory limit or crashed worker; no text
+# outcomes that depend only on the file, so they may be cached; timeouts and failures can be
+# caused by a busy or unhealthy host and are retried on the next fetch instead
+CACHEABLE_OUTCOMES = (EXTRACT_OK, EXTRACT_TRUNCATED, EXTRACT_UNSUPPORTED)
+
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"
+OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+class MemoryViewReader(io.RawIOBase):
+    """Read-only, seekable file object over a buffer; reads copy straight into the caller's buffer."""
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        self._mv = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._mv) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._mv[self._pos:self._pos + n]
+        self._pos += n
+        return n
 
-def extract_text_from_txt(path: Path) -> str:
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._mv) + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if pos < 0:
+            raise ValueError(f"negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self._pos
+
+def open_buffer(data: Union[bytes, bytearray, memoryview]) -> io.BufferedReader:
+    return io.BufferedReader(MemoryViewReader(data))
+
+def sniff_format(data: memoryview) -> str:
+    head = data[:1024].tobytes()
+    if PDF_MAGIC in head:
+        return "pdf"
+    if head.startswith(ZIP_MAGIC):
+        return "docx" if _is_docx(data) else "zip"
+    if head.startswith(OLE_MAGIC):
+        return "doc"
+    return "txt"
+
+def _is_docx(data: memoryview) -> bool:
+    # only the zip's central directory is read
     try:
-        return path.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
-        return ""
+        with zipfile.ZipFile(open_buffer(data)) as zf:
+            return "word/document.xml" in zf.namelist()
+    except (zipfile.BadZipFile, ValueError, EOFError):
+        return False
 
-def extract_text(path: Path) -> str:
-    ext = path.suffix.lower()
-    if ext == ".pdf":
-        return extract_text_from_pdf(path)
-    elif ext in [".docx", ".doc"]:
-        return extract_text_from_docx(path)
-    elif ext == ".txt":
-        return extract_text_from_txt(path)
+def extract_text_from_pdf(name: str, fp: BinaryIO, max_pages: int = EXTRACT_MAX_PAGES,
+                          max_chars: int = EXTRACT_MAX_CHARS) -> Tuple[str, bool]:
+    """
+    pdfminer's extract_text, stopping after `max_pages` pages or once `max_chars` characters
+    were produced; returns (text, truncated). Pages past the cap are never parsed.
+    """
+    pdfinterp = lazy_import("pdfminer.pdfinterp")
+    PDFPage = lazy_import("pdfminer.pdfpage").PDFPage
+    TextConverter = lazy_import("pdfminer.converter").TextConverter
+    LAParams = lazy_import("pdfminer.layout").LAParams
+
+    with io.StringIO() as out:
+        rsrcmgr = pdfinterp.PDFResourceManager(caching=True)
+        interpreter = pdfinterp.PDFPageInterpreter(rsrcmgr, TextConverter(rsrcmgr, out, laparams=LAParams()))
+        for n, page in enumerate(PDFPage.get_pages(fp, caching=True)):
+            if n >= max_pages or out.tell() >= max_chars:
+                return out.getvalue()[:max_chars], True
+            interpreter.process_page(page)
+        text = out.getvalue()
+    return text[:max_chars], len(text) > max_chars
+
+def extract_text_from_docx(name: str, fp: BinaryIO, max_chars: int = EXTRACT_MAX_CHARS) -> Tuple[str, bool]:
+    doc = lazy_import("docx").Document(fp)
+    parts, size = [], 0
+    for p in doc.paragraphs:
+        if not p.text:
+            continue
+        parts.append(p.text)
+        size += len(p.text) + 1
+        if size > max_chars:
+            return "\n".join(parts)[:max_chars], True
+    return "\n".join(parts), False
+
+def extract_text_from_txt(name: str, data: memoryview, max_chars: int = EXTRACT_MAX_CHARS) -> Tuple[str, bool]:
+    # utf-8 needs at most 4 bytes per character, so decoding this prefix is enough
+    text = str(data[:4 * max_chars + 4], "utf-8", "ignore")
+    return text[:max_chars], len(text) > max_chars
+
+_READERS = {"pdf": (extract_text_from_pdf, "pdfminer"), "docx": (extract_text_from_docx, "python-docx")}
+
+def extract_document(name: str, data: Union[bytes, bytearray, memoryview]) -> Tuple[str, str, str]:
+    """(text, detected format, status), status being one of the EXTRACT_* outcomes."""
+    mv = memoryview(data).cast("B")
+    kind = sniff_format(mv)
+    if kind in ("doc", "zip"):
+        print(f"[WARN] unsupported resume format ({'legacy .doc' if kind == 'doc' else 'zip without a DOCX body'}): {name}")
+        return "", kind, EXTRACT_UNSUPPORTED
+    if kind == "txt":
+        text, truncated = extract_text_from_txt(name, mv)
     else:
-        return extract_text_from_txt(path)
+        reader, library = _READERS[kind]
+        try:
+            with open_buffer(mv) as fp:
+                text, truncated = reader(name, fp)
+        except Exception as e:
+            print(f"[WARN] {library} failed on {name}: {e}")
+            return "", kind, EXTRACT_FAILED
+    return text, kind, EXTRACT_TRUNCATED if truncated else EXTRACT_OK
 
-def save_bytes_to_tempfile(name: str, data: bytes) -> Path:
-    suffix = Path(name).suffix or ".pdf"
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    try:
-        tmp.write(data)
-        tmp.flush()
-        tmp.close()
-    except Exception:
-        tmp.close()
-        raise
-    return Path(tmp.name)
-
-def extract_text_from_bytes(name: str, data: Union[bytes, memoryview]) -> str:
-    bytes_data = data.tobytes() if isinstance(data, memoryview) else bytes(data)
-    tmp_path = save_bytes_to_tempfile(name, bytes_data)
+def extract_text_from_bytes(name: str, data: Union[bytes, bytearray, memoryview]) -> str:
+    """Extract text from an in-memory resume; the format comes from magic bytes, not the file name."""
+    return extract_document(name, data)[0]
+
+def extract_text(path: Path) -> str:
+    return extract_text_from_bytes(path.name, path.read_bytes())
+
+def _extract_isolated(item: Tuple[str, bytes]) -> Tuple[str, str, str]:
+    name, data = item
     try:
-        txt = extract_text(tmp_path)
-    finally:
+        return extract_document(name, data)
+    except Exception as e:
+        print(f"[WARN] failed extracting {name}: {e}")
+        return "", "unknown", EXTRACT_FAILED
+
+def _record(items: List[Tuple[str, Union[bytes, memoryview]]], results: List[Tuple[str, str, str]]):
+    for (_, data), (_, kind, status) in zip(items, results):
+        metrics.DOCUMENTS.inc(type=kind)
+        metrics.DOCUMENT_BYTES.inc(len(data), type=kind)
+        metrics.EXTRACTIONS.inc(status=status)
+        if status not in (EXTRACT_OK, EXTRACT_TRUNCATED):
+            metrics.EXTRACTION_FAILURES.inc(type=kind)
+
+def _load_parsers():
+    # runs once per sandbox worker, before it accepts files
+    for module in ("pdfminer.pdfinterp", "pdfminer.pdfpage", "pdfminer.converter", "pdfminer.layout", "docx"):
         try:
-            tmp_path.unlink()
-        except Exception:
-            pass
-    return txt
+            lazy_import(module)
+        except ImportError as e:
+            print(f"[WARN] sandbox worker cannot preload {module}: {e}")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> SandboxPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool(_extract_isolated, EXTRACT_WORKERS, EXTRACT_TIMEOUT_SECONDS,
+                                EXTRACT_MEMORY_MB * 1024 * 1024, warmup=_load_parsers)
+        return _pool
+
+def start_pool() -> int:
+    """Start the extraction workers ahead of the first batch; the number ready (0 without the sandbox)."""
+    return _get_pool().start() if EXTRACT_SANDBOX else 0
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+def sandbox_stats() -> Dict:
+    with _pool_lock:
+        pool = _pool
+    if pool is None:
+        return {"enabled": EXTRACT_SANDBOX, "started": False}
+    return dict(pool.stats(), enabled=EXTRACT_SANDBOX, started=True)
+
+def extract_batch(items: List[Tuple[str, Union[bytes, memoryview]]]) -> List[Tuple[str, str]]:
+    """
+    (text, status) for (name, data) pairs, in order. PDF and DOCX files are parsed in the
+    extraction sandbox, so a pathological file costs at most EXTRACT_TIMEOUT_SECONDS and
+    never affects the others.
+    """
+    with metrics.stage("extract"):
+        results = _extract_all(items)
+    if METRICS_ENABLED:
+        _record(items, results)
+    return [(text, status) for text, _, status in results]
+
+def _map_sandboxed(payload: List[Tuple[str, bytes]]) -> List[Tuple[str, object]]:
+    # a broken pool is replaced once; if that fails too the files are reported failed (and
+    # retried on the next fetch) -- they are never parsed in-process without the limits
+    for attempt in range(2):
+        try:
+            return _get_pool().map(payload)
+        except (OSError, RuntimeError) as e:
+            print(f"[WARN] extraction sandbox unavailable (attempt {attempt + 1}): {e}")
+            shutdown_pool()
+    return [(CRASHED, "extraction sandbox unavailable")] * len(payload)
+
+def _extract_all(items: List[Tuple[str, Union[bytes, memoryview]]]) -> List[Tuple[str, str, str]]:
+    results = [None] * len(items)
+    parsed = {}  # item index -> detected format, for files that need a parser
+    for i, (name, data) in enumerate(items):
+        kind = sniff_format(memoryview(data).cast("B"))
+        if EXTRACT_SANDBOX and kind in _READERS:
+            parsed[i] = kind
+        else:
+            # plain text and unsupported formats never reach a parser
+            results[i] = _extract_isolated((name, data))
+    if not parsed:
+        return results
+
+    # memoryviews cannot be pickled across the process boundary
+    payload = [(items[i][0], bytes(items[i][1])) for i in parsed]
+    outcomes = _map_sandboxed(payload)
+    for (i, kind), (name, _), (outcome, value) in zip(parsed.items(), payload, outcomes):
+        if outcome == OK:
+            results[i] = value
+        elif outcome == TIMED_OUT:
+            print(f"[WARN] extraction of {name} timed out after {EXTRACT_TIMEOUT_SECONDS}s")
+            metrics.SANDBOX_TIMEOUTS.inc()
+            results[i] = ("", kind, EXTRACT_TIMED_OUT)
+        else:
+            print(f"[WARN] extraction of {name} failed: {value}")
+            results[i] = ("", kind, EXTRACT_FAILED)
+    return results
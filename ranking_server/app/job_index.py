@@ -0,0 +1,256 @@
+# app/job_index.py
+import time
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from .db import borrow_conn, fetch_job_fingerprints, fetch_jobs_by_id, fetch_seeker_resume, fetch_applied_job_ids
+from .text_cache import resolve_resume_texts
+from .preprocess import preprocess_text
+from .skills import SkillArtifact, build_skill_artifact, get_skill_artifact
+from .ranker import score_resume
+from .startup import lazy_import
+from . import metrics
+from .config import (JOB_INDEX_FEATURES, JOB_INDEX_REFRESH_SECONDS, JOB_INDEX_SHORTLIST,
+                     SKILL_BOOST_WEIGHT, TFIDF_NGRAM)
+
+_FETCH_CHUNK = 1000
+# rows of replaced/removed jobs stay in the matrix (masked) until they exceed this share
+_COMPACT_RATIO = 0.25
+# appended rows are merged into the column-major matrix once there are this many of them,
+# or this share of the merged rows, whichever is larger
+_MERGE_MIN_ROWS = 1024
+_MERGE_RATIO = 0.1
+
+
+class JobIndex:
+    """
+    Sparse index of every job's text (title, role, description) for reverse matching.
+    Rows are L2-normalized hashed term counts, so adding or editing a job never refits
+    anything: new and changed jobs are appended, stale rows are masked and compacted away
+    now and then. Change detection compares md5 fingerprints computed in Postgres. Most
+    rows are stored column-major, so a query only reads the columns of its own terms;
+    recently appended rows wait in a small row-major block that is merged in batches.
+    Each job's derived skills are built when it is indexed, not per recommendation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()          # guards the published state below
+        self._refresh_lock = threading.Lock()  # one refresh at a time; held while one runs
+        self._matrix = None                    # csc, rows [0, merged): per-term posting columns
+        self._pending = None                   # csr, rows [merged, n): appended since the last merge
+        self._n = 0                            # rows in use
+        self._row_jobs: List[int] = []         # row -> job_id
+        self._live = None                      # bool array, row -> still current (capacity >= _n)
+        self._rows: Dict[int, int] = {}        # job_id -> current row
+        self._hashes: Dict[int, str] = {}      # job_id -> md5 of its indexed text
+        self._artifacts: Dict[int, SkillArtifact] = {}  # job_id -> skills derived from its JD
+        self._refreshed_at: Optional[float] = None
+        self._vectorizer = None
+
+    def _hasher(self):
+        if self._vectorizer is None:
+            HashingVectorizer = lazy_import("sklearn.feature_extraction.text").HashingVectorizer
+            self._vectorizer = HashingVectorizer(n_features=JOB_INDEX_FEATURES, ngram_range=TFIDF_NGRAM,
+                                                 alternate_sign=False, norm="l2")
+        return self._vectorizer
+
+    def refresh(self, job_ids: Optional[List[int]] = None, conn=None) -> Dict[str, int]:
+        """
+        Bring the index in line with job_description: all jobs, or only `job_ids`
+        (e.g. right after a job was created or edited). Returns counts of changes.
+        """
+        with self._refresh_lock:
+            return self._refresh(job_ids, conn)
+
+    def _refresh(self, job_ids: Optional[List[int]], conn) -> Dict[str, int]:
+        # caller holds _refresh_lock, so this is the only writer
+        with metrics.stage("job_index_refresh"), borrow_conn(conn) as conn:
+            fingerprints = fetch_job_fingerprints(job_ids, conn=conn)
+            scope = self._hashes.keys() if job_ids is None else set(job_ids) & self._hashes.keys()
+            removed = [j for j in scope if j not in fingerprints]
+            changed = [j for j, h in fingerprints.items() if self._hashes.get(j) != h]
+
+            ids, texts, hashes, artifacts = [], [], {}, {}
+            for i in range(0, len(changed), _FETCH_CHUNK):
+                for job in fetch_jobs_by_id(changed[i:i + _FETCH_CHUNK], conn=conn):
+                    ids.append(job["job_id"])
+                    texts.append(preprocess_text(job["index_text"] or ""))
+                    hashes[job["job_id"]] = job["index_hash"]
+                    artifacts[job["job_id"]] = build_skill_artifact(job["job_description"] or "", top_n=40)
+            added = sum(1 for j in ids if j not in self._hashes)
+            self._apply(ids, self._hasher().transform(texts) if ids else None, hashes, artifacts, removed)
+            if job_ids is None:
+                self._refreshed_at = time.time()
+        return {"added": added, "updated": len(ids) - added, "removed": len(removed)}
+
+    def _apply(self, job_ids: List[int], vecs, hashes: Dict[int, str], artifacts: Dict[int, SkillArtifact],
+               removed: List[int]):
+        # Only the refresh holding _refresh_lock writes, so it may read the state without _lock. Readers
+        # take a snapshot under _lock: arrays and matrices are replaced, never resized in place, and
+        # row_jobs only grows until a compaction swaps in a new list.
+        np = lazy_import("numpy")
+        sp = lazy_import("scipy.sparse")
+        n, live, pending = self._n, self._live, self._pending
+        added = 0 if vecs is None else vecs.shape[0]
+        if added:
+            pending = vecs.tocsr() if pending is None else sp.vstack([pending, vecs], format="csr")
+            if live is None or len(live) < n + added:
+                grown = np.zeros(max(2 * (n + added), 1024), dtype=bool)
+                if live is not None:
+                    grown[:n] = live[:n]
+                live = grown
+
+        with self._lock:
+            for job_id in list(job_ids) + removed:
+                row = self._rows.pop(job_id, None)
+                if row is not None:
+                    live[row] = False
+                self._hashes.pop(job_id, None)
+                self._artifacts.pop(job_id, None)
+            for job_id in job_ids:
+                self._rows[job_id] = len(self._row_jobs)
+                self._row_jobs.append(job_id)
+            if added:
+                live[n:n + added] = True
+            self._hashes.update(hashes)
+            self._artifacts.update(artifacts)
+            self._live, self._pending, self._n = live, pending, n + added
+
+        self._maintain()
+
+    def _maintain(self):
+        """Compact away masked rows once there are too many, else merge a large pending block."""
+        np = lazy_import("numpy")
+        sp = lazy_import("scipy.sparse")
+        n, matrix, pending = self._n, self._matrix, self._pending
+        if not n or pending is None and matrix is None:
+            return
+        merged = 0 if matrix is None else matrix.shape[0]
+        dead = n - len(self._rows)
+        if dead and dead > _COMPACT_RATIO * n:
+            keep = np.flatnonzero(self._live[:n])
+            blocks = [b for b in (matrix, pending) if b is not None]
+            matrix = sp.vstack(blocks, format="csr")[keep].tocsc()
+            row_jobs = [self._row_jobs[i] for i in keep.tolist()]
+            live = np.ones(max(2 * len(keep), 1024), dtype=bool)
+            with self._lock:
+                self._matrix, self._pending, self._n = matrix, None, len(keep)
+                self._row_jobs, self._live = row_jobs, live
+                self._rows = {job_id: i for i, job_id in enumerate(row_jobs)}
+        elif pending is not None and pending.shape[0] >= max(_MERGE_MIN_ROWS, _MERGE_RATIO * merged):
+            matrix = pending.tocsc() if matrix is None else sp.vstack([matrix, pending], format="csc")
+            with self._lock:
+                self._matrix, self._pending = matrix, None
+
+    def ensure_fresh(self, conn=None):
+        """Build on first use (or wait for a build in progress); afterwards refresh in the background once stale."""
+        if self._refreshed_at is None:
+            with self._refresh_lock:
+                if self._refreshed_at is None:
+                    self._refresh(None, conn)
+            return
+        if time.time() - self._refreshed_at < JOB_INDEX_REFRESH_SECONDS:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # a refresh is already running
+
+        def run():
+            try:
+                self._refresh(None, None)
+            except Exception as e:
+                print(f"[WARN] job index refresh failed: {e}")
+            finally:
+                self._refresh_lock.release()
+
+        try:
+            threading.Thread(target=run, name="job-index-refresh", daemon=True).start()
+        except BaseException:
+            self._refresh_lock.release()
+            raise
+
+    def shortlist(self, pre: str, n: int, exclude: Set[int] = frozenset()) -> List[Tuple[int, float]]:
+        """[(job_id, cosine)] of the n most similar current jobs, best first."""
+        np = lazy_import("numpy")
+        with self._lock:
+            matrix, pending, row_jobs, count = self._matrix, self._pending, self._row_jobs, self._n
+            if not self._rows or n <= 0:
+                return []
+            live = self._live[:count].copy()
+            for job_id in exclude:
+                row = self._rows.get(job_id)
+                if row is not None:
+                    live[row] = False
+        q = self._hasher().transform([pre])
+        if not q.nnz:
+            return []
+        # only the posting columns of the query's terms are touched
+        scores = np.concatenate([np.asarray(block[:, q.indices] @ q.data).ravel()
+                                 for block in (matrix, pending) if block is not None])
+        scores[~live] = -1.0
+        n = min(n, len(scores))
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(row_jobs[i], float(scores[i])) for i in top if scores[i] >= 0.0]
+
+    def skill_artifact(self, job_id: int) -> Optional[SkillArtifact]:
+        """Skills derived from the job's JD when it was last indexed."""
+        with self._lock:
+            return self._artifacts.get(job_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = 0 if self._pending is None else self._pending.shape[0]
+            return {"jobs": len(self._rows), "rows": self._n, "pending_rows": pending,
+                    "refreshed_at": self._refreshed_at, "refreshing": self._refresh_lock.locked()}
+
+
+job_index = JobIndex()
+
+
+def recommend_jobs(resume_pre: str, k: int, exclude: Set[int] = frozenset(), conn=None) -> List[Dict]:
+    """
+    Top-k jobs for a preprocessed resume: shortlist by the index's hashed term-count cosine (no IDF,
+    so it is not the applicant ranking's TF-IDF cosine), then re-ranked with the ranker's blend,
+    (1 - w) * cosine + w * skill_ratio over each JD's derived skills.
+    """
+    with borrow_conn(conn) as conn:
+        job_index.ensure_fresh(conn=conn)
+        with metrics.stage("job_index_query"):
+            candidates = job_index.shortlist(resume_pre, max(JOB_INDEX_SHORTLIST, k), exclude)
+        if not candidates:
+            return []
+        jobs = {j["job_id"]: j for j in fetch_jobs_by_id([job_id for job_id, _ in candidates], conn=conn)}
+
+    results = []
+    with metrics.stage("skill_match"):
+        for job_id, cosine in candidates:
+            job = jobs.get(job_id)
+            if job is None:  # deleted since the last refresh
+                continue
+            # precomputed by refresh; only a job re-indexed between shortlist and here is missing
+            artifact = job_index.skill_artifact(job_id) or get_skill_artifact(job.get("job_description") or "",
+                                                                                top_n=40)
+            score, matched, skill_ratio = score_resume(artifact, cosine, resume_pre, SKILL_BOOST_WEIGHT)
+            results.append({
+                "job_id": job_id,
+                "job_title": job.get("job_title"),
+                "job_role": job.get("job_role"),
+                "score": score,
+                "cosine_score": cosine,
+                "skill_ratio": skill_ratio,
+                "matched_skills": matched[:10],
+            })
+    results.sort(key=lambda r: (r["score"], r["cosine_score"]), reverse=True)
+    return results[:k]
+
+
+def recommend_for_seeker(job_seeker_id: int, k: int, exclude_applied: bool = True,
+                         conn=None) -> Optional[List[Dict]]:
+    """recommend_jobs for a seeker's stored resume; None when the seeker does not exist."""
+    with borrow_conn(conn) as conn:
+        row = fetch_seeker_resume(job_seeker_id, conn=conn)
+        if not row:
+            return None
+        resume = resolve_resume_texts([row], conn=conn)[0]
+        exclude = set(fetch_applied_job_ids(job_seeker_id, conn=conn)) if exclude_applied else set()
+        return recommend_jobs(preprocess_text(resume["text"]), k, exclude, conn=conn)
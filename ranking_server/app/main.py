@@ -1,8 +1,24 @@
 # app/main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from .startup import timed_imports, start_warm_up, mark_ready
+
+# import the app modules one by one so /health can report each module's import time (app.startup,
+# already loaded above, imports no app module at load time, so none of these is loaded yet)
+timed_imports([
+    "app.config", "app.metrics", "app.offload", "app.sandbox", "app.extractors", "app.db", "app.adb", "app.text_cache",
+    "app.preprocess", "app.skills", "app.ranker", "app.pipeline", "app.job_index", "app.tasks", "app.reports",
+    "app.routes",
+])
+
 from .routes import router
-from .config import FRONTEND_ORIGIN
+from .config import FRONTEND_ORIGIN, WARMUP_ON_STARTUP
+from .db import close_pool
+from . import adb, offload
+from .extractors import shutdown_pool as shutdown_extractors
+from .preprocess import ensure_nltk
+from .tasks import rank_tasks
 
 app = FastAPI(title="Resume Ranking Service")
 
@@ -16,3 +32,33 @@ app.add_middleware(
 )
 
 app.include_router(router)
+
+
+@app.exception_handler(offload.CpuBusyError)
+async def cpu_busy(request: Request, exc: offload.CpuBusyError):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+
+@app.exception_handler(offload.ClientDisconnected)
+async def client_disconnected(request: Request, exc: offload.ClientDisconnected):
+    # nobody is listening; 499 (nginx's "client closed request") keeps access logs honest
+    return Response(status_code=499)
+
+
+@app.on_event("startup")
+def check_nltk_and_warm_up():
+    # missing NLTK data aborts startup instead of surfacing on the first ranking request
+    ensure_nltk()
+    if WARMUP_ON_STARTUP:
+        start_warm_up()
+    else:
+        mark_ready()
+
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    rank_tasks.shutdown()
+    offload.shutdown()
+    shutdown_extractors()
+    close_pool()
+    await adb.close_pool()
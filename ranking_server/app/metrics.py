@@ -0,0 +1,187 @@
+# app/metrics.py
+import time
+import bisect
+import threading
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .config import METRICS_ENABLED
+
+# seconds; covers a single preprocess call up to a full 50k-applicant extraction
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_lock = threading.Lock()
+_registry: List["_Metric"] = []
+# per-request stage durations (ms) for the Server-Timing header; None outside collect_timings()
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("server_timings", default=None)
+
+
+def _fmt_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, object] = {}
+        with _lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        with _lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_fmt_labels(self.labelnames, key)} {value}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets=STAGE_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket (non-cumulative) counts incl. +Inf, sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        with _lock:
+            items = [(k, (list(s[0]), s[1], s[2])) for k, s in self._values.items()]
+        for key, (counts, total, n) in items:
+            running = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                running += c
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                labels = _fmt_labels(self.labelnames, key, 'le="%s"' % le)
+                yield f"{self.name}_bucket{labels} {running}"
+            yield f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_fmt_labels(self.labelnames, key)} {n}"
+
+
+STAGE_SECONDS = Histogram("ranking_stage_seconds", "Duration of one call of a ranking pipeline stage.", ("stage",))
+DOCUMENTS = Counter("ranking_documents_total", "Resumes extracted, by detected file type.", ("type",))
+DOCUMENT_BYTES = Counter("ranking_document_bytes_total", "Resume bytes extracted, by detected file type.", ("type",))
+EXTRACTION_FAILURES = Counter("ranking_extraction_failures_total",
+                              "Resumes that yielded no text because extraction failed, timed out or the format is unsupported.",
+                              ("type",))
+EXTRACTIONS = Counter("ranking_extractions_total",
+                      "Resume extractions by outcome (ok, truncated, timed_out, unsupported, failed).", ("status",))
+DOCUMENTS_SCORED = Counter("ranking_documents_scored_total", "Resumes scored against a job description.")
+SANDBOX_TIMEOUTS = Counter("ranking_extract_sandbox_timeouts_total",
+                           "Resume parses killed at the extraction deadline.")
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        timings = _timings.get()
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + elapsed * 1000.0
+        return False
+
+
+_NOOP = nullcontext()
+
+
+def stage(name: str):
+    """Time a block as pipeline stage `name`; a shared no-op when metrics are disabled."""
+    if not METRICS_ENABLED:
+        return _NOOP
+    return _Stage(name)
+
+
+@contextmanager
+def collect_timings():
+    """Sum stage durations (ms) recorded in this context into the yielded dict."""
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def server_timing(timings: Optional[Dict[str, float]]) -> Dict[str, str]:
+    """Response headers carrying `timings` as Server-Timing (empty when there is nothing to report)."""
+    if not METRICS_ENABLED or not timings:
+        return {}
+    return {"Server-Timing": ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings.items())}
+
+
+def render(caches: Dict[str, Dict], gauges: Dict[str, Tuple[str, float]]) -> str:
+    """
+    Prometheus text exposition of every registered metric, plus hit/miss counters and
+    hit ratios for `caches` (name -> stats dict) and point-in-time `gauges` (name -> (help, value)).
+    """
+    lines: List[str] = []
+    with _lock:
+        metrics = list(_registry)
+    for metric in metrics:
+        lines.extend(metric.render())
+
+    for suffix, kind, key in (("hits_total", "counter", "hits"), ("misses_total", "counter", "misses"),
+                              ("hit_ratio", "gauge", "hit_ratio")):
+        name = f"ranking_cache_{suffix}"
+        lines.append(f"# HELP {name} Cache {key.replace('_', ' ')} by cache.")
+        lines.append(f"# TYPE {name} {kind}")
+        for cache, stats in caches.items():
+            lines.append(f'{name}{{cache="{cache}"}} {stats.get(key, 0)}')
+
+    for name, (help_text, value) in gauges.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,141 @@
+# app/offload.py
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from .config import CPU_WORKERS, CPU_QUEUE_DEPTH, DISCONNECT_POLL_SECONDS
+
+
+class CpuBusyError(Exception):
+    pass
+
+
+class Cancelled(Exception):
+    """Raised inside offloaded work once the request that started it has gone away."""
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+_slots: Optional[asyncio.Semaphore] = None  # created on the serving event loop
+_stats = {"running": 0, "waiting": 0, "completed": 0, "cancelled": 0, "rejected": 0}
+# set while offloaded work runs; pipeline code polls it between batches
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar("cancel_event", default=None)
+
+
+def check_cancelled():
+    """Raise Cancelled if the work running in this context was cancelled; cheap, call it between batches."""
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise Cancelled("request cancelled")
+
+
+@contextmanager
+def cancellable(event: threading.Event):
+    """Make check_cancelled() in this block observe `event` (for work started outside run_cpu)."""
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+
+async def run_cpu(fn: Callable, *args, **kwargs):
+    """
+    Run blocking/CPU-bound `fn` on the dedicated executor, keeping the event loop and Starlette's
+    threadpool free. At most CPU_WORKERS calls run at once and CPU_QUEUE_DEPTH more may wait
+    (CpuBusyError beyond that). If the awaiting request is cancelled, the call is flagged so its
+    next check_cancelled() stops it; its slot is only released once the thread is really done.
+    """
+    slots = _get_slots()
+    if slots.locked() and _stats["waiting"] >= CPU_QUEUE_DEPTH:
+        _stats["rejected"] += 1
+        raise CpuBusyError(f"CPU executor is saturated ({CPU_WORKERS} running, {CPU_QUEUE_DEPTH} waiting)")
+    return await _run(slots, fn, *args, **kwargs)
+
+
+async def continue_cpu(fn: Callable, *args, **kwargs):
+    """
+    run_cpu for a later step of work that was already admitted, e.g. the next chunk of a streamed
+    response whose status line has been sent: it waits for a slot however long the queue is and
+    never raises CpuBusyError, which could only truncate the response at that point.
+    """
+    return await _run(_get_slots(), fn, *args, **kwargs)
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(CPU_WORKERS)
+    return _slots
+
+
+async def _run(slots: asyncio.Semaphore, fn: Callable, *args, **kwargs):
+    _stats["waiting"] += 1
+    try:
+        await slots.acquire()
+    finally:
+        _stats["waiting"] -= 1
+
+    loop = asyncio.get_running_loop()
+    event = threading.Event()
+    ctx = contextvars.copy_context()  # carries metrics.collect_timings() into the worker
+    ctx.run(_cancel_event.set, event)
+
+    def release(_):
+        _stats["running"] -= 1
+        _stats["completed"] += 1
+        slots.release()
+
+    _stats["running"] += 1
+    try:
+        future = _executor.submit(ctx.run, fn, *args, **kwargs)
+    except BaseException:
+        _stats["running"] -= 1
+        slots.release()
+        raise
+    future.add_done_callback(lambda f: loop.call_soon_threadsafe(release, f))
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        event.set()
+        _stats["cancelled"] += 1
+        raise
+
+
+async def _disconnected(request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+async def cancel_on_disconnect(request, awaitable):
+    """
+    Await `awaitable`, cancelling it (and, through run_cpu, the work behind it) if the client
+    disconnects first; raises ClientDisconnected in that case.
+    """
+    work = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_disconnected(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        work.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if work.done():
+        return work.result()
+    work.cancel()
+    raise ClientDisconnected()
+
+
+def stats() -> Dict[str, int]:
+    return dict(_stats, workers=CPU_WORKERS, queue_depth=CPU_QUEUE_DEPTH)
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
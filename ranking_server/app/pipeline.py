@@ -0,0 +1,292 @@
+# app/pipeline.py
+import hashlib
+import io
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .db import (borrow_conn, count_applicants, fetch_job, fetch_job_and_applicants, fetch_job_and_application, iter_job_applicants,
+                 save_ranking, load_rank_state, save_rank_state, count_rank_state_addition, slot_ranked_application,
+                 rank_lock, fetch_employer_jobs, fetch_job_applications, iter_applicant_resumes, save_rankings)
+from .text_cache import resolve_resume_texts, store_texts
+from .preprocess import preprocess_text
+from .skills import get_skill_artifact
+from .ranker import (JobModel, RankedResults, fit_and_score_preprocessed, fit_and_score_jobs, score_resume,
+                     model_arrays, model_from_arrays)
+from .startup import lazy_import
+from .offload import check_cancelled
+from . import report_cache
+from .config import SKILL_BOOST_WEIGHT, INCREMENTAL_REFIT_RATIO, FETCH_STREAMING, TOP_K
+
+# progress(stage, done, total): stages are "fetch", "extract", "score" and "persist"
+Progress = Callable[[str, int, Optional[int]], None]
+# Long runs call check_cancelled() between batches and before scoring / persisting, so work started
+# for a request that has gone away (app/offload.py, app/tasks.py) stops with offload.Cancelled.
+
+
+class RefitRequired(Exception):
+    """score_application cannot score incrementally; the job needs a full re-rank first."""
+
+
+def _no_progress(stage: str, done: int = 0, total: Optional[int] = None):
+    pass
+
+
+def _jd_hash(jd_text: str) -> str:
+    return hashlib.sha256(jd_text.encode("utf-8")).hexdigest()
+
+
+def _save_model(job_id: int, run_id: int, jd_text: str, model: Optional[JobModel], conn=None):
+    """
+    Store what score_application needs (vocabulary, IDF, JD vector) as an npz of plain arrays, so
+    loading it back never unpickles anything; per-resume vectors are not kept.
+    """
+    np = lazy_import("numpy")
+    buf = io.BytesIO()
+    # model is None when the job had nothing to fit; score_application then refits
+    arrays = model_arrays(model) if model is not None else {}
+    np.savez(buf, jd_hash=np.array(_jd_hash(jd_text)), **arrays)
+    fitted_count = model.fitted_count if model is not None else 0
+    save_rank_state(job_id, run_id, buf.getvalue(), fitted_count, 0, conn=conn)
+
+
+def _load_model(blob: bytes, fitted_count: int) -> Dict:
+    """{jd_hash, model} from a _save_model blob; model is None when nothing was fitted."""
+    np = lazy_import("numpy")
+    with np.load(io.BytesIO(blob), allow_pickle=False) as f:
+        arrays = {name: f[name] for name in f.files}
+    return {"jd_hash": str(arrays.pop("jd_hash")),
+            "model": model_from_arrays(arrays, fitted_count) if "terms" in arrays else None}
+
+
+def iter_preprocessed_resumes(job_id: int, conn, to_store: List,
+                              progress: Progress = _no_progress, total: Optional[int] = None) -> Iterator[Dict]:
+    """
+    fetch -> extract -> preprocess, one cursor batch at a time. Each batch's blobs and raw
+    texts are dropped as soon as its preprocessed text exists; each batch's cache misses are
+    written on a second pooled connection (the cursor's transaction must stay open until the
+    end) or, when none is free, collected in `to_store` for after the cursor closes.
+    """
+    done = 0
+    for batch in iter_job_applicants(job_id, conn):
+        check_cancelled()
+        progress("fetch", done + len(batch), total)
+        texts = resolve_resume_texts(batch, conn=conn, to_store=to_store)
+        batch.clear()
+        for r in texts:
+            yield {"job_seeker_id": r["job_seeker_id"], "resume_name": r["resume_name"],
+                   "extract_status": r["extract_status"], "pre": preprocess_text(r["text"])}
+        done += len(texts)
+        progress("extract", done, total)
+
+
+def load_preprocessed_resumes(job_id: int, conn=None,
+                              progress: Progress = _no_progress) -> Tuple[Optional[Dict], List[Dict]]:
+    """Job header and [{job_seeker_id, resume_name, extract_status, pre}] for all of its applicants."""
+    if not FETCH_STREAMING:
+        job, apps = fetch_job_and_applicants(job_id, conn=conn)
+        if not job or not apps:
+            return job, []
+        progress("fetch", len(apps), len(apps))
+        resumes_texts = resolve_resume_texts(apps, conn=conn)
+        apps.clear()
+        docs = [{"job_seeker_id": r["job_seeker_id"], "resume_name": r["resume_name"],
+                 "extract_status": r["extract_status"], "pre": preprocess_text(r["text"])} for r in resumes_texts]
+        progress("extract", len(docs), len(docs))
+        return job, docs
+
+    with borrow_conn(conn) as conn:
+        job = fetch_job(job_id, conn=conn)
+        if not job:
+            return None, []
+        total = count_applicants(job_id, conn=conn)
+        to_store = []
+        docs = list(iter_preprocessed_resumes(job_id, conn, to_store, progress, total))
+        conn.commit()  # closes the server-side cursor
+        store_texts(to_store, conn=conn)
+    return job, docs
+
+
+def rank_job(job_id: int, conn=None,
+             progress: Progress = _no_progress) -> Tuple[Optional[Dict], Optional[RankedResults]]:
+    """
+    Fetch, extract, score and persist one job's ranking.
+    Returns (job, ranked); job is None when the job does not exist.
+    """
+    job, docs = load_preprocessed_resumes(job_id, conn=conn, progress=progress)
+    if not job or not docs:
+        return job, None
+
+    # Compute scores
+    check_cancelled()
+    progress("score", 0, len(docs))
+    jd_text = job.get("job_description") or ""
+    ranked, model = fit_and_score_preprocessed(jd_text, docs, cfg_skill_weight=SKILL_BOOST_WEIGHT)
+    if model is None:
+        print(f"[WARN] job_id={job_id}: no terms left after TF-IDF pruning; cosine scores are 0")
+    progress("score", len(ranked), len(ranked))
+    del docs
+
+    # Persist ranks (best -> 1, next -> 2, ...) and scores under a new ranking run,
+    # then keep the fitted model so later applications can be scored incrementally
+    # (under the job's rank lock, so an incremental score_application cannot interleave)
+    check_cancelled()
+    progress("persist", 0, len(ranked))
+    with borrow_conn(conn) as conn, rank_lock(conn, [job_id]):
+        run = save_ranking(job_id, ranked, conn=conn)
+        report_cache.invalidate(job_id)  # stale anyway (new fingerprint); frees the memory now
+        try:
+            _save_model(job_id, run["run_id"], jd_text, model, conn=conn)
+        except Exception as e:
+            print(f"[WARN] failed to persist ranking state for job_id={job_id}: {e}")
+    progress("persist", len(ranked), len(ranked))
+    return job, ranked
+
+
+def rank_employer_jobs(employer_id: int, job_ids: Optional[List[int]] = None, conn=None,
+                       progress: Progress = _no_progress) -> Tuple[List[Dict], Dict[int, RankedResults]]:
+    """
+    Rank all of an employer's jobs (or the listed ones) in one pass: each distinct applicant's
+    resume is fetched, extracted and preprocessed once, term counts are shared across jobs
+    and every job's ranks are written in one transaction. Per-job results equal rank_job.
+    Returns (jobs, {job_id: ranked}); jobs without applicants are absent from the dict.
+    """
+    with borrow_conn(conn) as conn:
+        jobs = fetch_employer_jobs(employer_id, job_ids, conn=conn)
+        if not jobs:
+            return [], {}
+        ids = [j["job_id"] for j in jobs]
+        applications: Dict[int, List[int]] = {}
+        for a in fetch_job_applications(ids, conn=conn):
+            applications.setdefault(a["job_id"], []).append(a["job_seeker_id"])
+        total = len({s for seekers in applications.values() for s in seekers})
+
+        resumes, to_store = {}, []
+        for batch in iter_applicant_resumes(ids, conn):
+            check_cancelled()
+            progress("fetch", len(resumes) + len(batch), total)
+            for r in resolve_resume_texts(batch, conn=conn, to_store=to_store):
+                resumes[r["job_seeker_id"]] = {"resume_name": r["resume_name"], "extract_status": r["extract_status"],
+                                               "pre": preprocess_text(r["text"])}
+            batch.clear()
+            progress("extract", len(resumes), total)
+        conn.commit()  # closes the server-side cursor
+        store_texts(to_store, conn=conn)
+
+        # the two reads are separate statements: a seeker deleted in between has an application
+        # but no resume, and is left out of this ranking rather than failing the whole batch
+        for job_id, seekers in applications.items():
+            applications[job_id] = [s for s in seekers if s in resumes]
+
+        check_cancelled()
+        scored = sum(len(seekers) for seekers in applications.values())
+        progress("score", 0, scored)
+        jd_texts = {j["job_id"]: j.get("job_description") or "" for j in jobs}
+        fitted = fit_and_score_jobs(list(jd_texts.items()), resumes, applications, cfg_skill_weight=SKILL_BOOST_WEIGHT)
+        del resumes
+        ranked_by_job = {job_id: ranked for job_id, (ranked, _) in fitted.items()}
+        progress("score", scored, scored)
+        if not ranked_by_job:
+            return jobs, {}
+
+        check_cancelled()
+        progress("persist", 0, len(ranked_by_job))
+        with rank_lock(conn, list(ranked_by_job)):
+            runs = save_rankings(ranked_by_job, conn=conn)
+            for job_id in ranked_by_job:
+                report_cache.invalidate(job_id)
+            for job_id, (_, model) in fitted.items():
+                try:
+                    _save_model(job_id, runs[job_id]["run_id"], jd_texts[job_id], model, conn=conn)
+                except Exception as e:
+                    print(f"[WARN] failed to persist ranking state for job_id={job_id}: {e}")
+        progress("persist", len(ranked_by_job), len(ranked_by_job))
+    return jobs, ranked_by_job
+
+
+def build_rank_response(job_id: int, ranked: Optional[RankedResults]) -> Dict:
+    """JSON payload of the rank endpoint: counts plus the top-K rows."""
+    if not ranked:
+        return {"success": True, "message": "No applicants to rank", "ranked": []}
+
+    # Prepare top-K response
+    top_k = min(TOP_K, len(ranked))
+    response_rows = []
+    for i in range(top_k):
+        r = ranked[i]
+        response_rows.append({
+            "rank": i + 1,
+            "job_seeker_id": r["job_seeker_id"],
+            "resume_name": r["resume_name"],
+            "extract_status": r["extract_status"],
+            "score": r["score"],
+            "cosine_score": r["cosine_score"],
+            "skill_ratio": r["skill_ratio"],
+            "matched_skills": r["matched_skills"][:10]
+        })
+
+    # how every resume's text was obtained; anything but "ok" means it was scored on partial or no text
+    extraction = dict(Counter(ranked.extract_statuses))
+    return {"success": True, "job_id": job_id, "ranked_count": len(ranked), "extraction": extraction,
+            "top": response_rows}
+
+
+def score_application(job_id: int, job_seeker_id: int, conn=None) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """
+    Score one (new or updated) application against the job's stored TF-IDF state and
+    slot it into the existing order. Raises RefitRequired when there is no usable state, the JD
+    changed, or more than INCREMENTAL_REFIT_RATIO of the corpus was added since the last fit;
+    the caller re-ranks the job (through rank_tasks, so a burst of applications shares one re-rank).
+    Returns (job, result); result is None when the seeker has not applied.
+    """
+    # the job's rank lock covers state load -> slot -> counter update, so concurrent applications
+    # and a concurrent re-rank cannot interleave their slots and counters
+    with borrow_conn(conn) as conn, rank_lock(conn, [job_id]):
+        job, app_row = fetch_job_and_application(job_id, job_seeker_id, conn=conn)
+        if not job or not app_row:
+            return job, None
+
+        jd_text = job.get("job_description") or ""
+        state_row = load_rank_state(job_id, conn=conn)
+        state = None
+        if state_row:
+            try:
+                state = _load_model(bytes(state_row["state"]), state_row["fitted_count"])
+            except Exception as e:
+                print(f"[WARN] unreadable ranking state for job_id={job_id}: {e}")
+
+        # an application that already has a rank was in the fit (or was slotted since); only a new
+        # one grows the corpus
+        is_new = (app_row.get("rank") or 0) <= 0
+        drift = 0.0
+        if state_row and state_row["fitted_count"]:
+            drift = (state_row["added_since_fit"] + is_new) / state_row["fitted_count"]
+        if state is None or state["model"] is None:
+            raise RefitRequired("no ranking state")
+        if state["jd_hash"] != _jd_hash(jd_text):
+            raise RefitRequired("job description changed")
+        if drift > INCREMENTAL_REFIT_RATIO:
+            raise RefitRequired(f"{drift:.0%} of the corpus added since the last fit")
+
+        cosine_similarity = lazy_import("sklearn.metrics.pairwise").cosine_similarity
+        model: JobModel = state["model"]
+        resume = resolve_resume_texts([app_row], conn=conn)[0]
+        pre = preprocess_text(resume["text"])
+        vec = model.vectorizer.transform([pre])
+        cosine_score = float(cosine_similarity(model.jd_vec, vec)[0, 0])
+        artifact = get_skill_artifact(jd_text, top_n=40)
+        score, matched, skill_ratio = score_resume(artifact, cosine_score, pre, SKILL_BOOST_WEIGHT)
+        result = {
+            "job_seeker_id": job_seeker_id,
+            "resume_name": resume["resume_name"],
+            "extract_status": resume["extract_status"],
+            "cosine_score": cosine_score,
+            "matched_skills": matched,
+            "skill_ratio": skill_ratio,
+            "score": score,
+        }
+        rank = slot_ranked_application(job_id, job_seeker_id, state_row["ranking_run_id"], result, conn=conn)
+
+        if is_new:
+            count_rank_state_addition(job_id, conn=conn)
+
+        return job, dict(result, rank=rank, mode="incremental")
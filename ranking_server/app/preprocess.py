@@ -1,41 +1,97 @@
 # app/preprocess.py
 import re
-from typing import List
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+from .config import LEMMA_CACHE_SIZE, NLTK_AUTO_DOWNLOAD
+from .startup import lazy_import
+from . import metrics
 
 TOKEN_RE = re.compile(r"\b[a-zA-Z]+\b")
 
+# nltk.download name -> path checked with nltk.data.find
+NLTK_RESOURCES = {
+    "stopwords": "corpora/stopwords",
+    "wordnet": "corpora/wordnet",
+    "omw-1.4": "corpora/omw-1.4",
+}
+
+STOPWORDS = None
+LEMMATIZER = None
+_nlp_lock = threading.Lock()
+
 def ensure_nltk():
-    resources = ["punkt", "stopwords", "wordnet", "omw-1.4"]
-    for r in resources:
+    """
+    Fail fast when NLTK data is missing locally. Only downloads when NLTK_AUTO_DOWNLOAD=1,
+    so offline containers never block on the network at startup.
+    """
+    nltk = lazy_import("nltk")
+    missing = []
+    for name, path in NLTK_RESOURCES.items():
         try:
-            nltk.data.find(r)
+            nltk.data.find(path)
         except LookupError:
-            nltk.download(r, quiet=True)
+            if not (NLTK_AUTO_DOWNLOAD and nltk.download(name, quiet=True)):
+                missing.append(name)
+    if missing:
+        raise RuntimeError(
+            f"NLTK data not found: {', '.join(missing)}. "
+            f"Install it with `python -m nltk.downloader {' '.join(missing)}` or set NLTK_AUTO_DOWNLOAD=1."
+        )
 
-ensure_nltk()
-STOPWORDS = set(stopwords.words("english"))
-LEMMATIZER = WordNetLemmatizer()
+def load_nlp():
+    """Load stopwords and the WordNet lemmatizer once (WordNet itself loads on first lemmatize)."""
+    global STOPWORDS, LEMMATIZER
+    if LEMMATIZER is not None:
+        return
+    with _nlp_lock:
+        if LEMMATIZER is not None:
+            return
+        ensure_nltk()
+        stopwords = lazy_import("nltk.corpus").stopwords
+        lemmatizer = lazy_import("nltk.stem").WordNetLemmatizer()
+        lemmatizer.lemmatize("warming")  # forces the lazy WordNet corpus load
+        STOPWORDS = set(stopwords.words("english"))
+        LEMMATIZER = lemmatizer
 
-def preprocess_text(text: str) -> str:
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(token: str) -> str:
+    return LEMMATIZER.lemmatize(token)
+
+def lemma_cache_stats() -> Dict[str, float]:
+    info = lemmatize.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_ratio": (info.hits / lookups) if lookups else 0.0,
+    }
+
+def tokenize(text: str) -> List[str]:
     if not isinstance(text, str):
-        return ""
-    text = text.lower()
-    tokens = TOKEN_RE.findall(text)
-    filtered = [LEMMATIZER.lemmatize(t) for t in tokens if t not in STOPWORDS and len(t) > 1]
-    return " ".join(filtered)
-
-def derive_skills_from_jd(job_text: str, top_n: int = 40) -> List[str]:
-    pre = preprocess_text(job_text)
+        return []
+    load_nlp()
+    tokens = TOKEN_RE.findall(text.lower())
+    return [lemmatize(t) for t in tokens if t not in STOPWORDS and len(t) > 1]
+
+def preprocess_text(text: str) -> str:
+    with metrics.stage("preprocess"):
+        return " ".join(tokenize(text))
+
+def derive_skills_from_jd(job_text: str, top_n: int = 40, pre: Optional[str] = None) -> List[str]:
+    """`pre` is the already preprocessed job text, when the caller has it."""
+    if pre is None:
+        pre = preprocess_text(job_text)
     if not pre.strip():
         return []
-    vect = TfidfVectorizer(ngram_range=(1,2), max_features=500)
-    X = vect.fit_transform([pre])
-    feature_names = np.array(vect.get_feature_names_out())
+    TfidfVectorizer = lazy_import("sklearn.feature_extraction.text").TfidfVectorizer
+    np = lazy_import("numpy")
+    with metrics.stage("derive_skills"):
+        vect = TfidfVectorizer(ngram_range=(1,2), max_features=500)
+        X = vect.fit_transform([pre])
+        feature_names = np.array(vect.get_feature_names_out())
     if feature_names.size == 0:
         return []
     candidates = [t for t in feature_names if len(t) > 1]
@@ -44,7 +100,12 @@ def derive_skills_from_jd(job_text: str, top_n: int = 40) -> List[str]:
 def match_skills(skills_required: List[str], text: str) -> List[str]:
     if not skills_required or not text:
         return []
-    text_low = " " + preprocess_text(text) + " "
+    return match_skills_preprocessed(skills_required, preprocess_text(text))
+
+def match_skills_preprocessed(skills_required: List[str], pre: str) -> List[str]:
+    if not skills_required or not pre:
+        return []
+    text_low = " " + pre + " "
     matched = []
     for skill in skills_required:
         s = skill.lower().strip()
@@ -1,39 +1,286 @@
 # app/ranker.py
-from typing import List, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from .preprocess import preprocess_text, derive_skills_from_jd, match_skills
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, List, Dict, Optional, Tuple
+from .preprocess import preprocess_text
+from .startup import lazy_import
+from .skills import get_skill_artifact
+from .extractors import EXTRACT_OK
+from . import metrics
 from .config import TFIDF_MAX_FEATURES, TFIDF_NGRAM, SKILL_BOOST_WEIGHT
 
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+@dataclass
+class JobModel:
+    """Fitted TF-IDF state for one job: vocabulary/IDF, the JD vector and how many resumes it was fitted on."""
+    vectorizer: "TfidfVectorizer"
+    jd_vec: object
+    fitted_count: int
+
+
+@dataclass
+class RankedResults:
+    """
+    Ranking of one job, best first, as columns: one entry per applicant in each array, the
+    matched skills index-encoded against `skills` (row i matched skills[matched[offsets[i]:offsets[i + 1]]]).
+    Reads like a sequence of the row dicts the API returns ({job_seeker_id, resume_name, extract_status,
+    cosine_score, matched_skills, skill_ratio, score}); rows are only materialized on access.
+    """
+    job_seeker_ids: object      # int64[n]
+    resume_names: List[Optional[str]]
+    extract_statuses: List[str]  # extractors.EXTRACT_* outcome of each resume
+    scores: object              # float64[n]
+    cosine_scores: object       # float64[n]
+    skill_ratios: object        # float64[n]
+    skills: List[str]
+    matched_offsets: object     # int32[n + 1]
+    matched: object             # int16[total matches]
+
+    def __len__(self) -> int:
+        return len(self.job_seeker_ids)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            np = lazy_import("numpy")
+            return self.take(np.arange(len(self))[i])
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.row(i)
+
+    def matched_skills(self, i: int) -> List[str]:
+        skills = self.skills
+        return [skills[j] for j in self.matched[self.matched_offsets[i]:self.matched_offsets[i + 1]].tolist()]
+
+    def row(self, i: int) -> Dict:
+        return {
+            "job_seeker_id": int(self.job_seeker_ids[i]),
+            "resume_name": self.resume_names[i],
+            "extract_status": self.extract_statuses[i],
+            "cosine_score": float(self.cosine_scores[i]),
+            "matched_skills": self.matched_skills(i),
+            "skill_ratio": float(self.skill_ratios[i]),
+            "score": float(self.scores[i]),
+        }
+
+    def take(self, rows) -> "RankedResults":
+        """The given rows (indices into this ranking), in that order."""
+        np = lazy_import("numpy")
+        rows = np.asarray(rows, dtype=np.intp)
+        starts = self.matched_offsets[rows]
+        lengths = self.matched_offsets[rows + 1] - starts
+        offsets = np.zeros(len(rows) + 1, dtype=np.int32)
+        np.cumsum(lengths, out=offsets[1:])
+        # output slot p of row r reads source slot starts[r] + (p - offsets[r])
+        matched = self.matched[np.arange(offsets[-1]) - np.repeat(offsets[:-1] - starts, lengths)]
+        return RankedResults(
+            job_seeker_ids=self.job_seeker_ids[rows],
+            resume_names=[self.resume_names[i] for i in rows.tolist()],
+            extract_statuses=[self.extract_statuses[i] for i in rows.tolist()],
+            scores=self.scores[rows],
+            cosine_scores=self.cosine_scores[rows],
+            skill_ratios=self.skill_ratios[rows],
+            skills=self.skills,
+            matched_offsets=offsets,
+            matched=matched,
+        )
+
+
+def score_resume(artifact, cosine_score: float, resume_pre: str,
+                 cfg_skill_weight: float = SKILL_BOOST_WEIGHT) -> Tuple[float, List[str], float]:
+    """Return (final_score, matched_skills, skill_ratio) for one preprocessed resume."""
+    skills = artifact.skills
+    matched = artifact.matcher.match(resume_pre) if skills else []
+    skill_ratio = (len(matched) / len(skills)) if skills else 0.0
+    w = cfg_skill_weight
+    final_score = (1.0 - w) * cosine_score + w * skill_ratio
+    return float(final_score), matched, skill_ratio
+
+
+def fit_and_score(job_text: str,
+                  resumes_texts: List[Dict],
+                  cfg_skill_weight: float = SKILL_BOOST_WEIGHT) -> Tuple[RankedResults, Optional[JobModel]]:
+    # one preprocessing pass per document, shared by TF-IDF and skill matching
+    docs = [{"job_seeker_id": r["job_seeker_id"], "resume_name": r.get("resume_name"),
+             "extract_status": r.get("extract_status", EXTRACT_OK), "pre": preprocess_text(r.get("text", ""))}
+            for r in resumes_texts]
+    return fit_and_score_preprocessed(job_text, docs, cfg_skill_weight)
+
+
+def fit_and_score_preprocessed(job_text: str,
+                               docs: List[Dict],
+                               cfg_skill_weight: float = SKILL_BOOST_WEIGHT) -> Tuple[RankedResults, Optional[JobModel]]:
+    """
+    Like fit_and_score, for docs that already carry their preprocessed text in "pre".
+    The model is None when no terms survive pruning; every cosine score is then 0.
+    """
+    jd_pre = preprocess_text(job_text)
+    (vectorizer, X), = _fit_tfidf([jd_pre] + [d["pre"] for d in docs], [[0] + list(range(1, len(docs) + 1))])
+    return _score_fitted(job_text, jd_pre, vectorizer, X, docs, cfg_skill_weight)
+
+
+def fit_and_score_jobs(jobs: List[Tuple[int, str]],
+                       resumes: Dict[int, Dict],
+                       applications: Dict[int, List[int]],
+                       cfg_skill_weight: float = SKILL_BOOST_WEIGHT) -> Dict[int, Tuple[RankedResults, Optional[JobModel]]]:
+    """
+    Rank several jobs whose applicant pools overlap, in one pass.
+    `jobs` is [(job_id, job_text)], `resumes` maps job_seeker_id -> {resume_name, extract_status, pre} (each
+    resume preprocessed once) and `applications` maps job_id -> applicant seeker ids in fetch order.
+    Jobs without applicants are left out of the result; a job whose rows leave no terms after
+    pruning gets cosine scores of 0 and no model, without affecting the others.
+    """
+    jd_pres = [preprocess_text(job_text) for _, job_text in jobs]
+    seeker_ids = list(resumes)
+    row_of = {jsid: len(jobs) + i for i, jsid in enumerate(seeker_ids)}
+    ranked_jobs = [(j, job_id, job_text) for j, (job_id, job_text) in enumerate(jobs) if applications.get(job_id)]
+    fitted = _fit_tfidf(jd_pres + [resumes[s]["pre"] for s in seeker_ids],
+                        [[j] + [row_of[s] for s in applications[job_id]] for j, job_id, _ in ranked_jobs])
+
+    out = {}
+    for (j, job_id, job_text), (vectorizer, X) in zip(ranked_jobs, fitted):
+        docs = [dict(resumes[s], job_seeker_id=s) for s in applications[job_id]]
+        if X is None:
+            print(f"[WARN] job_id={job_id}: no terms left after TF-IDF pruning; cosine scores are 0")
+        out[job_id] = _score_fitted(job_text, jd_pres[j], vectorizer, X, docs, cfg_skill_weight)
+    return out
+
+
+def _fit_tfidf(corpus: List[str], rows_by_job: List[List[int]]) -> List[Tuple["TfidfVectorizer", object]]:
+    """
+    Fit one TF-IDF model per job over corpus rows (the JD row first). Term counts are computed
+    once for the whole corpus; each job then keeps exactly the columns its own
+    TfidfVectorizer(max_features, ngram_range, min_df=1, max_df=0.85) would keep (terms present
+    in its rows, document frequency cap, the max_features most frequent with the same tie order)
+    and gets its own IDF. Returns [(vectorizer, X)] with a transform()-ready vectorizer per job;
+    (None, None) for a job where no term survives (where TfidfVectorizer raises "After pruning,
+    no terms remain"), so one degenerate job does not fail the others.
+    """
+    np = lazy_import("numpy")
+    text = lazy_import("sklearn.feature_extraction.text")
+
+    with metrics.stage("tfidf_fit"):
+        # float64 counts like TfidfVectorizer so max_features ties break identically; sorted
+        # indices so the arithmetic does not depend on which other documents were in the corpus
+        counter = text.CountVectorizer(ngram_range=TFIDF_NGRAM, dtype=np.float64)
+        try:
+            counts = counter.fit_transform(corpus).tocsr()
+        except ValueError:  # empty vocabulary: no document has a single term
+            return [(None, None)] * len(rows_by_job)
+        counts.sort_indices()
+        terms = counter.get_feature_names_out()
+
+        fitted = []
+        for rows in rows_by_job:
+            sub = counts[rows]
+            dfs = np.bincount(sub.indices, minlength=sub.shape[1])
+            mask = (dfs >= 1) & (dfs <= 0.85 * len(rows))
+            if TFIDF_MAX_FEATURES is not None and mask.sum() > TFIDF_MAX_FEATURES:
+                tfs = np.asarray(sub.sum(axis=0)).ravel()
+                keep = np.where(mask)[0][(-tfs[mask]).argsort()[:TFIDF_MAX_FEATURES]]
+                mask = np.zeros_like(mask)
+                mask[keep] = True
+            cols = np.where(mask)[0]
+            if not len(cols):
+                fitted.append((None, None))
+                continue
+            sub = sub[:, cols]
+            sub.sort_indices()
+            transformer = text.TfidfTransformer()
+            X = transformer.fit_transform(sub)
+
+            fitted.append((_tfidf_vectorizer({terms[c]: i for i, c in enumerate(cols)}, transformer.idf_), X))
+    return fitted
+
+
+def _tfidf_vectorizer(vocabulary: Dict[str, int], idf) -> "TfidfVectorizer":
+    """A transform()-ready TfidfVectorizer with the given vocabulary and IDF, without fitting it."""
+    text = lazy_import("sklearn.feature_extraction.text")
+    vectorizer = text.TfidfVectorizer(max_features=TFIDF_MAX_FEATURES, ngram_range=TFIDF_NGRAM, min_df=1, max_df=0.85)
+    vectorizer.vocabulary_ = vocabulary
+    vectorizer.idf_ = idf
+    return vectorizer
+
+
+def model_arrays(model: JobModel) -> Dict[str, object]:
+    """The model as plain arrays (terms in column order, IDF, the JD row), storable without pickle."""
+    np = lazy_import("numpy")
+    vocabulary = model.vectorizer.vocabulary_
+    jd = model.jd_vec.tocsr()
+    return {"terms": np.array(sorted(vocabulary, key=vocabulary.get)), "idf": model.vectorizer.idf_,
+            "jd_indices": jd.indices, "jd_data": jd.data}
+
+
+def model_from_arrays(arrays: Dict[str, object], fitted_count: int) -> JobModel:
+    """Inverse of model_arrays."""
+    sp = lazy_import("scipy.sparse")
+    terms = arrays["terms"].tolist()
+    indices = arrays["jd_indices"]
+    jd_vec = sp.csr_matrix((arrays["jd_data"], indices, [0, len(indices)]), shape=(1, len(terms)))
+    return JobModel(vectorizer=_tfidf_vectorizer({t: i for i, t in enumerate(terms)}, arrays["idf"]),
+                    jd_vec=jd_vec, fitted_count=fitted_count)
+
+
+def _score_fitted(job_text: str, jd_pre: str, vectorizer, X, docs: List[Dict],
+                  cfg_skill_weight: float) -> Tuple[RankedResults, Optional[JobModel]]:
+    """
+    Cosine + skill scores for docs given their fitted TF-IDF rows (row 0 is the JD); with X None
+    (nothing left to fit) the cosines are 0 and the returned model is None.
+    """
+    np = lazy_import("numpy")
+    cosine_similarity = lazy_import("sklearn.metrics.pairwise").cosine_similarity
+
+    if X is None:
+        cosine_scores = np.zeros(len(docs))
+    else:
+        with metrics.stage("tfidf_score"):
+            cosine_scores = cosine_similarity(X[0], X[1:]).ravel()
+
+    artifact = get_skill_artifact(job_text, pre=jd_pre, top_n=40)
+
+    skill_index = {skill: j for j, skill in enumerate(artifact.skills)}
+    final_scores = np.empty(len(docs))
+    skill_ratios = np.empty(len(docs))
+    matched_counts = np.empty(len(docs), dtype=np.int32)
+    matched = []
+    with metrics.stage("skill_match"):
+        for i, r in enumerate(docs):
+            final_scores[i], hits, skill_ratios[i] = score_resume(artifact, float(cosine_scores[i]), r["pre"],
+                                                                  cfg_skill_weight)
+            matched_counts[i] = len(hits)
+            matched.extend(skill_index[skill] for skill in hits)
+    metrics.DOCUMENTS_SCORED.inc(len(docs))
+
+    offsets = np.zeros(len(docs) + 1, dtype=np.int32)
+    np.cumsum(matched_counts, out=offsets[1:])
+    unordered = RankedResults(
+        job_seeker_ids=np.fromiter((r["job_seeker_id"] for r in docs), dtype=np.int64, count=len(docs)),
+        resume_names=[r.get("resume_name") for r in docs],
+        extract_statuses=[r.get("extract_status", EXTRACT_OK) for r in docs],
+        scores=final_scores,
+        cosine_scores=np.asarray(cosine_scores, dtype=np.float64),
+        skill_ratios=skill_ratios,
+        skills=list(artifact.skills),
+        matched_offsets=offsets,
+        matched=np.asarray(matched, dtype=np.int16),
+    )
+    # best first by (score, cosine); ties keep fetch order
+    results_sorted = unordered.take(np.lexsort((-unordered.cosine_scores, -final_scores)))
+
+    model = None
+    if X is not None:
+        model = JobModel(vectorizer=vectorizer, jd_vec=X[0], fitted_count=len(docs))
+    return results_sorted, model
+
+
 def compute_scores_from_texts(job_text: str,
                               resumes_texts: List[Dict],
-                              cfg_skill_weight: float = SKILL_BOOST_WEIGHT) -> List[Dict]:
-    jd_pre = preprocess_text(job_text)
-    corpus = [jd_pre] + [preprocess_text(r.get("text", "")) for r in resumes_texts]
-    vectorizer = TfidfVectorizer(max_features=TFIDF_MAX_FEATURES, ngram_range=TFIDF_NGRAM, min_df=1, max_df=0.85)
-    X = vectorizer.fit_transform(corpus)
-    jd_vec = X[0]
-    res_vecs = X[1:]
-    cosine_scores = cosine_similarity(jd_vec, res_vecs).flatten()
-
-    skills = derive_skills_from_jd(job_text, top_n=40)
-
-    results = []
-    for i, r in enumerate(resumes_texts):
-        cosine_score = float(cosine_scores[i])
-        matched = match_skills(skills, r.get("text", "")) if skills else []
-        skill_ratio = (len(matched) / len(skills)) if skills else 0.0
-        w = cfg_skill_weight
-        final_score = (1.0 - w) * cosine_score + w * skill_ratio
-        results.append({
-            "job_seeker_id": r["job_seeker_id"],
-            "resume_name": r.get("resume_name"),
-            "text": r.get("text", ""),
-            "cosine_score": cosine_score,
-            "matched_skills": matched,
-            "skill_ratio": skill_ratio,
-            "score": float(final_score)
-        })
-
-    results_sorted = sorted(results, key=lambda x: (x["score"], x["cosine_score"]), reverse=True)
-    return results_sorted
+                              cfg_skill_weight: float = SKILL_BOOST_WEIGHT) -> RankedResults:
+    ranked, _ = fit_and_score(job_text, resumes_texts, cfg_skill_weight)
+    return ranked
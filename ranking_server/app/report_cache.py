@@ -0,0 +1,105 @@
+# app/report_cache.py
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from .config import REPORT_CACHE_BYTES, REPORT_CACHE_MAX_ENTRY
+
+# Rendered report bodies keyed by (job_id, fmt), each tagged with the job's report fingerprint
+# (db.Q_REPORT_JOB): an entry whose fingerprint no longer matches is dropped on lookup, so a new
+# ranking run, application or profile edit invalidates it without any explicit call.
+# Least recently used entries are evicted once the cached bodies exceed REPORT_CACHE_BYTES.
+
+CACHED_FORMATS = ("html", "xlsx")
+
+_lock = threading.Lock()
+_entries: "OrderedDict[Tuple[int, str], Tuple[str, bytes]]" = OrderedDict()
+_bytes = 0
+_stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "invalidated": 0}
+
+
+def etag(fingerprint: str, fmt: str) -> str:
+    return f'"{fingerprint}-{fmt}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for it)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (t.strip() for t in if_none_match.split(","))
+    return any((t[2:] if t.startswith("W/") else t) == tag for t in tags)
+
+
+def _drop(key: Tuple[int, str]):
+    global _bytes
+    _, body = _entries.pop(key)
+    _bytes -= len(body)
+
+
+def get(job_id: int, fmt: str, fingerprint: str) -> Optional[bytes]:
+    """Cached body for the job's current fingerprint, or None."""
+    key = (job_id, fmt)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return entry[1]
+        if entry is not None:
+            _drop(key)
+            _stats["invalidated"] += 1
+        _stats["misses"] += 1
+    return None
+
+
+def put(job_id: int, fmt: str, fingerprint: str, body: bytes):
+    global _bytes
+    if len(body) > min(REPORT_CACHE_MAX_ENTRY, REPORT_CACHE_BYTES):
+        return
+    key = (job_id, fmt)
+    with _lock:
+        if key in _entries:
+            _drop(key)
+        _entries[key] = (fingerprint, body)
+        _bytes += len(body)
+        _stats["stored"] += 1
+        while _bytes > REPORT_CACHE_BYTES:
+            _drop(next(iter(_entries)))
+            _stats["evicted"] += 1
+
+
+def invalidate(job_id: int):
+    """Drop every cached format of a job (e.g. right after it was re-ranked in this process)."""
+    with _lock:
+        for key in [k for k in _entries if k[0] == job_id]:
+            _drop(key)
+            _stats["invalidated"] += 1
+
+
+async def tee(job_id: int, fmt: str, fingerprint: str, body: AsyncIterator) -> AsyncIterator:
+    """
+    Pass a streamed report body through unchanged and cache it once it has been sent completely;
+    bodies larger than REPORT_CACHE_MAX_ENTRY and aborted streams are not kept.
+    """
+    parts, size = [], 0
+    async for piece in body:
+        if parts is not None:
+            data = piece.encode("utf-8") if isinstance(piece, str) else piece
+            size += len(data)
+            if size <= REPORT_CACHE_MAX_ENTRY:
+                parts.append(data)
+            else:
+                parts = None
+        yield piece
+    if parts is not None:
+        put(job_id, fmt, fingerprint, b"".join(parts))
+
+
+def stats() -> Dict[str, float]:
+    with _lock:
+        stats = dict(_stats, size=len(_entries), bytes=_bytes, max_bytes=REPORT_CACHE_BYTES)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = (stats["hits"] / lookups) if lookups else 0.0
+    return stats
@@ -0,0 +1,405 @@
+# app/reports.py
+import io
+import csv
+import tempfile
+import html as html_lib
+from typing import AsyncIterator, Dict, Iterator, List
+
+from .config import SKILL_BOOST_WEIGHT, REPORT_SPOOL_BYTES
+from .startup import lazy_import
+
+COLUMNS = [
+    "rank", "job_seeker_id", "name", "degree", "college", "graduation_year",
+    "resume_name", "extract_status", "score", "cosine_score", "skill_ratio", "matched_skills"
+]
+# fixed Excel column widths: constant-memory sheets must declare widths before any row is written
+XLSX_WIDTHS = {
+    "rank": 7, "job_seeker_id": 14, "name": 24, "degree": 20, "college": 30, "graduation_year": 16,
+    "resume_name": 28, "extract_status": 14, "score": 9, "cosine_score": 13, "skill_ratio": 12, "matched_skills": 50
+}
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def report_row(row: Dict) -> Dict:
+    """Normalize one report row (db.Q_REPORT_ROWS) into the report columns."""
+    return {
+        "rank": row.get("rank") or 0,
+        "job_seeker_id": row["job_seeker_id"],
+        "name": row.get("name") or "",
+        "degree": row.get("degree") or "",
+        "college": row.get("college") or "",
+        "graduation_year": row.get("graduation_year") or "",
+        "resume_name": row.get("resume_name") or "",
+        "extract_status": row.get("extract_status") or "",
+        "score": row.get("score"),
+        "cosine_score": row.get("cosine_score"),
+        "skill_ratio": row.get("skill_ratio"),
+        "matched_skills": ",".join(row.get("matched_skills") or [])
+    }
+
+
+# ---------- HTML ----------
+
+TD_BASE = "padding:8px 10px;border-bottom:1px solid #1f2937;font-size:12px;color:#e5e7eb;"
+TD_NUM = TD_BASE + "text-align:right;font-variant-numeric:tabular-nums;"
+# resumes scored on partial or no text stand out
+TD_WARN = TD_BASE + "color:#fbbf24;font-weight:500;"
+EMPTY_ROW_HTML = "<tr><td colspan='12' style='padding:14px 10px;text-align:center;color:#9ca3af;'>No applicants found.</td></tr>"
+
+
+def _html_row(r: Dict) -> str:
+    resume_link = f"http://localhost:5000/resume/{r['job_seeker_id']}"  # Node resume preview route
+    td_base, td_num = TD_BASE, TD_NUM
+    return (
+        "<tr>"
+        f"<td style='{td_num}'>{html_lib.escape(str(r.get('rank', '')))}</td>"
+        f"<td style='{td_base}'>{html_lib.escape(str(r.get('job_seeker_id', '')))}</td>"
+        f"<td style='{td_base}'>{html_lib.escape(r.get('name',''))}</td>"
+        f"<td style='{td_base}'>{html_lib.escape(r.get('degree',''))}</td>"
+        f"<td style='{td_base}'>{html_lib.escape(r.get('college',''))}</td>"
+        f"<td style='{td_num}'>{html_lib.escape(str(r.get('graduation_year','')))}</td>"
+        f"<td style='{td_base}'>"
+        f"<a href='{resume_link}' target='_blank' rel='noopener noreferrer' "
+        "style='color:#38bdf8;text-decoration:none;font-weight:500;'>"
+        f"{html_lib.escape(r.get('resume_name',''))}</a></td>"
+        f"<td style='{td_base if r.get('extract_status') in ('', 'ok') else TD_WARN}'>"
+        f"{html_lib.escape(r.get('extract_status',''))}</td>"
+        f"<td style='{td_num}'>{'' if r.get('score') is None else format(r.get('score'), '.4f')}</td>"
+        f"<td style='{td_num}'>{'' if r.get('cosine_score') is None else format(r.get('cosine_score'), '.4f')}</td>"
+        f"<td style='{td_num}'>{'' if r.get('skill_ratio') is None else format(r.get('skill_ratio'), '.4f')}</td>"
+        f"<td style='{td_base}'>{html_lib.escape(r.get('matched_skills',''))}</td>"
+        "</tr>"
+    )
+
+
+def _html_head(job_id: int, job: Dict) -> str:
+    job_title = html_lib.escape(job.get("job_title", ""))
+    job_role = html_lib.escape(job.get("job_role", ""))
+    # no render time here: the body is cached per report fingerprint, which already covers the ranking run
+    last_ranked = job["ranked_at"].strftime("%Y-%m-%d %H:%M:%S") if job.get("ranked_at") else "never"
+
+    return f"""
+    <!doctype html>
+    <html>
+    <head>
+      <meta charset="utf-8" />
+      <title>Job {job_id} - Applicant Report</title>
+      <meta name="viewport" content="width=device-width, initial-scale=1" />
+    </head>
+    <body style="margin:0;background:#020617;background-image:radial-gradient(circle at top,#1d4ed8 0,#020617 55%,#000000 100%);font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,'Helvetica Neue',Arial,sans-serif;color:#e5e7eb;">
+      <div style='min-height:100vh;display:flex;align-items:flex-start;justify-content:center;padding:16px;box-sizing:border-box;'>
+        <div style="width:100%;max-width:1200px;margin:16px auto;background:linear-gradient(145deg,#020617 0%,#020617 35%,#020617 100%);border-radius:18px;box-shadow:0 30px 80px rgba(15,23,42,0.9);border:1px solid rgba(148,163,184,0.35);padding:22px 20px 24px 20px;box-sizing:border-box;position:relative;overflow:hidden;">
+          
+          <!-- subtle glow accent -->
+          <div style='position:absolute;inset:auto -80px -120px auto;width:260px;height:260px;background:radial-gradient(circle,#1d4ed8 0,transparent 60%);opacity:0.25;pointer-events:none;'></div>
+
+          <!-- Header -->
+          <div style="position:relative;display:flex;flex-wrap:wrap;align-items:flex-start;justify-content:space-between;gap:16px;margin-bottom:18px;">
+            <div style="display:flex;flex-direction:column;gap:8px;min-width:0;">
+              <div style="display:flex;align-items:center;gap:10px;">
+                <div style="height:34px;width:34px;border-radius:9999px;background-image:linear-gradient(to bottom right,#3b82f6,#22c55e);display:flex;align-items:center;justify-content:center;font-weight:700;font-size:15px;color:white;box-shadow:0 15px 40px rgba(34,197,94,0.7);">
+                  AI
+                </div>
+                <div style="display:flex;flex-direction:column;">
+                  <span style="font-size:15px;font-weight:600;color:#f9fafb;">Applicant Report</span>
+                  <span style="font-size:11px;color:#9ca3af;">AI-powered resume ranking • TF-IDF • Skill matching</span>
+                </div>
+              </div>
+
+              <div style="margin-top:6px;">
+                <div style="font-size:19px;font-weight:600;color:#e5e7eb;margin-bottom:4px;word-break:break-word;">
+                  {job_title}
+                </div>
+                <div style="font-size:12px;color:#9ca3af;">
+                  Role:
+                  <span style="color:#e5e7eb;font-weight:500;"> {job_role}</span>
+                  <span style="color:#4b5563;"> &nbsp;•&nbsp; </span>
+                  Job ID:
+                  <span style="color:#e5e7eb;font-weight:500;"> {job_id}</span>
+                  <span style="color:#4b5563;"> &nbsp;•&nbsp; </span>
+                  Last ranked:
+                  <span style="color:#e5e7eb;font-weight:500;"> {last_ranked}</span>
+                </div>
+                <div style="font-size:11px;color:#6b7280;margin-top:4px;">
+                  Scoring model: cosine similarity + skill boost (weight = {SKILL_BOOST_WEIGHT})
+                </div>
+              </div>
+            </div>
+
+            <div style="display:flex;flex-direction:column;align-items:flex-end;gap:6px;min-width:220px;">
+              <div style="display:flex;flex-wrap:wrap;gap:8px;justify-content:flex-end;">
+                <a href="/api/jobs/{job_id}/report?download=1"
+                   style="display:inline-block;padding:8px 14px;border-radius:9999px;background-image:linear-gradient(to right,#6366f1,#22c55e);color:white;text-decoration:none;font-size:12px;font-weight:500;box-shadow:0 16px 35px rgba(79,70,229,0.7);">
+                  Download Excel
+                </a>
+                <a href="/api/jobs/{job_id}/report?download=csv"
+                   style="display:inline-block;padding:8px 14px;border-radius:9999px;background:#020617;color:#e5e7eb;text-decoration:none;font-size:12px;font-weight:500;border:1px solid rgba(148,163,184,0.7);">
+                  CSV
+                </a>
+                <a href="javascript:window.print()"
+                   style="display:inline-block;padding:8px 14px;border-radius:9999px;background:#020617;color:#e5e7eb;text-decoration:none;font-size:12px;font-weight:500;border:1px solid rgba(148,163,184,0.7);">
+                  Print
+                </a>
+              </div>
+              <div style="margin-top:4px;font-size:11px;color:#6b7280;text-align:right;max-width:230px;">
+                Tip: export to Excel for deeper analysis or sharing with your hiring team.
+              </div>
+            </div>
+          </div>
+
+          <!-- Table container -->
+          <div style="position:relative;margin-top:4px;border-radius:14px;background:rgba(15,23,42,0.96);border:1px solid rgba(55,65,81,0.9);overflow:hidden;">
+            <div style="max-height:75vh;overflow:auto;">
+              <table style="width:100%;border-collapse:collapse;font-size:12px;">
+                <thead>
+                  <tr>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:right;color:#e5e7eb;font-weight:600;white-space:nowrap;">Rank</th>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;white-space:nowrap;">Seeker ID</th>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;">Name</th>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;">Degree</th>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;">College</th>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:right;color:#e5e7eb;font-weight:600;white-space:nowrap;">Graduation Year</th>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;">Resume</th>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;">Extraction</th>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:right;color:#e5e7eb;font-weight:600;white-space:nowrap;">Score</th>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:right;color:#e5e7eb;font-weight:600;white-space:nowrap;">Cosine</th>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:right;color:#e5e7eb;font-weight:600;white-space:nowrap;">Skill ratio</th>
+                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;">Matched skills</th>
+                  </tr>
+                </thead>
+                <tbody>
+"""
+
+
+HTML_TAIL = """                </tbody>
+              </table>
+            </div>
+            <div style="padding:8px 12px;border-top:1px solid #1f2937;font-size:11px;color:#6b7280;display:flex;justify-content:space-between;align-items:center;flex-wrap:wrap;gap:6px;background:linear-gradient(to right,#020617,#020617);">
+              <span>Ranked candidates appear first. Unranked applicants are grouped at the bottom.</span>
+              <span style="color:#4b5563;">Powered by your FastAPI resume ranking engine.</span>
+            </div>
+          </div>
+        </div>
+      </div>
+    </body>
+    </html>
+    """
+
+
+class HtmlReport:
+    """HTML page: header first, then table rows chunk by chunk."""
+
+    def __init__(self, job_id: int, job: Dict):
+        self.job_id = job_id
+        self.job = job
+        self._empty = True
+
+    def head(self) -> Iterator[str]:
+        yield _html_head(self.job_id, self.job)
+
+    def rows(self, chunk: List[Dict]) -> Iterator[str]:
+        self._empty = False
+        yield "".join(_html_row(report_row(r)) for r in chunk)
+
+    def tail(self) -> Iterator[str]:
+        if self._empty:
+            yield EMPTY_ROW_HTML
+        yield HTML_TAIL
+
+    def close(self):
+        pass
+
+
+def _render(method, *args) -> List:
+    return list(method(*args))
+
+
+async def aiter_report(report, chunks: AsyncIterator[List[Dict]]) -> AsyncIterator:
+    """
+    Drive a report renderer (HtmlReport, CsvReport, XlsxReport, ParquetReport) over rows arriving
+    as async chunks (app/adb.py): every rendering step runs on the CPU executor, so the event loop only moves rows and bytes. The steps are continuations
+    of the request admitted by make_report's run_cpu, so they queue instead of being rejected.
+    """
+    from .offload import continue_cpu
+
+    try:
+        for piece in await continue_cpu(_render, report.head):
+            yield piece
+        async for chunk in chunks:
+            for piece in await continue_cpu(_render, report.rows, chunk):
+                yield piece
+        tail = iter(await continue_cpu(report.tail))
+        while True:
+            piece = await continue_cpu(next, tail, None)
+            if piece is None:
+                break
+            yield piece
+    finally:
+        report.close()
+        await chunks.aclose()
+
+
+def make_report(fmt: str, job_id: int, job: Dict):
+    """Renderer for "html", "csv", "xlsx" or "parquet"."""
+    if fmt == "csv":
+        return CsvReport()
+    if fmt == "xlsx":
+        return XlsxReport()
+    if fmt == "parquet":
+        return ParquetReport()
+    return HtmlReport(job_id, job)
+
+
+# ---------- CSV ----------
+
+class CsvReport:
+    def __init__(self):
+        self._buf = io.StringIO()
+        self._writer = csv.DictWriter(self._buf, fieldnames=COLUMNS)
+
+    def _drain(self) -> str:
+        text = self._buf.getvalue()
+        self._buf.seek(0)
+        self._buf.truncate(0)
+        return text
+
+    def head(self) -> Iterator[str]:
+        self._writer.writeheader()
+        yield self._drain()
+
+    def rows(self, chunk: List[Dict]) -> Iterator[str]:
+        for r in chunk:
+            self._writer.writerow(report_row(r))
+        yield self._drain()
+
+    def tail(self) -> Iterator[str]:
+        return iter(())
+
+    def close(self):
+        pass
+
+
+# ---------- XLSX ----------
+
+def _iter_file(fh, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    try:
+        fh.seek(0)
+        while True:
+            data = fh.read(chunk_size)
+            if not data:
+                break
+            yield data
+    finally:
+        fh.close()
+
+
+class XlsxReport:
+    """
+    Workbook written with xlsxwriter's constant_memory mode (one row buffered at a time)
+    into a spooled temp file, streamed at the end. The zip container is only complete once the
+    last row is written, so unlike the other formats bytes start flowing after that.
+    """
+
+    def __init__(self):
+        xlsxwriter = lazy_import("xlsxwriter")
+
+        self._out = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_BYTES)
+        self._workbook = xlsxwriter.Workbook(self._out, {"constant_memory": True, "in_memory": False})
+        self._worksheet = self._workbook.add_worksheet("report")
+        header_fmt = self._workbook.add_format({"bold": True})
+        for i, col in enumerate(COLUMNS):
+            self._worksheet.set_column(i, i, XLSX_WIDTHS[col])
+            self._worksheet.write_string(0, i, col, header_fmt)
+        self._row_idx = 0
+
+    def head(self) -> Iterator[bytes]:
+        return iter(())
+
+    def rows(self, chunk: List[Dict]) -> Iterator[bytes]:
+        for r in chunk:
+            self._row_idx += 1
+            values = report_row(r)
+            for i, col in enumerate(COLUMNS):
+                v = values[col]
+                if v is None or v == "":
+                    continue
+                self._worksheet.write(self._row_idx, i, v)
+        return iter(())
+
+    def tail(self) -> Iterator[bytes]:
+        self._workbook.close()
+        return _iter_file(self._out)
+
+    def close(self):
+        self._out.close()
+
+
+# ---------- Parquet ----------
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose bytes are drained by the streaming generator."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ParquetReport:
+    """One Parquet row group per chunk, flushed to the client as written."""
+
+    def __init__(self):
+        pa = lazy_import("pyarrow")
+        pq = lazy_import("pyarrow.parquet")
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("rank", pa.int32()), ("job_seeker_id", pa.int64()), ("name", pa.string()),
+            ("degree", pa.string()), ("college", pa.string()), ("graduation_year", pa.int32()),
+            ("resume_name", pa.string()), ("extract_status", pa.string()), ("score", pa.float64()), ("cosine_score", pa.float64()),
+            ("skill_ratio", pa.float64()), ("matched_skills", pa.string()),
+        ])
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self._schema)
+        self._closed = False
+
+    def head(self) -> Iterator[bytes]:
+        return iter(())
+
+    def rows(self, chunk: List[Dict]) -> Iterator[bytes]:
+        cols = {c: [] for c in COLUMNS}
+        for r in chunk:
+            values = report_row(r)
+            values["graduation_year"] = values["graduation_year"] or None
+            for c in COLUMNS:
+                cols[c].append(values[c])
+        self._writer.write_table(self._pa.Table.from_pydict(cols, schema=self._schema))
+        data = self._sink.drain()
+        if data:
+            yield data
+
+    def tail(self) -> Iterator[bytes]:
+        self.close()
+        yield self._sink.drain()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._writer.close()
@@ -1,298 +1,334 @@
 # app/routes.py
-import io
-import html as html_lib
-from datetime import datetime
+import asyncio
+import importlib.util
 
-from fastapi import APIRouter, HTTPException, Path as FPath, Request, Query
-from fastapi.responses import StreamingResponse, HTMLResponse
+from typing import List, Optional
 
-import pandas as pd
+from fastapi import APIRouter, HTTPException, Path as FPath, Request, Query
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse, Response
 
-from .db import fetch_job_and_applicants, update_ranks
-from .extractors import extract_text_from_bytes
-from .ranker import compute_scores_from_texts
-from .config import SKILL_BOOST_WEIGHT, TOP_K
+from . import reports, report_cache, metrics, adb, offload
+from .db import db_conn, pool_stats
+from .extractors import EXTRACTOR_VERSION, sandbox_stats
+from .config import TOP_K, HEALTH_DB_TIMEOUT
+from .text_cache import cache_stats
+from .pipeline import RefitRequired, score_application
+from .tasks import rank_tasks, QueueFullError
+from .startup import IMPORT_TIMES, warmup_state
+from .preprocess import lemma_cache_stats
+from .skills import skill_artifact_stats
+from .job_index import job_index, recommend_for_seeker
 
+# Every handler is `async def`: database reads on the event loop go through asyncpg (app/adb.py),
+# blocking pipeline work runs on the CPU executor (app/offload.py) and is cancelled when the client
+# disconnects, so /health and /metrics never queue behind a slow ranking or report.
 router = APIRouter()
 
+REPORT_FORMATS = {"1": "xlsx", "xlsx": "xlsx", "csv": "csv", "parquet": "parquet"}
+
+
+def _submit_rank_task(job_id: int, background: bool = False):
+    try:
+        return rank_tasks.submit(job_id, background)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+
+async def _await_task(request: Request, *tasks):
+    # the caller attaches to every task (rank_tasks.attach) right after submitting it, with no await
+    # in between: otherwise the last other waiter of a shared task could leave in the gap and cancel
+    # it. Shielded: a disconnect only drops this waiter; rank_tasks cancels a run once nobody waits.
+    try:
+        with metrics.stage("queue_wait"):
+            done = asyncio.gather(*(asyncio.wrap_future(task.future) for task in tasks))
+            await offload.cancel_on_disconnect(request, asyncio.shield(done))
+    finally:
+        for task in tasks:
+            rank_tasks.detach(task)
+    for task in tasks:
+        if task.status != "done" and not task.not_found:
+            raise HTTPException(status_code=500, detail=f"Ranking failed: {task.error}")
+
+
+async def _wait_for_task(request: Request, task, job_id: int):
+    """The rank response for `job_id` of `task`, which may be an employer batch that includes the job."""
+    rank_tasks.attach(task)
+    await _await_task(request, task)
+    result = None if task.not_found else task.result_for(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return result
+
 
 @router.post("/api/jobs/{job_id}/rank")
-def rank_job_resumes(job_id: int = FPath(..., description="Job ID to rank")):
+async def rank_job_resumes(
+    request: Request,
+    job_id: int = FPath(..., description="Job ID to rank"),
+    background: int = Query(0, description="Set to 1 to return a task id immediately instead of waiting"),
+):
     """
-    Rank all applicants for a job and persist ranks into job_applied.rank
+    Rank all applicants for a job and persist ranks into job_applied.rank.
+    Runs as a background task; concurrent requests for the same job share one task, which is
+    cancelled if every waiting client disconnects (background=1 tasks always run to the end).
     """
-    job, apps = fetch_job_and_applicants(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-    if not apps:
-        return {"success": True, "message": "No applicants to rank", "ranked": []}
-
-    # Build resume texts for scoring
-    resumes_texts = []
-    for row in apps:
-        jsid = row["job_seeker_id"]
-        rname = row.get("resume_name") or f"resume_{jsid}.pdf"
-        rdata = row.get("resume_data")
-        raw_text = ""
-        if rdata:
-            try:
-                bytes_data = rdata.tobytes() if isinstance(rdata, memoryview) else bytes(rdata)
-                raw_text = extract_text_from_bytes(rname, bytes_data)
-            except Exception as e:
-                print(f"[WARN] failed extracting resume for job_seeker_id={jsid}: {e}")
-                raw_text = ""
-        resumes_texts.append({"job_seeker_id": jsid, "resume_name": rname, "text": raw_text})
-
-    # Compute scores
-    jd_text = job.get("job_description") or ""
-    ranked = compute_scores_from_texts(jd_text, resumes_texts, cfg_skill_weight=SKILL_BOOST_WEIGHT)
-
-    # Persist ranks: best -> 1, next -> 2, ...
-    ordered_jsids = [int(r["job_seeker_id"]) for r in ranked]
-    update_ranks(job_id, ordered_jsids)
-
-    # Prepare top-K response
-    top_k = min(TOP_K, len(ranked))
-    response_rows = []
-    for i in range(top_k):
-        r = ranked[i]
-        response_rows.append({
-            "rank": i + 1,
-            "job_seeker_id": r["job_seeker_id"],
-            "resume_name": r["resume_name"],
-            "score": r["score"],
-            "cosine_score": r["cosine_score"],
-            "skill_ratio": r["skill_ratio"],
-            "matched_skills": r["matched_skills"][:10]
+    background = bool(background and int(background) == 1)
+    task, coalesced = _submit_rank_task(job_id, background)
+    if background:
+        return JSONResponse(status_code=202, content={
+            "success": True,
+            "task_id": task.task_id,
+            "coalesced": coalesced,
+            "status_url": f"/api/rank-tasks/{task.task_id}",
         })
 
-    return {"success": True, "job_id": job_id, "ranked_count": len(ranked), "top": response_rows}
+    with metrics.collect_timings() as timings:
+        result = await _wait_for_task(request, task, job_id)
+    return JSONResponse(content=result, headers=metrics.server_timing({**task.timings, **timings}))
+
+
+@router.post("/api/employers/{employer_id}/rank")
+async def rank_employer(
+    request: Request,
+    employer_id: int = FPath(..., description="Employer whose jobs should be ranked"),
+    job_ids: Optional[List[int]] = Query(None, description="Only rank these jobs (repeat the parameter); default all"),
+):
+    """
+    Rank every job of an employer (or the selected ones) in one pass. Resumes shared by
+    several jobs are extracted once and all ranks are persisted in a single transaction.
+    Runs as one rank task registered under each job: jobs already being ranked are left to
+    their running task, and a /rank request for one of the batch's jobs waits for the batch.
+    """
+    with metrics.collect_timings() as timings:
+        ids = await adb.fetch_employer_job_ids(employer_id, job_ids)
+    if not ids:
+        raise HTTPException(status_code=404, detail="No jobs found for employer")
+    try:
+        _, by_job = rank_tasks.submit_employer(employer_id, ids)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+    tasks = {task.task_id: task for task in by_job.values()}
+    for task in tasks.values():
+        rank_tasks.attach(task)
+    with metrics.collect_timings() as waited:
+        await _await_task(request, *tasks.values())
+    # a job deleted after the id lookup has no response
+    results = {job_id: None if task.not_found else task.result_for(job_id) for job_id, task in by_job.items()}
+    jobs = [dict(result, job_id=job_id) for job_id, result in results.items() if result is not None]
+    if not jobs:
+        raise HTTPException(status_code=404, detail="No jobs found for employer")
+    for task in tasks.values():
+        for stage, ms in task.timings.items():
+            timings[stage] = timings.get(stage, 0.0) + ms
+    timings.update(waited)
+    content = {"success": True, "employer_id": employer_id, "jobs": jobs}
+    return JSONResponse(content=content, headers=metrics.server_timing(timings))
+
+
+@router.get("/api/rank-tasks/{task_id}")
+async def get_rank_task(task_id: str = FPath(..., description="Task id returned by POST /api/jobs/{job_id}/rank")):
+    """
+    Status, per-stage progress and ETA of a background ranking task.
+    """
+    task = rank_tasks.get(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task.to_dict()
+
+
+async def _refit_for_application(request: Request, job_id: int, seeker_id: int):
+    """
+    Re-rank the job through rank_tasks, then return the application's persisted row.
+    """
+    task, coalesced = _submit_rank_task(job_id)
+    await _wait_for_task(request, task, job_id)
+    row = await adb.fetch_ranked_application(job_id, seeker_id)
+    if row is None and coalesced:
+        # the shared task may have read the applicants before this application was stored
+        task, _ = _submit_rank_task(job_id)
+        await _wait_for_task(request, task, job_id)
+        row = await adb.fetch_ranked_application(job_id, seeker_id)
+    return dict(row, mode="full_refit", matched_skills=row["matched_skills"] or []) if row else None
+
+
+@router.post("/api/jobs/{job_id}/applicants/{seeker_id}/score")
+async def score_new_applicant(
+    request: Request,
+    job_id: int = FPath(..., description="Job ID the application belongs to"),
+    seeker_id: int = FPath(..., description="Job seeker whose application should be scored"),
+):
+    """
+    Score a single application against the job's stored TF-IDF state and slot it into
+    the existing ranking. When the stored state is missing or has drifted the job is
+    re-ranked instead, as a rank task shared with any other request for the same job.
+    """
+    def run():
+        with db_conn() as conn:
+            return score_application(job_id, seeker_id, conn=conn)
+
+    try:
+        job, result = await offload.cancel_on_disconnect(request, offload.run_cpu(run))
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+    except RefitRequired:
+        result = await _refit_for_application(request, job_id, seeker_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Application not found")
+
+    return {
+        "success": True,
+        "job_id": job_id,
+        "mode": result["mode"],
+        "rank": result["rank"],
+        "job_seeker_id": result["job_seeker_id"],
+        "resume_name": result["resume_name"],
+        "extract_status": result["extract_status"],
+        "score": result["score"],
+        "cosine_score": result["cosine_score"],
+        "skill_ratio": result["skill_ratio"],
+        "matched_skills": result["matched_skills"][:10]
+    }
 
 
 @router.get("/api/jobs/{job_id}/report")
-def get_job_report(
+async def get_job_report(
     request: Request,
     job_id: int = FPath(..., description="Job ID to create report for"),
-    download: int = Query(0, description="Set to 1 to download Excel file instead of HTML view"),
+    download: str = Query("0", description="1 or xlsx for Excel, csv, parquet; anything else renders HTML"),
+    recompute: int = Query(0, description="Set to 1 to re-run the ranking before building the report"),
 ):
     """
-    If ?download=1 return an Excel file (StreamingResponse).
+    Report built from the scores persisted by the last ranking run, streamed chunk by chunk
+    (rows read with asyncpg, rendered on the CPU executor; a disconnect stops both).
+    If ?recompute=1 the job is ranked again first.
+    If ?download=1|xlsx|csv|parquet return a file in that format.
     Otherwise render a friendly HTML page showing the report (no download).
+    The ETag is the job's report fingerprint: If-None-Match gets a 304 while nothing changed,
+    and HTML/XLSX bodies are served from report_cache until it does.
     """
-    job, apps = fetch_job_and_applicants(job_id)
+    fmt = REPORT_FORMATS.get((download or "").lower(), "html")
+    if fmt == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    timings = {}
+    with metrics.collect_timings() as own:
+        if recompute and int(recompute) == 1:
+            task, _ = _submit_rank_task(job_id)
+            await _wait_for_task(request, task, job_id)
+            timings.update(task.timings)
+        job = await adb.fetch_report_job(job_id)
+    timings.update(own)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    # Build resume texts (extract text) then compute scores (same logic as ranking)
-    resumes_texts = []
-    for row in apps:
-        jsid = row["job_seeker_id"]
-        rname = row.get("resume_name") or f"resume_{jsid}.pdf"
-        rdata = row.get("resume_data")
-        raw_text = ""
-        if rdata:
-            try:
-                bytes_data = rdata.tobytes() if isinstance(rdata, memoryview) else bytes(rdata)
-                raw_text = extract_text_from_bytes(rname, bytes_data)
-            except Exception as e:
-                print(f"[WARN] failed extracting resume for job_seeker_id={jsid}: {e}")
-                raw_text = ""
-        resumes_texts.append({"job_seeker_id": jsid, "resume_name": rname, "text": raw_text})
-
-    jd_text = job.get("job_description") or ""
-    ranked = compute_scores_from_texts(jd_text, resumes_texts, cfg_skill_weight=SKILL_BOOST_WEIGHT)
-
-    # Map job_seeker_id -> computed score row for easy lookup
-    score_map = {r["job_seeker_id"]: r for r in ranked}
-
-    # Build rows (include stored rank from DB and computed metrics)
-    rows = []
-    for row in apps:
-        jsid = row["job_seeker_id"]
-        score_row = score_map.get(jsid, {})
-        rows.append({
-            "rank": row.get("rank", 0),
-            "job_seeker_id": jsid,
-            "name": row.get("name") or "",
-            "degree": row.get("degree") or "",
-            "college": row.get("college") or "",
-            "graduation_year": row.get("graduation_year") or "",
-            "resume_name": row.get("resume_name") or "",
-            "score": score_row.get("score"),
-            "cosine_score": score_row.get("cosine_score"),
-            "skill_ratio": score_row.get("skill_ratio"),
-            "matched_skills": ",".join(score_row.get("matched_skills", []))
-        })
+    fingerprint = job["fingerprint"]
+    tag = report_cache.etag(fingerprint, fmt)
+    # clients may keep the body but must revalidate, which costs them one header query
+    headers = {"ETag": tag, "Cache-Control": "private, no-cache", **metrics.server_timing(timings)}
+    if report_cache.etag_matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers=headers)
+
+    media_type = {"html": "text/html; charset=utf-8", "csv": "text/csv; charset=utf-8",
+                  "parquet": "application/vnd.apache.parquet"}.get(fmt, reports.XLSX_MEDIA_TYPE)
+    if fmt != "html":
+        headers["Content-Disposition"] = f'attachment; filename="job_{job_id}_report.{fmt}"'
+    cacheable = fmt in report_cache.CACHED_FORMATS
+    cached = report_cache.get(job_id, fmt, fingerprint) if cacheable else None
+    if cached is not None:
+        return Response(cached, media_type=media_type, headers=headers)
+
+    # the body reads rows through its own pooled connection, released when the stream ends or is aborted
+    report = await offload.run_cpu(reports.make_report, fmt, job_id, job)
+    body = reports.aiter_report(report, adb.iter_report_chunks(job_id))
+    if cacheable:
+        body = report_cache.tee(job_id, fmt, fingerprint, body)
+    # headers go out before the body, so streamed row reads are not part of Server-Timing
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
 
-    # If download requested -> return Excel (StreamingResponse)
-    if download and int(download) == 1:
-        # Construct DataFrame in preferred column order
-        df = pd.DataFrame(rows, columns=[
-            "rank", "job_seeker_id", "name", "degree", "college", "graduation_year",
-            "resume_name", "score", "cosine_score", "skill_ratio", "matched_skills"
-        ])
-        # sort by rank (rank 0 at bottom), then by score desc
-        df["rank_sort"] = df["rank"].apply(lambda x: x if (x and x > 0) else 10 ** 9)
-        df = df.sort_values(by=["rank_sort", "score"], ascending=[True, False]).drop(columns=["rank_sort"])
-
-        buf = io.BytesIO()
-        with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
-            df.to_excel(writer, index=False, sheet_name="report")
-            workbook = writer.book
-            worksheet = writer.sheets["report"]
-            for i, col in enumerate(df.columns):
-                col_width = max(df[col].astype(str).map(len).max(), len(col)) + 2
-                worksheet.set_column(i, i, min(col_width, 50))
-        buf.seek(0)
-        filename = f"job_{job_id}_report.xlsx"
-        return StreamingResponse(
-            buf,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-        )
-
-    # Otherwise render HTML report (inline viewing)
-    # Sort rows: ranked ascending, unranked last, then by score desc
-    def sort_key(r):
-        rank = r.get("rank") or 0
-        rank_sort = rank if (rank and rank > 0) else 10 ** 9
-        score = r.get("score") or 0.0
-        return (rank_sort, -score)
-
-    rows_sorted = sorted(rows, key=sort_key)
-
-    # Build HTML table rows with inline styles
-    table_rows_html = []
-    td_base = "padding:8px 10px;border-bottom:1px solid #1f2937;font-size:12px;color:#e5e7eb;"
-    td_num = td_base + "text-align:right;font-variant-numeric:tabular-nums;"
-    for r in rows_sorted:
-        resume_link = f"http://localhost:5000/resume/{r['job_seeker_id']}"  # Node resume preview route
-        table_rows_html.append(
-            "<tr>"
-            f"<td style='{td_num}'>{html_lib.escape(str(r.get('rank', '')))}</td>"
-            f"<td style='{td_base}'>{html_lib.escape(str(r.get('job_seeker_id', '')))}</td>"
-            f"<td style='{td_base}'>{html_lib.escape(r.get('name',''))}</td>"
-            f"<td style='{td_base}'>{html_lib.escape(r.get('degree',''))}</td>"
-            f"<td style='{td_base}'>{html_lib.escape(r.get('college',''))}</td>"
-            f"<td style='{td_num}'>{html_lib.escape(str(r.get('graduation_year','')))}</td>"
-            f"<td style='{td_base}'>"
-            f"<a href='{resume_link}' target='_blank' rel='noopener noreferrer' "
-            "style='color:#38bdf8;text-decoration:none;font-weight:500;'>"
-            f"{html_lib.escape(r.get('resume_name',''))}</a></td>"
-            f"<td style='{td_num}'>{'' if r.get('score') is None else format(r.get('score'), '.4f')}</td>"
-            f"<td style='{td_num}'>{'' if r.get('cosine_score') is None else format(r.get('cosine_score'), '.4f')}</td>"
-            f"<td style='{td_num}'>{'' if r.get('skill_ratio') is None else format(r.get('skill_ratio'), '.4f')}</td>"
-            f"<td style='{td_base}'>{html_lib.escape(r.get('matched_skills',''))}</td>"
-            "</tr>"
-        )
-
-    job_title = html_lib.escape(job.get("job_title", ""))
-    job_role = html_lib.escape(job.get("job_role", ""))
-    generated_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%SZ")
-
-    html_content = f"""
-    <!doctype html>
-    <html>
-    <head>
-      <meta charset="utf-8" />
-      <title>Job {job_id} - Applicant Report</title>
-      <meta name="viewport" content="width=device-width, initial-scale=1" />
-    </head>
-    <body style="margin:0;background:#020617;background-image:radial-gradient(circle at top,#1d4ed8 0,#020617 55%,#000000 100%);font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,'Helvetica Neue',Arial,sans-serif;color:#e5e7eb;">
-      <div style='min-height:100vh;display:flex;align-items:flex-start;justify-content:center;padding:16px;box-sizing:border-box;'>
-        <div style="width:100%;max-width:1200px;margin:16px auto;background:linear-gradient(145deg,#020617 0%,#020617 35%,#020617 100%);border-radius:18px;box-shadow:0 30px 80px rgba(15,23,42,0.9);border:1px solid rgba(148,163,184,0.35);padding:22px 20px 24px 20px;box-sizing:border-box;position:relative;overflow:hidden;">
-          
-          <!-- subtle glow accent -->
-          <div style='position:absolute;inset:auto -80px -120px auto;width:260px;height:260px;background:radial-gradient(circle,#1d4ed8 0,transparent 60%);opacity:0.25;pointer-events:none;'></div>
-
-          <!-- Header -->
-          <div style="position:relative;display:flex;flex-wrap:wrap;align-items:flex-start;justify-content:space-between;gap:16px;margin-bottom:18px;">
-            <div style="display:flex;flex-direction:column;gap:8px;min-width:0;">
-              <div style="display:flex;align-items:center;gap:10px;">
-                <div style="height:34px;width:34px;border-radius:9999px;background-image:linear-gradient(to bottom right,#3b82f6,#22c55e);display:flex;align-items:center;justify-content:center;font-weight:700;font-size:15px;color:white;box-shadow:0 15px 40px rgba(34,197,94,0.7);">
-                  AI
-                </div>
-                <div style="display:flex;flex-direction:column;">
-                  <span style="font-size:15px;font-weight:600;color:#f9fafb;">Applicant Report</span>
-                  <span style="font-size:11px;color:#9ca3af;">AI-powered resume ranking • TF-IDF • Skill matching</span>
-                </div>
-              </div>
-
-              <div style="margin-top:6px;">
-                <div style="font-size:19px;font-weight:600;color:#e5e7eb;margin-bottom:4px;word-break:break-word;">
-                  {job_title}
-                </div>
-                <div style="font-size:12px;color:#9ca3af;">
-                  Role:
-                  <span style="color:#e5e7eb;font-weight:500;"> {job_role}</span>
-                  <span style="color:#4b5563;"> &nbsp;•&nbsp; </span>
-                  Job ID:
-                  <span style="color:#e5e7eb;font-weight:500;"> {job_id}</span>
-                  <span style="color:#4b5563;"> &nbsp;•&nbsp; </span>
-                  Generated:
-                  <span style="color:#e5e7eb;font-weight:500;"> {generated_at}</span>
-                </div>
-                <div style="font-size:11px;color:#6b7280;margin-top:4px;">
-                  Scoring model: cosine similarity + skill boost (weight = {SKILL_BOOST_WEIGHT})
-                </div>
-              </div>
-            </div>
-
-            <div style="display:flex;flex-direction:column;align-items:flex-end;gap:6px;min-width:220px;">
-              <div style="display:flex;flex-wrap:wrap;gap:8px;justify-content:flex-end;">
-                <a href="/api/jobs/{job_id}/report?download=1"
-                   style="display:inline-block;padding:8px 14px;border-radius:9999px;background-image:linear-gradient(to right,#6366f1,#22c55e);color:white;text-decoration:none;font-size:12px;font-weight:500;box-shadow:0 16px 35px rgba(79,70,229,0.7);">
-                  Download Excel
-                </a>
-                <a href="javascript:window.print()"
-                   style="display:inline-block;padding:8px 14px;border-radius:9999px;background:#020617;color:#e5e7eb;text-decoration:none;font-size:12px;font-weight:500;border:1px solid rgba(148,163,184,0.7);">
-                  Print
-                </a>
-              </div>
-              <div style="margin-top:4px;font-size:11px;color:#6b7280;text-align:right;max-width:230px;">
-                Tip: export to Excel for deeper analysis or sharing with your hiring team.
-              </div>
-            </div>
-          </div>
-
-          <!-- Table container -->
-          <div style="position:relative;margin-top:4px;border-radius:14px;background:rgba(15,23,42,0.96);border:1px solid rgba(55,65,81,0.9);overflow:hidden;">
-            <div style="max-height:75vh;overflow:auto;">
-              <table style="width:100%;border-collapse:collapse;font-size:12px;">
-                <thead>
-                  <tr>
-                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:right;color:#e5e7eb;font-weight:600;white-space:nowrap;">Rank</th>
-                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;white-space:nowrap;">Seeker ID</th>
-                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;">Name</th>
-                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;">Degree</th>
-                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;">College</th>
-                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:right;color:#e5e7eb;font-weight:600;white-space:nowrap;">Graduation Year</th>
-                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;">Resume</th>
-                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:right;color:#e5e7eb;font-weight:600;white-space:nowrap;">Score</th>
-                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:right;color:#e5e7eb;font-weight:600;white-space:nowrap;">Cosine</th>
-                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:right;color:#e5e7eb;font-weight:600;white-space:nowrap;">Skill ratio</th>
-                    <th style="position:sticky;top:0;z-index:1;padding:8px 10px;background:#020617;border-bottom:1px solid #1f2937;text-align:left;color:#e5e7eb;font-weight:600;">Matched skills</th>
-                  </tr>
-                </thead>
-                <tbody>
-                  {"".join(table_rows_html) if table_rows_html else "<tr><td colspan='11' style='padding:14px 10px;text-align:center;color:#9ca3af;'>No applicants found.</td></tr>"}
-                </tbody>
-              </table>
-            </div>
-            <div style="padding:8px 12px;border-top:1px solid #1f2937;font-size:11px;color:#6b7280;display:flex;justify-content:space-between;align-items:center;flex-wrap:wrap;gap:6px;background:linear-gradient(to right,#020617,#020617);">
-              <span>Ranked candidates appear first. Unranked applicants are grouped at the bottom.</span>
-              <span style="color:#4b5563;">Powered by your FastAPI resume ranking engine.</span>
-            </div>
-          </div>
-        </div>
-      </div>
-    </body>
-    </html>
+@router.get("/api/seekers/{seeker_id}/recommended-jobs")
+async def recommended_jobs(
+    request: Request,
+    seeker_id: int = FPath(..., description="Job seeker to recommend jobs for"),
+    k: int = Query(TOP_K, ge=1, le=100, description="Number of jobs to return"),
+    exclude_applied: int = Query(1, description="Set to 0 to include jobs the seeker already applied to"),
+):
+    """
+    Best matching jobs for a seeker's resume: shortlist by cosine over the job index's hashed
+    term counts (no IDF weighting), re-ranked by blending that cosine with skill overlap
+    the way applicant ranking blends its TF-IDF cosine.
     """
+    def run():
+        with db_conn() as conn:
+            return recommend_for_seeker(seeker_id, k, exclude_applied=bool(exclude_applied), conn=conn)
 
-    return HTMLResponse(content=html_content, status_code=200)
+    with metrics.collect_timings() as timings:
+        jobs = await offload.cancel_on_disconnect(request, offload.run_cpu(run))
+    if jobs is None:
+        raise HTTPException(status_code=404, detail="Job seeker not found")
+    return JSONResponse(content={"success": True, "job_seeker_id": seeker_id, "jobs": jobs},
+                        headers=metrics.server_timing(timings))
+
+
+@router.post("/api/job-index/refresh")
+async def refresh_job_index(
+    job_ids: Optional[List[int]] = Query(None, description="Only re-check these jobs (repeat the parameter); default all"),
+):
+    """
+    Pick up added, edited and deleted jobs in the recommendation index. Call with the
+    job id after creating or editing a job; without ids every job's fingerprint is checked.
+    """
+    changes = await offload.run_cpu(job_index.refresh, job_ids)
+    return {"success": True, **changes, "index": job_index.stats()}
+
+
+@router.post("/api/text-cache/invalidate")
+async def invalidate_cached_texts(
+    all_versions: int = Query(0, description="Set to 1 to drop every cached text, not only stale extractor versions"),
+):
+    """
+    Remove cached resume texts from previous extractor versions (or all of them).
+    """
+    deleted = await adb.invalidate_text_cache(None if all_versions else EXTRACTOR_VERSION)
+    return {"success": True, "deleted": deleted, "extractor_version": EXTRACTOR_VERSION}
+
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    """
+    Stage latency histograms, document/byte/failure counters and cache statistics
+    in the Prometheus text exposition format.
+    """
+    pool = pool_stats()
+    tasks = rank_tasks.stats()
+    cpu = offload.stats()
+    body = metrics.render(
+        caches={"resume_text": cache_stats(), "lemma": lemma_cache_stats(), "skill_artifact": skill_artifact_stats(),
+                "report": report_cache.stats()},
+        gauges={
+            "ranking_db_pool_in_use": ("Database connections currently checked out.", pool["in_use"]),
+            "ranking_db_pool_peak_in_use": ("Most database connections checked out at once.", pool["peak_in_use"]),
+            "ranking_rank_tasks_active": ("Ranking tasks queued or running.", tasks["active"]),
+            "ranking_rank_tasks_running": ("Ranking tasks currently running.", tasks["running"]),
+            "ranking_cpu_executor_running": ("Offloaded CPU-bound calls currently running.", cpu["running"]),
+            "ranking_cpu_executor_waiting": ("Offloaded CPU-bound calls waiting for a worker.", cpu["waiting"]),
+            "ranking_adb_pool_in_use": ("asyncpg connections currently checked out.", adb.pool_stats().get("in_use", 0)),
+            "ranking_job_index_jobs": ("Jobs in the recommendation index.", job_index.stats()["jobs"]),
+            "ranking_report_cache_bytes": ("Bytes of rendered reports held in memory.", report_cache.stats()["bytes"]),
+        },
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @router.get("/health")
-def health():
-    return {"status": "ok"}
+async def health():
+    # runs on the event loop with in-memory stats plus a bounded DB ping, so it answers under full load
+    warmup = warmup_state()
+    body = {"status": warmup["status"], "warmup": warmup, "import_times": IMPORT_TIMES,
+            "db": await adb.ping(HEALTH_DB_TIMEOUT),
+            "text_cache": cache_stats(), "db_pool": pool_stats(), "async_db_pool": adb.pool_stats(),
+            "lemma_cache": lemma_cache_stats(), "skill_artifacts": skill_artifact_stats(),
+            "rank_tasks": rank_tasks.stats(), "cpu_executor": offload.stats(), "job_index": job_index.stats(),
+            "report_cache": report_cache.stats(), "extract_sandbox": sandbox_stats()}
+    # not healthy until warm-up has finished, so load balancers hold traffic back
+    return JSONResponse(status_code=200 if warmup["status"] == "ok" else 503, content=body)
@@ -0,0 +1,252 @@
+# app/sandbox.py
+import time
+import threading
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Outcomes of SandboxPool.map, one per item: ("ok", result), ("timed_out", None) or ("crashed", reason)
+OK, TIMED_OUT, CRASHED = "ok", "timed_out", "crashed"
+# a new worker must report ready (interpreter started, `warmup` done) within this many seconds
+START_TIMEOUT = 60.0
+
+
+def _limit_memory(memory_bytes: int):
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    except (ImportError, ValueError, OSError) as e:
+        print(f"[WARN] sandbox worker runs without a memory limit: {e}")
+
+
+def _worker_main(conn, target: Callable, memory_bytes: Optional[int], warmup: Optional[Callable]):
+    if memory_bytes:
+        _limit_memory(memory_bytes)
+    if warmup is not None:
+        warmup()
+    conn.send((OK, None))  # ready: start-up cost never counts against an item's deadline
+    while True:
+        try:
+            item = conn.recv()
+        except (EOFError, OSError):
+            return
+        if item is None:
+            return
+        try:
+            outcome = (OK, target(item))
+        except MemoryError:
+            outcome = (CRASHED, "memory limit exceeded")
+        except Exception as e:
+            outcome = (CRASHED, f"{type(e).__name__}: {e}")
+        conn.send(outcome)
+
+
+class _Worker:
+    def __init__(self, ctx, target: Callable, memory_bytes: Optional[int], warmup: Optional[Callable]):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, target, memory_bytes, warmup),
+                                   name="sandbox", daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+        self.index: Optional[int] = None  # item being processed; None while starting
+        self.deadline = 0.0
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+            self.process.join(1.0)
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+class SandboxPool:
+    """
+    Long-lived worker processes that run `target(item)` one item at a time. Every call has a
+    wall-clock deadline: a worker still busy when it passes is killed (SIGKILL, so even C code
+    stuck in a loop stops) and replaced, and its item reports TIMED_OUT. Workers run under an
+    address-space limit of `memory_bytes`, so a runaway parse fails with MemoryError (or the
+    worker dies) instead of taking the server down. `warmup` runs once in each new worker
+    (e.g. to import the parsers). `target`, `warmup` and items must be picklable.
+    """
+
+    def __init__(self, target: Callable, workers: int, timeout: float, memory_bytes: Optional[int] = None,
+                 warmup: Optional[Callable] = None):
+        self.target = target
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.memory_bytes = memory_bytes
+        self.warmup = warmup
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._lock = threading.Lock()
+        self._idle: List[_Worker] = []
+        self._stats = {"items": 0, "timed_out": 0, "crashed": 0, "spawned": 0, "killed": 0}
+
+    def _spawn(self) -> _Worker:
+        with self._lock:
+            self._stats["spawned"] += 1
+        return _Worker(self._ctx, self.target, self.memory_bytes, self.warmup)
+
+    def _kill(self, worker: _Worker):
+        worker.kill()
+        with self._lock:
+            self._stats["killed"] += 1
+
+    def _checkout(self, block: bool) -> Optional[_Worker]:
+        # concurrent map() calls share the workers: a call waits for one and takes more if free
+        if not self._slots.acquire(blocking=block):
+            return None
+        with self._lock:
+            worker = self._idle.pop() if self._idle else None
+        try:
+            return worker if worker is not None and worker.process.is_alive() else self._spawn()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _checkin(self, worker: Optional[_Worker]):
+        if worker is not None:
+            with self._lock:
+                self._idle.append(worker)
+        self._slots.release()
+
+    def map(self, items: List[Any]) -> List[Tuple[str, Any]]:
+        """
+        Outcomes for `items`, in order; a slow, crashing or oversized item only affects itself.
+        Raises RuntimeError when a worker cannot be started at all.
+        """
+        if not items:
+            return []
+        outcomes: List[Optional[Tuple[str, Any]]] = [None] * len(items)
+        workers = [self._checkout(block=True)]
+        while len(workers) < min(len(items), self.workers):
+            worker = self._checkout(block=False)
+            if worker is None:
+                break
+            workers.append(worker)
+
+        pending = deque(range(len(items)))
+        free: List[_Worker] = []
+        busy: Dict[Any, _Worker] = {}
+
+        def park(worker: _Worker):
+            if worker.ready:
+                free.append(worker)
+            else:
+                worker.index, worker.deadline = None, time.monotonic() + START_TIMEOUT
+                busy[worker.conn] = worker
+
+        def replace(worker: _Worker):
+            self._kill(worker)
+            fresh = workers[workers.index(worker)] = self._spawn()
+            park(fresh)
+
+        for worker in workers:
+            park(worker)
+        try:
+            while pending or busy:
+                while pending and free:
+                    worker, i = free.pop(), pending.popleft()
+                    worker.index, worker.deadline = i, time.monotonic() + self.timeout
+                    try:
+                        worker.conn.send(items[i])
+                        busy[worker.conn] = worker
+                    except OSError as e:
+                        outcomes[i] = (CRASHED, f"worker unavailable: {e}")
+                        replace(worker)
+                if not busy:
+                    continue
+
+                soonest = min(w.deadline for w in busy.values())
+                for conn in wait(list(busy), max(0.0, soonest - time.monotonic())):
+                    worker = busy.pop(conn)
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError):
+                        worker.process.join(1.0)
+                        if worker.index is None:
+                            busy[conn] = worker  # reaped in `finally`
+                            raise RuntimeError(f"sandbox worker exited during start-up (code {worker.process.exitcode})")
+                        outcomes[worker.index] = (CRASHED, f"worker exited with code {worker.process.exitcode}")
+                        replace(worker)
+                        continue
+                    if worker.index is None:
+                        worker.ready = True
+                    else:
+                        outcomes[worker.index] = message
+                    free.append(worker)
+
+                now = time.monotonic()
+                for conn, worker in list(busy.items()):
+                    if worker.deadline > now:
+                        continue
+                    del busy[conn]
+                    if worker.index is None:
+                        busy[conn] = worker  # reaped in `finally`
+                        raise RuntimeError(f"sandbox worker did not start within {START_TIMEOUT}s")
+                    outcomes[worker.index] = (TIMED_OUT, None)
+                    replace(worker)
+        finally:
+            # workers interrupted mid-item or mid-start (e.g. by an exception here) cannot be reused
+            for worker in busy.values():
+                self._kill(worker)
+                workers[workers.index(worker)] = None
+            for worker in workers:
+                self._checkin(worker)
+
+        with self._lock:
+            self._stats["items"] += len(items)
+            for kind, _ in outcomes:
+                if kind != OK:
+                    self._stats[kind] += 1
+        return outcomes
+
+    def start(self) -> int:
+        """
+        Start every idle slot's worker now instead of on first use and wait until they are ready
+        (interpreter up, `warmup` done). Returns how many workers are ready.
+        """
+        workers = []
+        while len(workers) < self.workers:
+            worker = self._checkout(block=False)
+            if worker is None:
+                break
+            workers.append(worker)
+        deadline = time.monotonic() + START_TIMEOUT
+        try:
+            for i, worker in enumerate(workers):
+                if not worker.ready:
+                    try:
+                        if worker.conn.poll(max(0.0, deadline - time.monotonic())):
+                            worker.conn.recv()
+                            worker.ready = True
+                    except (EOFError, OSError):
+                        pass
+                if not worker.ready:
+                    self._kill(worker)
+                    workers[i] = None
+        finally:
+            for worker in workers:
+                self._checkin(worker)
+        return sum(worker is not None for worker in workers)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, workers=self.workers, idle=len(self._idle))
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
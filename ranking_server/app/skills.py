@@ -0,0 +1,102 @@
+# app/skills.py
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .preprocess import TOKEN_RE, preprocess_text, derive_skills_from_jd
+from .config import SKILL_ARTIFACT_CACHE_SIZE
+
+try:
+    import ahocorasick  # pyahocorasick, optional
+except ImportError:
+    ahocorasick = None
+
+
+class SkillMatcher:
+    """
+    Finds every skill whose token sequence occurs as a substring of a preprocessed text,
+    with the same semantics as preprocess.match_skills_preprocessed. Skill patterns are
+    normalized once; with pyahocorasick installed all of them are found in a single pass
+    over the text, otherwise each pattern is a C-level substring search.
+    """
+
+    def __init__(self, skills: List[str]):
+        self._by_pattern: Dict[str, List[str]] = {}
+        for skill in skills:
+            s = skill.lower().strip()
+            if not s:
+                continue
+            pattern = " ".join(TOKEN_RE.findall(s))
+            if pattern:
+                self._by_pattern.setdefault(pattern, []).append(skill)
+
+        self._automaton = None
+        if ahocorasick is not None and self._by_pattern:
+            automaton = ahocorasick.Automaton()
+            for pattern in self._by_pattern:
+                automaton.add_word(pattern, pattern)
+            automaton.make_automaton()
+            self._automaton = automaton
+
+    def match(self, pre: str) -> List[str]:
+        if not self._by_pattern or not pre:
+            return []
+        if self._automaton is not None:
+            found = set()
+            for _, pattern in self._automaton.iter(pre):
+                found.add(pattern)
+                if len(found) == len(self._by_pattern):
+                    break
+        else:
+            found = [p for p in self._by_pattern if p in pre]
+        return sorted({skill for p in found for skill in self._by_pattern[p]})
+
+
+@dataclass(frozen=True)
+class SkillArtifact:
+    skills: List[str]
+    matcher: SkillMatcher
+
+
+_lock = threading.Lock()
+_artifacts: "OrderedDict[str, SkillArtifact]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_skill_artifact(job_text: str, pre: Optional[str] = None, top_n: int = 40) -> SkillArtifact:
+    """Derived skills and compiled matcher for a JD, built once per distinct JD text."""
+    key = hashlib.sha256(f"{top_n}\x00{job_text or ''}".encode("utf-8")).hexdigest()
+    with _lock:
+        artifact = _artifacts.get(key)
+        if artifact is not None:
+            _artifacts.move_to_end(key)
+            _stats["hits"] += 1
+            return artifact
+        _stats["misses"] += 1
+
+    artifact = build_skill_artifact(job_text, pre=pre, top_n=top_n)
+    with _lock:
+        _artifacts[key] = artifact
+        _artifacts.move_to_end(key)
+        while len(_artifacts) > SKILL_ARTIFACT_CACHE_SIZE:
+            _artifacts.popitem(last=False)
+    return artifact
+
+
+def build_skill_artifact(job_text: str, pre: Optional[str] = None, top_n: int = 40) -> SkillArtifact:
+    """get_skill_artifact without the cache, for callers that keep artifacts themselves (app/job_index.py)."""
+    if pre is None:
+        pre = preprocess_text(job_text)
+    skills = derive_skills_from_jd(job_text, top_n=top_n, pre=pre)
+    return SkillArtifact(skills=skills, matcher=SkillMatcher(skills))
+
+
+def skill_artifact_stats() -> Dict[str, float]:
+    with _lock:
+        stats = dict(_stats)
+        stats["size"] = len(_artifacts)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = (stats["hits"] / lookups) if lookups else 0.0
+    return stats
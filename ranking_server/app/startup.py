@@ -0,0 +1,96 @@
+# app/startup.py
+import sys
+import time
+import importlib
+import threading
+from typing import Dict, List
+
+# module name -> seconds spent in its first import (app modules at boot, heavy deps at first use).
+# This module imports no other app module at load time, so app.main can time all of them, app.config included.
+IMPORT_TIMES: Dict[str, float] = {}
+
+_state = {"status": "starting", "error": None, "warmup_seconds": None}
+_state_lock = threading.Lock()
+
+# heavy third-party modules that are imported lazily; warm_up() pulls them in ahead of traffic
+HEAVY_MODULES = [
+    "numpy",
+    "scipy.sparse",
+    "sklearn.feature_extraction.text",
+    "sklearn.metrics.pairwise",
+    "pdfminer.high_level",
+    "docx",
+]
+
+
+def lazy_import(name: str):
+    """importlib.import_module that records how long the first import took."""
+    mod = sys.modules.get(name)
+    if mod is not None:
+        return mod
+    started = time.perf_counter()
+    mod = importlib.import_module(name)
+    IMPORT_TIMES.setdefault(name, round(time.perf_counter() - started, 4))
+    return mod
+
+
+def timed_imports(names: List[str]):
+    """Import app modules in dependency order so each entry is close to that module's own cost."""
+    for name in names:
+        lazy_import(name)
+
+
+def warmup_state() -> Dict:
+    with _state_lock:
+        return dict(_state)
+
+
+def _set_state(**kw):
+    with _state_lock:
+        _state.update(kw)
+
+
+def warm_up():
+    """
+    Load WordNet and stopwords, fill the lemma cache with the vocabulary of current job
+    descriptions and import the heavy parsing/ML modules; /health reports "ok" afterwards.
+    The job recommendation index is then built on the same thread, so readiness does not
+    depend on the number of open jobs.
+    """
+    from .config import WARMUP_SEED_JDS
+    from .preprocess import load_nlp, tokenize
+
+    started = time.perf_counter()
+    _set_state(status="warming")
+    try:
+        load_nlp()
+        for name in HEAVY_MODULES:
+            lazy_import(name)
+        try:
+            from .db import fetch_job_texts
+            for text in fetch_job_texts(limit=WARMUP_SEED_JDS):
+                tokenize(text)
+        except Exception as e:
+            # a cold lemma cache only costs latency; the service is still usable
+            print(f"[WARN] lemma cache warm-up from job descriptions skipped: {e}")
+        _set_state(status="ok", warmup_seconds=round(time.perf_counter() - started, 3))
+    except Exception as e:
+        print(f"[WARN] warm-up failed: {e}")
+        _set_state(status="failed", error=str(e))
+        return
+    try:
+        from .job_index import job_index
+        job_index.ensure_fresh()
+    except Exception as e:
+        # the index is then built by the first recommendation request
+        print(f"[WARN] job index build skipped: {e}")
+
+
+def start_warm_up() -> threading.Thread:
+    t = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    t.start()
+    return t
+
+
+def mark_ready():
+    _set_state(status="ok")
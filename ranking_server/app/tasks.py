@@ -0,0 +1,257 @@
+# app/tasks.py
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .db import db_conn
+from . import metrics
+from .offload import Cancelled, cancellable
+from .pipeline import rank_job, rank_employer_jobs, build_rank_response
+from .config import RANK_TASK_WORKERS, RANK_TASK_QUEUE_DEPTH, RANK_TASK_HISTORY
+
+STAGES = ("fetch", "extract", "score", "persist")
+# rough share of total runtime per stage, used for overall progress and ETA
+STAGE_WEIGHTS = {"fetch": 0.05, "extract": 0.75, "score": 0.15, "persist": 0.05}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class RankTask:
+    """
+    One ranking pipeline run: a single job (`job_id`), or an employer batch (`employer_id`)
+    ranking `job_ids` with rank_employer_jobs, whose per-job responses land in `results`.
+    """
+
+    def __init__(self, job_id: Optional[int], employer_id: Optional[int] = None, job_ids: Optional[List[int]] = None):
+        self.task_id = uuid.uuid4().hex
+        self.job_id = job_id
+        self.employer_id = employer_id
+        self.job_ids: List[int] = [job_id] if job_id is not None else list(job_ids or [])
+        self.results: Dict[int, Dict] = {}  # employer batch: job_id -> rank response
+        self.status = "queued"
+        self.stage: Optional[str] = None
+        self.stages = {s: {"done": 0, "total": None} for s in STAGES}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}  # stage -> ms, for Server-Timing
+        self.not_found = False
+        self.future = None                 # concurrent.futures.Future of the pipeline run
+        self.waiters = 0                   # requests currently waiting on the result
+        self.keep = False                  # someone asked for it in the background: never cancel
+        self.cancel_event = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def result_for(self, job_id: int) -> Optional[Dict]:
+        """The rank response of one of the task's jobs (None when a batch did not rank it)."""
+        return self.result if self.employer_id is None else self.results.get(job_id)
+
+    def progress(self, stage: str, done: int = 0, total: Optional[int] = None):
+        self.stage = stage
+        self.stages[stage] = {"done": done, "total": total}
+
+    def fraction(self) -> float:
+        if self.status == "done":
+            return 1.0
+        f = 0.0
+        for stage, weight in STAGE_WEIGHTS.items():
+            st = self.stages[stage]
+            if st["total"]:
+                f += weight * min(st["done"] / st["total"], 1.0)
+        return f
+
+    def to_dict(self) -> Dict:
+        now = time.time()
+        fraction = self.fraction()
+        eta = None
+        if self.status == "running" and self.started_at and fraction > 0:
+            elapsed = now - self.started_at
+            eta = max(elapsed * (1.0 - fraction) / fraction, 0.0)
+        return {
+            "task_id": self.task_id,
+            "job_id": self.job_id,
+            "employer_id": self.employer_id,
+            "job_ids": self.job_ids,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": self.stages,
+            "progress": round(fraction, 4),
+            "eta_seconds": None if eta is None else round(eta, 1),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class RankTaskManager:
+    """
+    Runs ranking jobs on a local thread pool. At most `workers` run at once and at most
+    `queue_depth` more may wait; a request for a job that already has an active task is
+    coalesced onto that task instead of starting a second pipeline. An employer batch is one task
+    registered under each of its jobs, so single-job requests coalesce onto it as well.
+    A task nobody waits for any more (every client disconnected, none asked for it in the
+    background) is cancelled at its next batch boundary.
+    """
+
+    def __init__(self, workers: int = RANK_TASK_WORKERS, queue_depth: int = RANK_TASK_QUEUE_DEPTH,
+                 history: int = RANK_TASK_HISTORY):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rank-task")
+        self._capacity = workers + queue_depth
+        self._history = history
+        self._lock = threading.Lock()
+        self._tasks: "OrderedDict[str, RankTask]" = OrderedDict()
+        self._active: Dict[int, RankTask] = {}  # job_id -> task
+
+    def submit(self, job_id: int, background: bool = False) -> Tuple[RankTask, bool]:
+        """Return (task, coalesced). Raises QueueFullError when the queue is at capacity."""
+        with self._lock:
+            task = self._active.get(job_id)
+            if task is not None:
+                task.keep = task.keep or background
+                return task, True
+            task = self._start(RankTask(job_id), background)
+        return task, False
+
+    def submit_employer(self, employer_id: int, job_ids: List[int],
+                        background: bool = False) -> Tuple[Optional[RankTask], Dict[int, RankTask]]:
+        """
+        Rank the employer's `job_ids` as one batch task. Jobs that already have an active task are
+        left to it. Returns (the batch task, or None when every job was already being ranked,
+        {job_id: task ranking it}). Raises QueueFullError when the queue is at capacity.
+        """
+        with self._lock:
+            by_job, rest = {}, []
+            for job_id in job_ids:
+                task = self._active.get(job_id)
+                if task is not None:
+                    task.keep = task.keep or background
+                    by_job[job_id] = task
+                else:
+                    rest.append(job_id)
+            batch = None
+            if rest:
+                batch = self._start(RankTask(None, employer_id=employer_id, job_ids=rest), background)
+                by_job.update((job_id, batch) for job_id in rest)
+        return batch, by_job
+
+    def _start(self, task: RankTask, background: bool) -> RankTask:
+        # caller holds _lock
+        if self._active_count() >= self._capacity:
+            raise QueueFullError(f"ranking queue is full ({self._capacity} active tasks)")
+        task.keep = background
+        for job_id in task.job_ids:
+            self._active[job_id] = task
+        self._tasks[task.task_id] = task
+        self._trim()
+        task.future = self._executor.submit(self._run, task)
+        return task
+
+    def _active_count(self) -> int:
+        return len({id(t) for t in self._active.values()})
+
+    def _release(self, task: RankTask):
+        # caller holds _lock
+        for job_id in task.job_ids:
+            if self._active.get(job_id) is task:
+                del self._active[job_id]
+
+    def attach(self, task: RankTask):
+        """A request starts waiting for `task`."""
+        with self._lock:
+            task.waiters += 1
+
+    def detach(self, task: RankTask):
+        """
+        A waiting request is done with `task`. When it was the last waiter and the task is
+        still running for nobody, cancel it and let the next request for its jobs start afresh.
+        """
+        with self._lock:
+            task.waiters -= 1
+            if task.waiters > 0 or task.keep or not task.active:
+                return
+            task.cancel_event.set()
+            self._release(task)
+
+    def get(self, task_id: str) -> Optional[RankTask]:
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            tasks = {t.task_id: t for t in self._active.values()}.values()
+            running = sum(1 for t in tasks if t.status == "running")
+            return {"active": len(tasks), "running": running,
+                    "capacity": self._capacity, "tracked": len(self._tasks)}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _trim(self):
+        # forget the oldest finished tasks beyond the history limit
+        excess = len(self._tasks) - self._history
+        for task_id in list(self._tasks):
+            if excess <= 0:
+                break
+            if not self._tasks[task_id].active:
+                del self._tasks[task_id]
+                excess -= 1
+
+    def _run(self, task: RankTask):
+        if task.cancelled:
+            task.status = "cancelled"
+            task.finished_at = time.time()
+            return
+        task.status = "running"
+        task.started_at = time.time()
+        try:
+            with cancellable(task.cancel_event), metrics.collect_timings() as task.timings, db_conn() as conn:
+                if task.employer_id is None:
+                    job, ranked = rank_job(task.job_id, conn=conn, progress=task.progress)
+                    found = bool(job)
+                else:
+                    jobs, ranked_by_job = rank_employer_jobs(task.employer_id, task.job_ids, conn=conn,
+                                                             progress=task.progress)
+                    found = bool(jobs)
+            if not found:
+                task.not_found = True
+                task.error = "Job not found"
+                task.status = "failed"
+            elif task.employer_id is None:
+                task.result = build_rank_response(task.job_id, ranked)
+                task.status = "done"
+            else:
+                # a job deleted since the batch was submitted has no entry
+                task.results = {j["job_id"]: dict(build_rank_response(j["job_id"], ranked_by_job.get(j["job_id"])),
+                                                  job_id=j["job_id"]) for j in jobs}
+                task.result = {"success": True, "employer_id": task.employer_id, "jobs": list(task.results.values())}
+                task.status = "done"
+        except Cancelled:
+            task.error = "cancelled: no client is waiting for the result"
+            task.status = "cancelled"
+        except Exception as e:
+            print(f"[WARN] ranking task {task.task_id} for job_ids={task.job_ids} failed: {e}")
+            task.error = str(e)
+            task.status = "failed"
+        finally:
+            task.finished_at = time.time()
+            with self._lock:
+                self._release(task)
+
+
+rank_tasks = RankTaskManager()
@@ -0,0 +1,95 @@
+# app/text_cache.py
+import threading
+from typing import Dict, List, Optional
+
+from psycopg2.pool import PoolError
+
+from .db import db_conn, store_cached_texts
+from .extractors import extract_batch, EXTRACT_OK, CACHEABLE_OUTCOMES
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stored": 0}
+
+
+def cache_stats() -> Dict[str, float]:
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = (stats["hits"] / lookups) if lookups else 0.0
+    return stats
+
+
+def _count(key: str, n: int = 1):
+    with _lock:
+        _stats[key] += n
+
+
+def resolve_resume_texts(apps: List[Dict], conn=None, to_store: Optional[List] = None) -> List[Dict]:
+    """
+    Build [{job_seeker_id, resume_name, text, extract_status}] for applicant rows from fetch_job_and_applicants.
+    Cached text and status are used as-is; misses are extracted once per distinct resume hash and written back.
+    Callers whose `conn` cannot commit yet (it holds an open server-side cursor) pass `to_store`: the
+    batch is then written on a second pooled connection, or appended to `to_store` for the caller to
+    store_texts later when no connection is free right now.
+    """
+    resumes_texts = []
+    pending = {}   # resume hash (or row position when unhashed) -> (name, data)
+    row_keys = []
+    for i, row in enumerate(apps):
+        jsid = row["job_seeker_id"]
+        rname = row.get("resume_name") or f"resume_{jsid}.pdf"
+        cached = row.get("cached_text")
+        rdata = row.get("resume_data")
+        key = None
+        if cached is not None:
+            _count("hits")
+        elif rdata:
+            key = row.get("resume_hash") or i
+            if key not in pending:
+                _count("misses")
+                pending[key] = (rname, rdata)
+        row_keys.append(key)
+        # drop the blob reference; the pending map holds the only copy until extraction
+        row["resume_data"] = None
+        resumes_texts.append({"job_seeker_id": jsid, "resume_name": rname, "text": cached or "",
+                              "extract_status": row.get("cached_status") or EXTRACT_OK})
+
+    if not pending:
+        return resumes_texts
+
+    keys = list(pending)
+    results = extract_batch([pending[k] for k in keys])
+    pending.clear()
+    extracted = dict(zip(keys, results))
+    for r, key in zip(resumes_texts, row_keys):
+        if key is not None:
+            r["text"], r["extract_status"] = extracted[key]
+
+    entries = [(k, t, status) for k, (t, status) in extracted.items()
+               if isinstance(k, str) and status in CACHEABLE_OUTCOMES]
+    if to_store is None:
+        store_texts(entries, conn=conn)
+    elif entries and not _store_aside(entries):
+        to_store.extend(entries)
+
+    return resumes_texts
+
+
+def _store_aside(entries: List) -> bool:
+    # never waits for the pool: a caller holding one connection must not block on a second
+    try:
+        with db_conn(timeout=0) as conn:
+            store_texts(entries, conn=conn)
+    except PoolError:
+        return False
+    return True
+
+
+def store_texts(entries: List, conn=None):
+    if not entries:
+        return
+    try:
+        store_cached_texts(entries, conn=conn)
+        _count("stored", len(entries))
+    except Exception as e:
+        print(f"[WARN] failed to store extracted texts in cache: {e}")
@@ -0,0 +1,177 @@
+# bench/corpus.py
+"""
+Deterministic synthetic corpus: job descriptions plus PDF, DOCX and TXT resumes.
+The same seed always produces byte-identical documents, so timings are comparable
+across runs and machines.
+"""
+import io
+import random
+import zipfile
+from xml.sax.saxutils import escape as xml_escape
+from typing import Dict, Iterator, List
+
+SKILLS = [
+    "python", "java", "javascript", "typescript", "react", "node", "fastapi", "django", "flask",
+    "postgresql", "mysql", "mongodb", "redis", "docker", "kubernetes", "aws", "azure", "gcp",
+    "terraform", "linux", "git", "ci cd", "rest api", "graphql", "microservices", "kafka",
+    "spark", "hadoop", "pandas", "numpy", "scikit learn", "tensorflow", "pytorch",
+    "machine learning", "deep learning", "data analysis", "natural language processing",
+    "computer vision", "statistics", "tableau", "excel", "agile", "scrum", "unit testing",
+    "system design", "distributed systems", "cloud computing", "data engineering",
+]
+
+FILLER = [
+    "developed", "designed", "implemented", "maintained", "improved", "led", "team", "project",
+    "application", "service", "platform", "performance", "customers", "reliability", "features",
+    "delivered", "collaborated", "stakeholders", "requirements", "production", "scalable",
+    "pipelines", "reporting", "dashboards", "automation", "testing", "deployment", "monitoring",
+    "analysis", "research", "experience", "responsible", "managed", "optimized", "built",
+]
+
+ROLES = ["Backend Engineer", "Data Scientist", "Frontend Developer", "ML Engineer", "DevOps Engineer"]
+DEGREES = ["B.Tech", "B.E.", "M.Tech", "B.Sc", "M.Sc", "MCA"]
+FORMATS = ("pdf", "docx", "txt")
+
+
+def _sentence(rng: random.Random, skills: List[str]) -> str:
+    words = rng.sample(FILLER, 6) + rng.sample(skills, min(2, len(skills)))
+    rng.shuffle(words)
+    return " ".join(words).capitalize() + "."
+
+
+def job_description(seed: int) -> Dict:
+    rng = random.Random(seed)
+    role = rng.choice(ROLES)
+    skills = rng.sample(SKILLS, 12)
+    lines = [f"We are hiring a {role}."]
+    lines += [_sentence(rng, skills) for _ in range(10)]
+    lines.append("Required skills: " + ", ".join(skills) + ".")
+    return {"job_title": role, "job_role": role, "job_description": " ".join(lines)}
+
+
+def resume_text(seed: int) -> str:
+    rng = random.Random(seed)
+    skills = rng.sample(SKILLS, rng.randint(4, 14))
+    lines = [f"Candidate {seed}", f"Education: {rng.choice(DEGREES)}", "Skills: " + ", ".join(skills)]
+    lines += [_sentence(rng, skills) for _ in range(rng.randint(15, 45))]
+    return "\n".join(lines)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def text_to_pdf(text: str, lines_per_page: int = 48) -> bytes:
+    """Minimal single-font PDF writer (no external dependency) that pdfminer can parse."""
+    lines = text.splitlines() or [""]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+    objects: List[bytes] = []
+
+    def add(obj: bytes) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(b"")  # placeholder, filled once page ids are known
+    page_ids = []
+    for page_lines in pages:
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 780 Td"]
+        for line in page_lines:
+            ops.append(f"({_pdf_escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids).encode()
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % i + obj + b"\nendobj\n")
+    xref_at = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for off in offsets:
+        out.write(b"%010d 00000 n \n" % off)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+              % (len(objects) + 1, catalog_id, xref_at))
+    return out.getvalue()
+
+
+_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+_DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="word/document.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def text_to_docx(text: str) -> bytes:
+    """
+    Minimal WordprocessingML package, one paragraph per line. Written by hand rather than
+    with python-docx so it is fast at 50k documents and byte-identical between runs
+    (fixed zip timestamps, no core properties).
+    """
+    paras = "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{xml_escape(line)}</w:t></w:r></w:p>'
+        for line in text.splitlines()
+    )
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                f'<w:document xmlns:w="{_W_NS}"><w:body>{paras}</w:body></w:document>')
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, body in (("[Content_Types].xml", _DOCX_CONTENT_TYPES),
+                           ("_rels/.rels", _DOCX_RELS),
+                           ("word/document.xml", document)):
+            zf.writestr(zipfile.ZipInfo(name, date_time=(2020, 1, 1, 0, 0, 0)), body,
+                        compress_type=zipfile.ZIP_DEFLATED)
+    return buf.getvalue()
+
+
+def resume_bytes(text: str, fmt: str) -> bytes:
+    if fmt == "pdf":
+        return text_to_pdf(text)
+    if fmt == "docx":
+        return text_to_docx(text)
+    return text.encode("utf-8")
+
+
+def iter_resumes(n: int, seed: int = 0, formats=FORMATS) -> Iterator[Dict]:
+    """
+    Yield n applicant rows shaped like db.fetch_job_and_applicants rows, cycling through
+    `formats`. About one in ten seekers reuses an earlier resume, as seekers applying to
+    several jobs do, so content-hash caching has something to hit.
+    """
+    for i in range(n):
+        jsid = i + 1
+        src = (i // 10) if (i % 10 == 9) else i
+        fmt = formats[src % len(formats)]
+        text = resume_text(seed * 1_000_003 + src)
+        yield {
+            "application_id": jsid,
+            "job_seeker_id": jsid,
+            "name": f"Candidate {jsid}",
+            "degree": DEGREES[src % len(DEGREES)],
+            "college": f"College {src % 97}",
+            "graduation_year": 2015 + src % 10,
+            "resume_name": f"resume_{src}.{fmt}",
+            "resume_data": resume_bytes(text, fmt),
+            "rank": 0,
+        }
@@ -0,0 +1,150 @@
+# bench/localdb.py
+"""
+In-memory stand-in for the Postgres queries used by the ranking pipeline, so the
+end-to-end path (fetch -> text cache -> extract -> score -> persist) runs offline.
+Rows have the same shape as app/db.py returns, including resume_hash / cached_text.
+"""
+import hashlib
+import itertools
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from app import pipeline, text_cache
+from app.config import FETCH_ITERSIZE
+
+if TYPE_CHECKING:
+    from app.ranker import RankedResults
+
+
+class LocalConn:
+    """Connection placeholder; transactions are implicit in memory."""
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class LocalStore:
+    """
+    `jobs` maps job_id -> job header (with employer_id for batch ranking); `applicants` are
+    application rows as produced by corpus.iter_resumes plus a "job_id" key. Rows of the same
+    job seeker in different jobs share one resume.
+    """
+
+    def __init__(self, jobs: Dict[int, Dict], applicants: List[Dict]):
+        self.jobs = {job_id: dict(job) for job_id, job in jobs.items()}
+        self.applicants = applicants
+        for row in applicants:
+            row["resume_hash"] = hashlib.sha256(row["resume_data"]).hexdigest()
+        self.text_cache: Dict[str, Tuple[str, str]] = {}  # resume hash -> (text, extract_status)
+        self.rank_state: Dict[int, Dict] = {}
+        self._run_ids = itertools.count(1)
+
+    def _row(self, row: Dict) -> Dict:
+        cached = self.text_cache.get(row["resume_hash"])
+        if cached is None:
+            return dict(row, cached_text=None, cached_status=None)
+        return dict(row, cached_text=cached[0], cached_status=cached[1], resume_data=None)
+
+    def _ordered(self, job_id: int) -> List[Dict]:
+        # ORDER BY rank ASC NULLS LAST, id
+        rows = [r for r in self.applicants if r["job_id"] == job_id]
+        return sorted(rows, key=lambda r: (not r["rank"], r["rank"] or 0, r["application_id"]))
+
+    # --- app.db replacements -------------------------------------------------
+
+    def fetch_job(self, job_id: int, conn=None) -> Optional[Dict]:
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def count_applicants(self, job_id: int, conn=None) -> int:
+        return sum(1 for r in self.applicants if r["job_id"] == job_id)
+
+    def fetch_job_and_applicants(self, job_id: int, conn=None):
+        if job_id not in self.jobs:
+            return None, []
+        return self.fetch_job(job_id), [self._row(r) for r in self._ordered(job_id)]
+
+    def iter_job_applicants(self, job_id: int, conn, itersize: int = FETCH_ITERSIZE):
+        rows = self._ordered(job_id)
+        for i in range(0, len(rows), itersize):
+            yield [self._row(r) for r in rows[i:i + itersize]]
+
+    def fetch_employer_jobs(self, employer_id: int, job_ids=None, conn=None) -> List[Dict]:
+        return [dict(job, job_id=job_id) for job_id, job in sorted(self.jobs.items())
+                if job.get("employer_id") == employer_id and (job_ids is None or job_id in job_ids)]
+
+    def fetch_job_applications(self, job_ids: List[int], conn=None) -> List[Dict]:
+        return [{"job_id": job_id, "job_seeker_id": r["job_seeker_id"]}
+                for job_id in sorted(job_ids) for r in self._ordered(job_id)]
+
+    def iter_applicant_resumes(self, job_ids: List[int], conn, itersize: int = FETCH_ITERSIZE):
+        seekers = {}
+        for r in self.applicants:
+            if r["job_id"] in job_ids:
+                seekers.setdefault(r["job_seeker_id"], r)
+        rows = [seekers[s] for s in sorted(seekers)]
+        for i in range(0, len(rows), itersize):
+            yield [self._row(r) for r in rows[i:i + itersize]]
+
+    @contextmanager
+    def db_conn(self, timeout=None):
+        yield LocalConn()
+
+    def store_cached_texts(self, entries, conn=None):
+        for content_hash, text, status in entries:
+            self.text_cache.setdefault(content_hash, (text, status))
+
+    def save_rankings(self, ranked_by_job: Dict[int, "RankedResults"], conn=None) -> Dict[int, Dict]:
+        runs = {}
+        for job_id, ranked in ranked_by_job.items():
+            ranks = {}
+            for i, jsid in enumerate(ranked.job_seeker_ids.tolist()):
+                ranks.setdefault(jsid, i)
+            runs[job_id] = {"run_id": next(self._run_ids), "created_at": datetime.now(timezone.utc)}
+            for row in self.applicants:
+                if row["job_id"] != job_id:
+                    continue
+                i = ranks.get(row["job_seeker_id"])
+                row["rank"] = 0 if i is None else i + 1
+                row["score"] = None if i is None else float(ranked.scores[i])
+                row["matched_skills"] = None if i is None else ranked.matched_skills(i)
+                row["extract_status"] = None if i is None else ranked.extract_statuses[i]
+        return runs
+
+    def save_ranking(self, job_id: int, ranked: "RankedResults", conn=None) -> Dict:
+        return self.save_rankings({job_id: ranked})[job_id]
+
+    @contextmanager
+    def rank_lock(self, conn, job_ids: List[int]):
+        yield conn  # single-threaded bench: nothing to serialize
+
+    def load_rank_state(self, job_id: int, conn=None) -> Optional[Dict]:
+        return self.rank_state.get(job_id)
+
+    def save_rank_state(self, job_id: int, ranking_run_id: int, state: bytes,
+                        fitted_count: int, added_since_fit: int, conn=None):
+        self.rank_state[job_id] = {"job_id": job_id, "ranking_run_id": ranking_run_id, "state": state,
+                                   "fitted_count": fitted_count, "added_since_fit": added_since_fit}
+
+
+_PIPELINE_NAMES = ("fetch_job", "count_applicants", "fetch_job_and_applicants", "iter_job_applicants",
+                   "fetch_employer_jobs", "fetch_job_applications", "iter_applicant_resumes",
+                   "save_ranking", "save_rankings", "load_rank_state", "save_rank_state", "rank_lock")
+
+
+@contextmanager
+def installed(store: LocalStore):
+    """Route the pipeline's database calls to `store` for the duration of the block."""
+    targets = [(pipeline, name) for name in _PIPELINE_NAMES] + [(text_cache, "store_cached_texts"), (text_cache, "db_conn")]
+    saved = [(mod, name, getattr(mod, name)) for mod, name in targets]
+    try:
+        for mod, name in targets:
+            setattr(mod, name, getattr(store, name))
+        yield LocalConn()
+    finally:
+        for mod, name, fn in saved:
+            setattr(mod, name, fn)
@@ -0,0 +1,270 @@
+# bench/run.py
+"""
+Ranking pipeline benchmark on a deterministic synthetic corpus.
+
+    cd ranking_server
+    python -m bench.run --sizes 100,1000 --out bench/results.json
+    python -m bench.run --sizes 100,1000 --baseline bench/baseline.json
+
+Each size runs in its own child process (so peak RSS belongs to that size alone) and
+times every stage separately plus the full rank_job path against an in-memory stand-in
+for Postgres. With --baseline, stages slower than the baseline by more than --tolerance
+are reported as regressions and the exit status is 1. Needs NLTK data installed locally.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+DEFAULT_SIZES = "100,1000,10000,50000"
+JOB_ID = 1
+
+# stages compared against a baseline ("generate" only builds the corpus and is informational)
+STAGES = ("extract", "preprocess", "derive_skills", "match_skills", "match_skills_reference",
+          "score", "end_to_end", "end_to_end_cached",
+          "employer_sequential", "employer_batch", "employer_sequential_cached", "employer_batch_cached")
+EMPLOYER_ID = 1
+
+
+def _best_of(repeat: int, fn: Callable, before: Callable = None):
+    """Run fn `repeat` times and return (min seconds, last result)."""
+    best, result = None, None
+    for _ in range(max(repeat, 1)):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 4), result
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_size(n: int, seed: int, repeat: int, formats: List[str], format_sample: int, batch_jobs: int = 0) -> Dict:
+    from app.extractors import extract_text_from_bytes, extract_batch, start_pool, shutdown_pool
+    from app.startup import HEAVY_MODULES, lazy_import
+    from app.preprocess import load_nlp, preprocess_text, lemmatize, derive_skills_from_jd, match_skills_preprocessed
+    from app.skills import SkillMatcher
+    from app.ranker import fit_and_score_preprocessed
+    from app.pipeline import rank_job, rank_employer_jobs
+    from app.config import SKILL_BOOST_WEIGHT
+    from .corpus import job_description, iter_resumes
+    from .localdb import LocalStore, installed
+
+    # pay one-off costs before any timing: with --repeat 1 the first stage to touch a lazily
+    # imported module, or the first extraction (worker spawns), would be charged for them
+    load_nlp()
+    for module in HEAVY_MODULES:
+        lazy_import(module)
+    start_pool()
+    stages: Dict[str, float] = {}
+
+    generate, applicants = _best_of(1, lambda: list(iter_resumes(n, seed=seed, formats=formats)))
+    stages["generate"] = generate
+    job = job_description(seed)
+    jd_text = job["job_description"]
+    items = [(r["resume_name"], r["resume_data"]) for r in applicants]
+
+    # per-format cost of a single in-process extraction
+    by_format = {}
+    for fmt in formats:
+        sample = [it for it in items if it[0].endswith("." + fmt)][:format_sample]
+        if sample:
+            secs, _ = _best_of(repeat, lambda: [extract_text_from_bytes(name, data) for name, data in sample])
+            by_format[fmt] = round(secs * 1000 / len(sample), 3)
+
+    stages["extract"], texts = _best_of(repeat, lambda: [text for text, _ in extract_batch(items)])
+
+    # cold lemma cache every time, so repeats measure the same work
+    stages["preprocess"], pres = _best_of(repeat, lambda: [preprocess_text(t) for t in texts],
+                                          before=lemmatize.cache_clear)
+
+    jd_pre = preprocess_text(jd_text)
+    stages["derive_skills"], skills = _best_of(repeat, lambda: derive_skills_from_jd(jd_text, top_n=40, pre=jd_pre))
+    stages["match_skills"], _ = _best_of(repeat, lambda: [m.match(p) for m in [SkillMatcher(skills)] for p in pres])
+    stages["match_skills_reference"], _ = _best_of(repeat, lambda: [match_skills_preprocessed(skills, p) for p in pres])
+
+    docs = [{"job_seeker_id": r["job_seeker_id"], "resume_name": r["resume_name"], "pre": p}
+            for r, p in zip(applicants, pres)]
+    stages["score"], _ = _best_of(repeat, lambda: fit_and_score_preprocessed(jd_text, docs, SKILL_BOOST_WEIGHT))
+
+    # full rank_job: cold text cache first, then a re-rank that hits the cache for every resume
+    corpus_bytes = sum(len(r["resume_data"]) for r in applicants)
+    store = LocalStore({JOB_ID: job}, [dict(r, job_id=JOB_ID) for r in applicants])
+    with installed(store) as conn:
+        def cold():
+            store.text_cache.clear()
+            lemmatize.cache_clear()
+            return rank_job(JOB_ID, conn=conn)
+
+        stages["end_to_end"], (_, ranked) = _best_of(repeat, cold)
+        stages["end_to_end_cached"], _ = _best_of(repeat, lambda: rank_job(JOB_ID, conn=conn))
+
+    if batch_jobs > 0:
+        # one employer with `batch_jobs` openings; every applicant applies to about half of them
+        jobs = {j: dict(job_description(seed + j), employer_id=EMPLOYER_ID) for j in range(1, batch_jobs + 1)}
+        rows = [dict(r, job_id=j, application_id=r["application_id"] * batch_jobs + j)
+                for r in applicants for j in jobs if (r["job_seeker_id"] + j) % 2 == 0 or batch_jobs == 1]
+        store = LocalStore(jobs, rows)
+        with installed(store) as conn:
+            def sequential():
+                store.text_cache.clear()
+                lemmatize.cache_clear()
+                return [rank_job(j, conn=conn) for j in jobs]
+
+            def batch():
+                store.text_cache.clear()
+                lemmatize.cache_clear()
+                return rank_employer_jobs(EMPLOYER_ID, conn=conn)
+
+            stages["employer_sequential"], _ = _best_of(repeat, sequential)
+            stages["employer_batch"], _ = _best_of(repeat, batch)
+            # warm text cache: extraction is the same work both ways (sequential runs share the cache
+            # too), so these isolate what the batch shares: preprocessing, term counts and persistence
+            stages["employer_sequential_cached"], _ = _best_of(
+                repeat, lambda: [rank_job(j, conn=conn) for j in jobs], before=lemmatize.cache_clear)
+            stages["employer_batch_cached"], _ = _best_of(
+                repeat, lambda: rank_employer_jobs(EMPLOYER_ID, conn=conn), before=lemmatize.cache_clear)
+
+    # RUSAGE_CHILDREN only counts reaped processes: stop the extraction workers first
+    shutdown_pool()
+    result = {
+        "applicants": n,
+        "distinct_resumes": len({r["resume_hash"] for r in store.applicants}),
+        "corpus_bytes": corpus_bytes,
+        "ranked": len(ranked),
+        "stages": stages,
+        "extract_ms_per_doc": by_format,
+        "peak_rss_mb": _peak_rss_mb(),
+        "peak_rss_children_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+    return result
+
+
+def run_isolated(n: int, args) -> Dict:
+    cmd = [sys.executable, "-m", "bench.run", "--child", "--sizes", str(n), "--seed", str(args.seed),
+           "--repeat", str(args.repeat), "--formats", args.formats, "--format-sample", str(args.format_sample),
+           "--batch-jobs", str(args.batch_jobs)]
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(cmd, cwd=cwd, stdout=subprocess.PIPE, check=True)
+    return json.loads(proc.stdout.decode().strip().splitlines()[-1])
+
+
+def metadata(args) -> Dict:
+    from app.extractors import EXTRACTOR_VERSION
+    from app.config import EXTRACT_WORKERS, EXTRACT_SANDBOX, EXTRACT_TIMEOUT_SECONDS, TFIDF_MAX_FEATURES, TFIDF_NGRAM
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "formats": args.formats.split(","),
+        "extractor_version": EXTRACTOR_VERSION,
+        "extract_workers": EXTRACT_WORKERS,
+        "extract_sandbox": EXTRACT_SANDBOX,
+        "extract_timeout_seconds": EXTRACT_TIMEOUT_SECONDS,
+        "tfidf_max_features": TFIDF_MAX_FEATURES,
+        "tfidf_ngram": list(TFIDF_NGRAM),
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float, min_delta: float) -> List[Dict]:
+    """
+    Stage timings (and peak RSS) that got slower than the baseline by more than
+    `tolerance` (relative) and `min_delta` seconds (absolute, to ignore noise on tiny stages).
+    """
+    regressions = []
+    for size, cur in current["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if not base:
+            continue
+        for stage in STAGES:
+            new, old = cur["stages"].get(stage), base["stages"].get(stage)
+            if new is None or old is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > min_delta:
+                regressions.append({"size": size, "metric": stage, "baseline": old, "current": new,
+                                    "change": round(new / old - 1, 3) if old else None})
+        new, old = cur.get("peak_rss_mb"), base.get("peak_rss_mb")
+        if new and old and new > old * (1 + tolerance):
+            regressions.append({"size": size, "metric": "peak_rss_mb", "baseline": old, "current": new,
+                                "change": round(new / old - 1, 3)})
+    return regressions
+
+
+def _print_table(results: Dict):
+    cols = ("generate",) + STAGES
+    print("size".rjust(7) + "".join(c[:14].rjust(15) for c in cols) + "rss_mb".rjust(10), file=sys.stderr)
+    for size, r in results.items():
+        row = "".join(f"{r['stages'].get(c, float('nan')):15.3f}" for c in cols)
+        print(size.rjust(7) + row + f"{r['peak_rss_mb']:10.1f}", file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated applicant counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage; the fastest is kept")
+    parser.add_argument("--formats", default="pdf,docx,txt", help="resume formats to cycle through")
+    parser.add_argument("--format-sample", type=int, default=50, help="documents per format for per-doc timings")
+    parser.add_argument("--batch-jobs", type=int, default=0,
+                        help="also time employer-wide ranking over this many jobs sharing the applicants")
+    parser.add_argument("--out", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="ignore slowdowns below this many seconds")
+    parser.add_argument("--in-process", action="store_true", help="run all sizes in this process")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+
+    if args.child:
+        print(json.dumps(run_size(sizes[0], args.seed, args.repeat, formats, args.format_sample, args.batch_jobs)))
+        return 0
+
+    results = {}
+    for n in sizes:
+        print(f"[bench] {n} applicants ...", file=sys.stderr)
+        if args.in_process:
+            results[str(n)] = run_size(n, args.seed, args.repeat, formats, args.format_sample, args.batch_jobs)
+        else:
+            results[str(n)] = run_isolated(n, args)
+    report = {"meta": metadata(args), "results": results}
+    _print_table(results)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.tolerance, args.min_delta)
+        for r in report["regressions"]:
+            print(f"[REGRESSION] {r['size']} applicants {r['metric']}: "
+                  f"{r['baseline']} -> {r['current']} ({r['change']:+.0%})", file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# tests/conftest.py
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+# run from anywhere: `pytest ranking_server/tests` or `python -m pytest` inside ranking_server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "postgres: needs a scratch Postgres database (TEST_DATABASE_URL)")
+
+
+class FakeDb:
+    """
+    The app.db calls the pipeline and the job index make, backed by dicts. Tests fill in
+    `jobs`, `resumes` and `applied`, then install the calls their code path uses.
+    """
+
+    def __init__(self, monkeypatch):
+        self.monkeypatch = monkeypatch
+        self.jobs = {}       # job_id -> job description
+        self.resumes = {}    # job_seeker_id -> resume text
+        self.applied = {}    # job_id -> [job_seeker_id]
+        self.ranks = {}      # job_seeker_id -> persisted rank
+        self.state_row = None
+        self.state_writes = 0
+        self.slotted = []
+        self.saved = {}
+        self.fetched = []
+        self.locked = []
+
+    def install(self, module, *names):
+        for name in names:
+            self.monkeypatch.setattr(module, name, getattr(self, name))
+        return self
+
+    @contextmanager
+    def borrow_conn(self, conn=None):
+        yield conn
+
+    @contextmanager
+    def rank_lock(self, conn, job_ids):
+        self.locked.append(list(job_ids))
+        try:
+            yield conn
+        finally:
+            self.locked.pop()
+
+    def _assert_locked(self, job_id):
+        assert self.locked and job_id in self.locked[-1]
+
+    # jobs and applications
+
+    def fetch_employer_jobs(self, employer_id, job_ids=None, conn=None):
+        return [{"job_id": j, "job_description": jd} for j, jd in self.jobs.items()
+                if job_ids is None or j in job_ids]
+
+    def fetch_job_applications(self, job_ids, conn=None):
+        return [{"job_id": j, "job_seeker_id": s} for j in job_ids for s in self.applied.get(j, ())]
+
+    def fetch_job_and_application(self, job_id, job_seeker_id, conn=None):
+        job = {"job_title": "Backend", "job_role": "eng", "job_description": self.jobs[job_id]}
+        app = None
+        if job_seeker_id in self.applied.get(job_id, ()):
+            app = {"job_seeker_id": job_seeker_id, "rank": self.ranks.get(job_seeker_id)}
+        return job, app
+
+    def fetch_job_fingerprints(self, job_ids=None, conn=None):
+        ids = self.jobs if job_ids is None else [j for j in job_ids if j in self.jobs]
+        return {j: str(hash(self.jobs[j])) for j in ids}
+
+    def fetch_jobs_by_id(self, job_ids, conn=None):
+        self.fetched.extend(job_ids)
+        return [{"job_id": j, "job_description": self.jobs[j], "index_text": self.jobs[j],
+                 "index_hash": str(hash(self.jobs[j]))} for j in job_ids if j in self.jobs]
+
+    # resumes
+
+    def iter_applicant_resumes(self, job_ids, conn):
+        yield [{"job_seeker_id": s} for s in sorted(self.resumes)]
+
+    def resolve_resume_texts(self, apps, conn=None, to_store=None):
+        return [{"job_seeker_id": a["job_seeker_id"], "resume_name": f"r{a['job_seeker_id']}.pdf",
+                 "text": self.resumes[a["job_seeker_id"]], "extract_status": "ok"} for a in apps]
+
+    def store_texts(self, to_store, conn=None):
+        pass
+
+    # rankings and scoring state
+
+    def save_rankings(self, ranked_by_job, conn=None):
+        self.saved = ranked_by_job
+        return {job_id: {"run_id": job_id * 10} for job_id in ranked_by_job}
+
+    def load_rank_state(self, job_id, conn=None):
+        self._assert_locked(job_id)
+        return self.state_row
+
+    def save_rank_state(self, job_id, ranking_run_id, state, fitted_count, added_since_fit, conn=None):
+        self._assert_locked(job_id)
+        self.state_row = {"job_id": job_id, "ranking_run_id": ranking_run_id, "state": state,
+                          "fitted_count": fitted_count, "added_since_fit": added_since_fit}
+        self.state_writes += 1
+
+    def count_rank_state_addition(self, job_id, conn=None):
+        self._assert_locked(job_id)
+        self.state_row["added_since_fit"] += 1
+
+    def slot_ranked_application(self, job_id, job_seeker_id, ranking_run_id, result, conn=None):
+        self._assert_locked(job_id)
+        self.slotted.append((job_seeker_id, ranking_run_id, result))
+        self.ranks[job_seeker_id] = len(self.slotted)
+        return len(self.slotted)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    return FakeDb(monkeypatch)
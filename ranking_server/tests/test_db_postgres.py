@@ -0,0 +1,116 @@
+# tests/test_db_postgres.py
+import os
+
+import numpy as np
+import pytest
+
+from app import db
+from app.ranker import RankedResults
+
+# a scratch database the tests may create a schema in, e.g. postgresql://localhost/ranking_test
+DSN = os.environ.get("TEST_DATABASE_URL")
+SCHEMA_SQL = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "server", "db.sql")
+
+pytestmark = [pytest.mark.postgres, pytest.mark.skipif(not DSN, reason="TEST_DATABASE_URL is not set")]
+
+JOB_A, JOB_B = 1, 2
+SEEKERS = (2, 3, 4)
+
+
+@pytest.fixture
+def conn():
+    psycopg2 = pytest.importorskip("psycopg2")
+    conn = psycopg2.connect(DSN)
+    schema = f"ranking_test_{os.getpid()}"
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+            cur.execute(f"CREATE SCHEMA {schema}")
+            cur.execute(f"SET search_path TO {schema}")
+            with open(SCHEMA_SQL) as f:
+                cur.execute(f.read())
+            cur.execute("INSERT INTO login (id, email, google_id) SELECT i, i || '@x', 'g' || i FROM generate_series(1, 4) i")
+            cur.execute("INSERT INTO employer (employer_id) VALUES (1)")
+            cur.execute("INSERT INTO job_seeker (job_seeker_id, resume_data) SELECT i, 'cv' FROM generate_series(2, 4) i")
+            cur.execute("INSERT INTO job_description (job_id, employer_id, job_description) VALUES (1, 1, 'a'), (2, 1, 'b')")
+            cur.execute("INSERT INTO job_applied (job_id, job_seeker_id) SELECT 1, i FROM generate_series(2, 4) i")
+            cur.execute("INSERT INTO job_applied (job_id, job_seeker_id) VALUES (2, 2)")
+        conn.commit()
+        yield conn
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+def ranked(rows):
+    """RankedResults from (job_seeker_id, score, cosine_score, matched skills), best first."""
+    skills = sorted({s for *_, matched in rows for s in matched})
+    matched = [[skills.index(s) for s in m] for *_, m in rows]
+    return RankedResults(
+        job_seeker_ids=np.array([r[0] for r in rows], dtype=np.int64),
+        resume_names=[f"r{r[0]}.pdf" for r in rows],
+        extract_statuses=["ok"] * len(rows),
+        scores=np.array([r[1] for r in rows], dtype=np.float64),
+        cosine_scores=np.array([r[2] for r in rows], dtype=np.float64),
+        skill_ratios=np.array([len(r[3]) / 2 for r in rows], dtype=np.float64),
+        skills=skills,
+        matched_offsets=np.cumsum([0] + [len(m) for m in matched]).astype(np.int32),
+        matched=np.array([i for m in matched for i in m], dtype=np.int16),
+    )
+
+
+def applications(conn, job_id):
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT job_seeker_id, rank, score, matched_skills, extract_status, ranking_run_id"
+            " FROM job_applied WHERE job_id = %s ORDER BY job_seeker_id",
+            (job_id,),
+        )
+        return {r[0]: r[1:] for r in cur.fetchall()}
+
+
+def test_save_rankings_skips_unchanged_rows(conn):
+    first = {JOB_A: ranked([(2, 0.9, 0.8, ["python"]), (3, 0.5, 0.4, [])]),
+             JOB_B: ranked([(2, 0.7, 0.6, ["go", "sql"])])}
+    runs = db.save_rankings(first, conn=conn)
+    run_a, run_b = runs[JOB_A]["run_id"], runs[JOB_B]["run_id"]
+    assert applications(conn, JOB_A) == {
+        2: (1, 0.9, ["python"], "ok", run_a),
+        3: (2, 0.5, None, "ok", run_a),
+        4: (0, None, None, None, None),  # not in the run and already unranked: left alone
+    }
+    assert applications(conn, JOB_B) == {2: (1, 0.7, ["go", "sql"], "ok", run_b)}
+
+    # same results again: a new run is recorded but no application row is rewritten
+    again = db.save_rankings(first, conn=conn)
+    assert again[JOB_A]["run_id"] > run_a
+    assert applications(conn, JOB_A)[2][-1] == applications(conn, JOB_A)[3][-1] == run_a
+
+    # only seeker 3 changes
+    latest = db.save_ranking(JOB_A, ranked([(2, 0.9, 0.8, ["python"]), (3, 0.6, 0.4, [])]), conn=conn)
+    rows = applications(conn, JOB_A)
+    assert rows[2] == (1, 0.9, ["python"], "ok", run_a)
+    assert rows[3] == (2, 0.6, None, "ok", latest["run_id"])
+
+    # a seeker dropped from the run is unranked
+    db.save_ranking(JOB_A, ranked([(3, 0.6, 0.4, [])]), conn=conn)
+    assert applications(conn, JOB_A)[2][:3] == (0, None, None)
+
+
+def test_slot_ranked_application_keeps_ranks_contiguous(conn):
+    run_id = db.save_rankings({JOB_A: ranked([(2, 0.9, 0.8, ["python"]), (3, 0.5, 0.4, [])])},
+                              conn=conn)[JOB_A]["run_id"]
+    result = {"score": 0.7, "cosine_score": 0.6, "skill_ratio": 0.5, "matched_skills": ["python"],
+              "extract_status": "ok"}
+    assert db.slot_ranked_application(JOB_A, 4, run_id, result, conn=conn) == 2
+    assert {s: r[0] for s, r in applications(conn, JOB_A).items()} == {2: 1, 4: 2, 3: 3}
+
+    # re-scoring an already ranked seeker moves it instead of leaving a gap
+    result = dict(result, score=0.1, cosine_score=0.1)
+    assert db.slot_ranked_application(JOB_A, 2, run_id, result, conn=conn) == 3
+    rows = applications(conn, JOB_A)
+    assert {s: r[0] for s, r in rows.items()} == {4: 1, 3: 2, 2: 3}
+    assert rows[2][1] == 0.1 and rows[2][-1] == run_id
@@ -0,0 +1,129 @@
+# tests/test_job_index.py
+import time
+import threading
+
+import numpy as np
+import pytest
+
+from app import job_index as ji
+from app.job_index import JobIndex
+
+JOBS = {
+    1: "python developer django rest api",
+    2: "java backend developer spring",
+    3: "data engineer python spark airflow",
+    4: "frontend developer react typescript",
+    5: "devops engineer kubernetes terraform",
+}
+
+
+@pytest.fixture
+def db(fake_db, monkeypatch):
+    fake_db.jobs.update(JOBS)
+    fake_db.install(ji, "fetch_job_fingerprints", "fetch_jobs_by_id", "borrow_conn")
+    # keep NLTK out of it: texts are already "preprocessed"
+    monkeypatch.setattr(ji, "preprocess_text", lambda text: text)
+    monkeypatch.setattr(ji, "build_skill_artifact", lambda text, top_n=40: text)
+    return fake_db
+
+
+def brute_force(index, jobs, pre, exclude=()):
+    vecs = index._hasher().transform([jobs[j] for j in sorted(jobs)] + [pre])
+    scores = (vecs[:-1] @ vecs[-1].T).toarray().ravel()
+    return {j: s for j, s in zip(sorted(jobs), scores) if j not in exclude}
+
+
+def assert_matches(index, jobs, pre, exclude=()):
+    expected = brute_force(index, jobs, pre, exclude)
+    got = index.shortlist(pre, len(jobs), set(exclude))
+    assert {j for j, _ in got} == set(expected)
+    for job_id, score in got:
+        assert score == pytest.approx(expected[job_id])
+    assert [s for _, s in got] == sorted((s for _, s in got), reverse=True)
+
+
+@pytest.fixture(params=[1, 1024], ids=["merged", "pending"])
+def index(request, monkeypatch):
+    monkeypatch.setattr(ji, "_MERGE_MIN_ROWS", request.param)
+    return JobIndex()
+
+
+def test_build_then_incremental_changes_match_brute_force(index, db):
+    assert index.refresh() == {"added": 5, "updated": 0, "removed": 0}
+    assert_matches(index, db.jobs, "python developer spark")
+
+    db.jobs[2] = "python backend developer fastapi"
+    db.jobs[6] = "machine learning engineer python pytorch"
+    del db.jobs[4]
+    db.fetched.clear()
+    assert index.refresh() == {"added": 1, "updated": 1, "removed": 1}
+    assert sorted(db.fetched) == [2, 6]  # unchanged jobs are not re-read
+    assert_matches(index, db.jobs, "python developer spark")
+    assert_matches(index, db.jobs, "python developer spark", exclude={1, 6})
+    assert index.skill_artifact(2) == db.jobs[2]
+    assert index.skill_artifact(4) is None
+
+
+def test_masked_rows_are_compacted_away(index, db):
+    index.refresh()
+    db.jobs[1] += " remote"
+    index.refresh([1])
+    # 6 rows, 1 dead: below the compaction share, so the stale row is only masked
+    assert index.stats()["rows"] == 6
+    assert_matches(index, db.jobs, "developer engineer remote python")
+    db.jobs[2] += " remote"
+    del db.jobs[3]
+    index.refresh()
+    stats = index.stats()
+    assert stats["jobs"] == stats["rows"] == 4
+    assert stats["pending_rows"] == 0
+    assert np.all(index._live[:stats["rows"]])
+    assert_matches(index, db.jobs, "developer engineer remote python")
+
+
+def test_pending_rows_are_merged_in_batches(db, monkeypatch):
+    monkeypatch.setattr(ji, "_MERGE_MIN_ROWS", 3)
+    index = JobIndex()
+    index.refresh()
+    assert index.stats()["pending_rows"] == 0
+    merged = index._matrix
+    for job_id in (6, 7):
+        db.jobs[job_id] = f"site reliability engineer {job_id}"
+        index.refresh([job_id])
+    # two appended rows are below the merge threshold: the merged matrix is left alone
+    assert index._matrix is merged
+    assert index.stats()["pending_rows"] == 2
+    assert_matches(index, db.jobs, "site reliability engineer python")
+    db.jobs[8] = "site reliability engineer go"
+    index.refresh([8])
+    assert index.stats()["pending_rows"] == 0
+    assert index._matrix.shape[0] == 8
+    assert_matches(index, db.jobs, "site reliability engineer python")
+
+
+def test_stale_index_starts_one_background_refresh(db, monkeypatch):
+    index = JobIndex()
+    index.ensure_fresh()
+    index._refreshed_at = 0.0
+
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_refresh(job_ids, conn):
+        calls.append(job_ids)
+        started.set()
+        release.wait(5)
+        return {}
+
+    monkeypatch.setattr(index, "_refresh", slow_refresh)
+    index.ensure_fresh()
+    assert started.wait(5)
+    index.ensure_fresh()  # the refresh is still running: no second one
+    assert index.stats()["refreshing"]
+    release.set()
+    for _ in range(100):
+        if not index.stats()["refreshing"]:
+            break
+        time.sleep(0.05)
+    assert calls == [None]
+    assert not index.stats()["refreshing"]
@@ -0,0 +1,52 @@
+# tests/test_rank_employer_jobs.py
+import pytest
+
+from app import pipeline
+from app.pipeline import rank_employer_jobs
+
+JOBS = {
+    7: "python developer with django and rest api experience",
+    8: "java backend developer with spring",
+}
+APPLIED = {7: [1, 2, 3], 8: [2, 3, 4]}
+RESUMES = {
+    1: "python django developer rest api",
+    2: "java spring developer",
+    3: "python data engineer",
+    4: "backend java engineer spring boot",
+}
+
+
+@pytest.fixture
+def db(fake_db):
+    fake_db.jobs.update(JOBS)
+    fake_db.resumes.update(RESUMES)
+    fake_db.applied.update(APPLIED)
+    return fake_db.install(pipeline, "fetch_employer_jobs", "fetch_job_applications", "iter_applicant_resumes",
+                           "resolve_resume_texts", "store_texts", "save_rankings", "save_rank_state", "rank_lock")
+
+
+class _Conn:
+    def commit(self):
+        pass
+
+
+def test_ranks_every_job(db):
+    jobs, ranked = rank_employer_jobs(1, conn=_Conn())
+    assert [j["job_id"] for j in jobs] == [7, 8]
+    assert {job_id: sorted(r["job_seeker_id"] for r in rows) for job_id, rows in ranked.items()} == APPLIED
+
+
+def test_seeker_deleted_between_the_two_reads_is_skipped(db, monkeypatch):
+    fetch_applications = db.fetch_job_applications
+
+    def fetch_then_delete(job_ids, conn=None):
+        rows = fetch_applications(job_ids, conn=conn)
+        del db.resumes[2]  # gone before iter_applicant_resumes runs
+        return rows
+
+    monkeypatch.setattr(pipeline, "fetch_job_applications", fetch_then_delete)
+    _, ranked = rank_employer_jobs(1, conn=_Conn())
+    assert sorted(r["job_seeker_id"] for r in ranked[7]) == [1, 3]
+    assert sorted(r["job_seeker_id"] for r in ranked[8]) == [3, 4]
+    assert db.saved is ranked
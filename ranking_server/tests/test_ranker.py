@@ -0,0 +1,60 @@
+# tests/test_ranker.py
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app import ranker
+from app.config import TFIDF_NGRAM
+
+CORPUS = [
+    "python developer django rest api",                       # 0: JD of job A
+    "java engineer spring microservices",                     # 1: JD of job B
+    "python django developer with rest api experience",
+    "senior java developer spring boot microservices",
+    "python data engineer pandas spark",
+    "frontend developer react javascript",
+    "java python developer api",
+    "developer developer developer",
+]
+JOBS = [[0, 2, 4, 5, 6, 7], [1, 3, 6, 7, 2]]
+
+
+def _reference(rows, max_features):
+    vec = TfidfVectorizer(max_features=max_features, ngram_range=TFIDF_NGRAM, min_df=1, max_df=0.85)
+    return vec, vec.fit_transform([CORPUS[r] for r in rows])
+
+
+@pytest.mark.parametrize("max_features", [5000, 7])
+def test_fit_tfidf_matches_sklearn(monkeypatch, max_features):
+    monkeypatch.setattr(ranker, "TFIDF_MAX_FEATURES", max_features)
+    fitted = ranker._fit_tfidf(CORPUS, JOBS)
+    assert len(fitted) == len(JOBS)
+    for rows, (vectorizer, X) in zip(JOBS, fitted):
+        ref, ref_X = _reference(rows, max_features)
+        assert vectorizer.vocabulary_ == ref.vocabulary_
+        np.testing.assert_allclose(vectorizer.idf_, ref.idf_)
+        np.testing.assert_allclose(X.toarray(), ref_X.toarray())
+        new = ["python api developer", "spring java"]
+        np.testing.assert_allclose(vectorizer.transform(new).toarray(), ref.transform(new).toarray())
+
+
+def test_fit_tfidf_degenerate_job_does_not_fail_others():
+    corpus = CORPUS + ["same words", "same words"]
+    fitted = ranker._fit_tfidf(corpus, [JOBS[0], [len(CORPUS), len(CORPUS) + 1]])
+    assert fitted[0][0] is not None
+    assert fitted[1] == (None, None)
+    # where TfidfVectorizer itself gives up
+    with pytest.raises(ValueError, match="no terms remain"):
+        TfidfVectorizer(ngram_range=TFIDF_NGRAM, min_df=1, max_df=0.85).fit(["same words", "same words"])
+
+
+def test_fit_and_score_jobs_zero_scores_for_degenerate_job():
+    resumes = {1: {"resume_name": "a", "extract_status": "ok", "pre": "python django developer"},
+               2: {"resume_name": "b", "extract_status": "ok", "pre": "java spring engineer"},
+               3: {"resume_name": "c", "extract_status": "failed", "pre": ""}}
+    out = ranker.fit_and_score_jobs([(10, "python developer"), (11, "")], resumes, {10: [1, 2], 11: [3]})
+    ranked, model = out[10]
+    assert model is not None and ranked[0]["job_seeker_id"] == 1 and ranked[0]["cosine_score"] > 0
+    ranked, model = out[11]
+    assert model is None
+    assert ranked[0]["cosine_score"] == 0.0 and ranked[0]["score"] == 0.0
@@ -0,0 +1,100 @@
+# tests/test_report_cache.py
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app import adb, report_cache, routes
+
+JOB_ID = 5
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    report_cache.invalidate(JOB_ID)
+    yield
+    report_cache.invalidate(JOB_ID)
+
+
+def test_etag_is_per_fingerprint_and_format():
+    assert report_cache.etag("abc", "html") == '"abc-html"'
+    assert report_cache.etag("abc", "html") != report_cache.etag("abc", "xlsx")
+
+
+@pytest.mark.parametrize("header,matches", [
+    (None, False),
+    ("", False),
+    ('"abc-html"', True),
+    ('W/"abc-html"', True),
+    ('"old-html", "abc-html"', True),
+    ("*", True),
+    ('"abc-xlsx"', False),
+    ("abc-html", False),
+])
+def test_if_none_match(header, matches):
+    assert report_cache.etag_matches(header, '"abc-html"') is matches
+
+
+def test_entries_are_dropped_when_the_fingerprint_moves():
+    report_cache.put(JOB_ID, "html", "v1", b"<html>v1</html>")
+    assert report_cache.get(JOB_ID, "html", "v1") == b"<html>v1</html>"
+    assert report_cache.get(JOB_ID, "html", "v2") is None
+    assert report_cache.get(JOB_ID, "html", "v1") is None  # gone, not just skipped
+
+
+def test_tee_caches_only_complete_bodies():
+    async def body(fail):
+        yield "<html>"
+        if fail:
+            raise ConnectionError("client went away")
+        yield "</html>"
+
+    async def drain(fail):
+        return [piece async for piece in report_cache.tee(JOB_ID, "html", "v1", body(fail))]
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(drain(True))
+    assert report_cache.get(JOB_ID, "html", "v1") is None
+    assert asyncio.run(drain(False)) == ["<html>", "</html>"]
+    assert report_cache.get(JOB_ID, "html", "v1") == b"<html></html>"
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": f"/api/jobs/{JOB_ID}/report",
+                    "query_string": b"", "headers": headers})
+
+
+def _get_report(monkeypatch, if_none_match=None, fingerprint="fp1", download="0"):
+    async def fetch_report_job(job_id):
+        return {"job_title": "Backend", "job_description": "", "job_role": "eng", "ranking_run_id": 1,
+                "ranked_at": None, "fingerprint": fingerprint}
+
+    monkeypatch.setattr(adb, "fetch_report_job", fetch_report_job)
+    return asyncio.run(routes.get_job_report(_request(if_none_match), job_id=JOB_ID, download=download,
+                                             recompute=0))
+
+
+def test_report_304_while_fingerprint_unchanged(monkeypatch):
+    response = _get_report(monkeypatch, if_none_match='"fp1-html"')
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"fp1-html"'
+    assert response.body == b""
+
+
+def test_report_etag_depends_on_format(monkeypatch):
+    response = _get_report(monkeypatch, if_none_match='"fp1-html"', download="xlsx")
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"fp1-xlsx"'
+
+
+def test_report_served_from_cache_until_fingerprint_moves(monkeypatch):
+    report_cache.put(JOB_ID, "html", "fp1", b"<html>cached</html>")
+
+    response = _get_report(monkeypatch, if_none_match='"fp0-html"')
+    assert response.status_code == 200 and response.body == b"<html>cached</html>"
+    assert response.headers["etag"] == '"fp1-html"'
+
+    response = _get_report(monkeypatch, fingerprint="fp2")
+    assert response.headers["etag"] == '"fp2-html"'
+    assert getattr(response, "body", None) != b"<html>cached</html>"  # re-rendered (streamed)
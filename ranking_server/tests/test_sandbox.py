@@ -0,0 +1,109 @@
+# tests/test_sandbox.py
+import os
+import sys
+import time
+
+import pytest
+
+from app.sandbox import SandboxPool, OK, TIMED_OUT, CRASHED
+from app.extractors import (extract_document, extract_text_from_pdf, extract_text_from_docx,
+                            extract_text_from_txt, open_buffer, _extract_isolated,
+                            EXTRACT_OK, EXTRACT_TRUNCATED)
+from app.config import EXTRACT_MAX_PAGES
+from bench.corpus import text_to_pdf, text_to_docx
+
+TIMEOUT = 2.0
+MEMORY_BYTES = 512 * 1024 * 1024
+
+
+# worker targets: module level so the spawned workers can unpickle them
+def _run(item):
+    kind, arg = item
+    if kind == "sleep":
+        time.sleep(arg)
+    elif kind == "exit":
+        os._exit(arg)
+    elif kind == "raise":
+        raise ValueError(arg)
+    elif kind == "alloc":
+        return len(bytearray(arg))
+    return arg
+
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool(_run, workers=2, timeout=TIMEOUT, memory_bytes=MEMORY_BYTES)
+    yield pool
+    pool.shutdown()
+
+
+def test_items_run_in_order(pool):
+    assert pool.map([("echo", i) for i in range(5)]) == [(OK, i) for i in range(5)]
+    assert pool.map([]) == []
+
+
+def test_workers_can_be_started_ahead_of_use(pool):
+    assert pool.start() == 2
+    assert pool.stats()["spawned"] == pool.stats()["idle"] == 2
+    assert pool.map([("echo", 1), ("echo", 2)]) == [(OK, 1), (OK, 2)]
+    assert pool.stats()["spawned"] == 2  # map reused them
+    assert pool.start() == 2
+
+
+def test_slow_item_times_out_and_its_worker_is_replaced(pool):
+    started = time.monotonic()
+    outcomes = pool.map([("echo", 1), ("sleep", 60), ("echo", 2)])
+    assert outcomes == [(OK, 1), (TIMED_OUT, None), (OK, 2)]
+    assert time.monotonic() - started < 30  # killed at the deadline, not left to finish
+    stats = pool.stats()
+    assert stats["timed_out"] == 1 and stats["killed"] == 1
+    assert pool.map([("echo", 3), ("echo", 4)]) == [(OK, 3), (OK, 4)]
+
+
+def test_crashed_worker_is_respawned(pool):
+    outcomes = pool.map([("exit", 3), ("echo", 1), ("raise", "bad file")])
+    assert outcomes[0] == (CRASHED, "worker exited with code 3")
+    assert outcomes[1] == (OK, 1)
+    assert outcomes[2] == (CRASHED, "ValueError: bad file")  # an exception keeps the worker
+    spawned = pool.stats()["spawned"]
+    assert spawned >= 3  # two workers plus the replacement for the one that exited
+    assert pool.map([("echo", 2)]) == [(OK, 2)]
+    assert pool.stats()["crashed"] == 2
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="RLIMIT_AS is only enforced on Linux")
+def test_memory_limit_stops_a_runaway_item(pool):
+    outcomes = pool.map([("alloc", 4 * MEMORY_BYTES), ("alloc", 1024)])
+    assert outcomes == [(CRASHED, "memory limit exceeded"), (OK, 1024)]
+
+
+def test_extraction_in_the_sandbox_reports_caps():
+    pdf = text_to_pdf("\n".join(f"line {i}" for i in range(10 * (EXTRACT_MAX_PAGES + 5))), lines_per_page=10)
+    pool = SandboxPool(_extract_isolated, workers=1, timeout=30.0, memory_bytes=MEMORY_BYTES)
+    try:
+        [(kind, (text, fmt, status))] = pool.map([("r.pdf", pdf)])
+    finally:
+        pool.shutdown()
+    assert kind == OK and fmt == "pdf" and status == EXTRACT_TRUNCATED
+    assert "line 0" in text and f"line {10 * EXTRACT_MAX_PAGES}" not in text
+
+
+def test_pdf_page_cap():
+    pdf = text_to_pdf("\n".join(f"line {i}" for i in range(30)), lines_per_page=10)
+    with open_buffer(memoryview(pdf)) as fp:
+        text, truncated = extract_text_from_pdf("r.pdf", fp, max_pages=2)
+    assert truncated
+    assert "line 19" in text and "line 20" not in text
+    with open_buffer(memoryview(pdf)) as fp:
+        assert extract_text_from_pdf("r.pdf", fp, max_pages=3)[1] is False
+
+
+def test_char_caps():
+    body = "\n".join(f"paragraph {i}" for i in range(100))
+    with open_buffer(memoryview(text_to_docx(body))) as fp:
+        text, truncated = extract_text_from_docx("r.docx", fp, max_chars=50)
+    assert truncated and len(text) == 50 and text.startswith("paragraph 0")
+
+    text, truncated = extract_text_from_txt("r.txt", memoryview(("é" * 100).encode()), max_chars=10)
+    assert (text, truncated) == ("é" * 10, True)
+    assert extract_document("r.txt", body.encode()) == (body, "txt", EXTRACT_OK)
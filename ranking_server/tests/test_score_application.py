@@ -0,0 +1,137 @@
+# tests/test_score_application.py
+import io
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app import pipeline
+from app.pipeline import RefitRequired, score_application
+from app.ranker import fit_and_score_preprocessed
+
+JOB_ID = 7
+JD = "python developer with django and rest api experience"
+RESUMES = {
+    1: "python django developer rest api",
+    2: "java spring developer",
+    3: "python data engineer",
+    4: "frontend react developer",
+    5: "django python api engineer",
+    6: "devops engineer kubernetes",
+    7: "python rest api developer",
+}
+
+
+def installed(db, applied):
+    db.jobs[JOB_ID] = JD
+    db.resumes.update(RESUMES)
+    db.applied[JOB_ID] = list(applied)
+    return db.install(pipeline, "fetch_job_and_application", "load_rank_state", "save_rank_state",
+                      "count_rank_state_addition", "slot_ranked_application", "resolve_resume_texts", "rank_lock")
+
+
+def fit(db, seeker_ids):
+    docs = [{"job_seeker_id": s, "resume_name": f"r{s}.pdf", "extract_status": "ok",
+             "pre": pipeline.preprocess_text(RESUMES[s])} for s in seeker_ids]
+    ranked, model = fit_and_score_preprocessed(JD, docs)
+    db.ranks = {r["job_seeker_id"]: i + 1 for i, r in enumerate(ranked)}
+    with db.rank_lock("conn", [JOB_ID]):  # as rank_job saves it
+        pipeline._save_model(JOB_ID, 99, JD, model, conn="conn")
+    return ranked
+
+
+def stored_model(db):
+    return pipeline._load_model(db.state_row["state"], db.state_row["fitted_count"])["model"]
+
+
+def test_rescoring_a_ranked_application_matches_the_full_fit(fake_db):
+    db = installed(fake_db, [1, 2, 3, 4, 5])
+    ranked = fit(db, [1, 2, 3, 4, 5])
+    state = db.state_row["state"]
+
+    job, result = score_application(JOB_ID, 1, conn="conn")
+
+    full = next(r for r in ranked if r["job_seeker_id"] == 1)
+    assert result["mode"] == "incremental" and result["rank"] == 1
+    assert result["cosine_score"] == pytest.approx(full["cosine_score"])
+    assert result["score"] == pytest.approx(full["score"])
+    assert result["matched_skills"] == full["matched_skills"]
+    assert db.slotted[0][:2] == (1, 99)
+    # the seeker was in the fit: nothing counts as added and the stored state is not rewritten
+    assert db.state_row["added_since_fit"] == 0 and db.state_row["fitted_count"] == 5
+    assert db.state_writes == 1 and db.state_row["state"] is state
+
+
+def test_new_application_only_bumps_the_counter(fake_db):
+    db = installed(fake_db, [1, 2, 3, 4, 5, 6])
+    fit(db, [1, 2, 3, 4, 5])
+    state = db.state_row["state"]
+
+    _, result = score_application(JOB_ID, 6, conn="conn")
+
+    assert result["mode"] == "incremental" and result["job_seeker_id"] == 6
+    model = stored_model(db)
+    expected = cosine_similarity(model.jd_vec, model.vectorizer.transform([pipeline.preprocess_text(RESUMES[6])]))
+    assert result["cosine_score"] == pytest.approx(expected[0, 0])
+    assert db.state_row["added_since_fit"] == 1 and db.state_row["fitted_count"] == 5
+    assert db.state_writes == 1 and db.state_row["state"] is state
+
+
+def test_state_round_trips_without_pickle(fake_db):
+    db = installed(fake_db, [1, 2, 3, 4, 5])
+    fit(db, [1, 2, 3, 4, 5])
+    docs = [{"job_seeker_id": s, "pre": pipeline.preprocess_text(RESUMES[s])} for s in [1, 2, 3, 4, 5]]
+    _, fitted = fit_and_score_preprocessed(JD, docs)
+
+    with np.load(io.BytesIO(db.state_row["state"]), allow_pickle=False) as f:
+        assert all(f[name].dtype != object for name in f.files)
+    model = stored_model(db)
+    assert model.vectorizer.vocabulary_ == fitted.vectorizer.vocabulary_
+    np.testing.assert_array_equal(model.vectorizer.idf_, fitted.vectorizer.idf_)
+    np.testing.assert_allclose(model.jd_vec.toarray(), fitted.jd_vec.toarray())
+    probe = [pipeline.preprocess_text(RESUMES[6])]
+    np.testing.assert_allclose(model.vectorizer.transform(probe).toarray(), fitted.vectorizer.transform(probe).toarray())
+
+
+def test_pickled_state_is_not_loaded(fake_db):
+    db = installed(fake_db, [1, 2, 3, 4, 5])
+    fit(db, [1, 2, 3, 4, 5])
+    db.state_row["state"] = pickle.dumps({"jd_hash": pipeline._jd_hash(JD), "model": None})
+    with pytest.raises(RefitRequired, match="no ranking state"):
+        score_application(JOB_ID, 1, conn="conn")
+
+
+def test_not_applied(fake_db):
+    db = installed(fake_db, [1])
+    fit(db, [1])
+    job, result = score_application(JOB_ID, 6, conn="conn")
+    assert job is not None and result is None and db.slotted == []
+
+
+def test_refit_without_state(fake_db):
+    db = installed(fake_db, [1])
+    with pytest.raises(RefitRequired):
+        score_application(JOB_ID, 1, conn="conn")
+    assert db.locked == []  # released on the way out
+
+
+def test_refit_when_the_jd_changed(fake_db):
+    db = installed(fake_db, [1, 2, 3, 4, 5])
+    fit(db, [1, 2, 3, 4, 5])
+    db.jobs[JOB_ID] = JD + " and kubernetes"
+    with pytest.raises(RefitRequired, match="job description"):
+        score_application(JOB_ID, 1, conn="conn")
+
+
+def test_refit_once_drift_exceeds_the_ratio(fake_db, monkeypatch):
+    monkeypatch.setattr(pipeline, "INCREMENTAL_REFIT_RATIO", 0.2)
+    db = installed(fake_db, [1, 2, 3, 4, 5, 6, 7])
+    fit(db, [1, 2, 3, 4, 5])
+    score_application(JOB_ID, 6, conn="conn")  # new: (0 + 1) / 5 = 0.2, still incremental
+    # re-scores add nothing to the corpus: 1 / 5 = 0.2 for a fitted seeker and for the slotted one
+    assert score_application(JOB_ID, 1, conn="conn")[1]["mode"] == "incremental"
+    assert score_application(JOB_ID, 6, conn="conn")[1]["mode"] == "incremental"
+    assert db.state_row["added_since_fit"] == 1
+    with pytest.raises(RefitRequired, match="corpus"):
+        score_application(JOB_ID, 7, conn="conn")  # new: (1 + 1) / 5 = 0.4
@@ -0,0 +1,38 @@
+# tests/test_skills.py
+import pytest
+
+from app import skills
+from app.preprocess import match_skills_preprocessed
+from app.skills import SkillMatcher
+
+SKILLS = ["Python", "java", "JavaScript", "machine learning", "c++", "rest api", "  ", "SQL", "sql",
+          "node.js", "react native", "go"]
+TEXTS = [
+    "",
+    "python developer with javascript and java experience",
+    "machine learning engineer working on learning machine",
+    "c rest api design node js react native mobile",
+    "mysql postgres sql tuning go lang golang",
+    "reactive native apps",
+]
+
+
+@pytest.fixture(params=["automaton", "substring"])
+def matcher_mode(request, monkeypatch):
+    if request.param == "automaton":
+        pytest.importorskip("ahocorasick")
+    else:
+        monkeypatch.setattr(skills, "ahocorasick", None)
+    return request.param
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_skill_matcher_matches_regex_matcher(matcher_mode, text):
+    matcher = SkillMatcher(SKILLS)
+    assert (matcher._automaton is not None) == (matcher_mode == "automaton")
+    assert matcher.match(text) == match_skills_preprocessed(SKILLS, text)
+
+
+def test_skill_matcher_without_skills():
+    assert SkillMatcher([]).match("python") == []
+    assert SkillMatcher(["", " "]).match("python") == []
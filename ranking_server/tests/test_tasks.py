@@ -0,0 +1,146 @@
+# tests/test_tasks.py
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+
+from app import tasks, routes
+from app.tasks import RankTaskManager
+
+
+def _blocking_rank_job(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def rank_job(job_id, conn=None, progress=None):
+        calls.append(job_id)
+        release.wait(5)
+        return {"job_id": job_id}, None
+
+    @contextmanager
+    def db_conn():
+        yield "conn"
+
+    monkeypatch.setattr(tasks, "rank_job", rank_job)
+    monkeypatch.setattr(tasks, "db_conn", db_conn)
+    return release, calls
+
+
+def test_requests_coalesce_per_job(monkeypatch):
+    release, calls = _blocking_rank_job(monkeypatch)
+    manager = RankTaskManager(workers=2, queue_depth=2)
+    try:
+        first, coalesced = manager.submit(7)
+        assert not coalesced
+        other, coalesced = manager.submit(8)
+        assert not coalesced and other is not first
+        again, coalesced = manager.submit(7, background=True)
+        assert coalesced and again is first and first.keep
+        assert manager.stats()["active"] == 2
+
+        release.set()
+        first.future.result(5)
+        other.future.result(5)
+        assert first.status == other.status == "done"
+        assert sorted(calls) == [7, 8]
+        assert manager.stats()["active"] == 0
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_employer_batch_shares_tasks_with_single_jobs(monkeypatch):
+    release, calls = _blocking_rank_job(monkeypatch)
+    batches = []
+
+    def rank_employer_jobs(employer_id, job_ids, conn=None, progress=None):
+        batches.append(list(job_ids))
+        release.wait(5)
+        # job 9 was deleted after the batch was submitted
+        return [{"job_id": j} for j in job_ids if j != 9], {}
+
+    monkeypatch.setattr(tasks, "rank_employer_jobs", rank_employer_jobs)
+    manager = RankTaskManager(workers=2, queue_depth=2)
+    try:
+        single, _ = manager.submit(7)
+        batch, by_job = manager.submit_employer(1, [7, 8, 9])
+        # job 7 is already being ranked: the batch leaves it to that task
+        assert by_job == {7: single, 8: batch, 9: batch}
+        assert batch.job_ids == [8, 9]
+        # a single-job request for a job in the batch waits for the batch
+        joined, coalesced = manager.submit(8)
+        assert coalesced and joined is batch
+        assert manager.stats()["active"] == 2
+        none, by_job = manager.submit_employer(1, [7, 8])
+        assert none is None and by_job == {7: single, 8: batch}
+
+        release.set()
+        single.future.result(5)
+        batch.future.result(5)
+        assert calls == [7] and batches == [[8, 9]]
+        assert batch.status == "done"
+        assert batch.result_for(8)["job_id"] == 8
+        assert batch.result_for(9) is None
+        assert single.result_for(7) == single.result
+        assert manager.stats()["active"] == 0
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_cancelled_batch_frees_every_job(monkeypatch):
+    release, _ = _blocking_rank_job(monkeypatch)
+    monkeypatch.setattr(tasks, "rank_employer_jobs", lambda *a, **kw: (release.wait(5), ({}, {}))[1])
+    manager = RankTaskManager(workers=1, queue_depth=2)
+    try:
+        blocker, _ = manager.submit(1)
+        batch, _ = manager.submit_employer(1, [7, 8])
+        manager.attach(batch)
+        manager.detach(batch)  # its only waiter went away before it started
+        assert batch.cancelled
+        again, coalesced = manager.submit(8)
+        assert not coalesced and again is not batch
+        release.set()
+        batch.future.result(5)
+        assert batch.status == "cancelled"
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def test_employer_request_keeps_a_shared_task_alive(monkeypatch):
+    release, calls = _blocking_rank_job(monkeypatch)
+    monkeypatch.setattr(tasks, "rank_employer_jobs",
+                        lambda employer_id, job_ids, conn=None, progress=None:
+                        (release.wait(5), ([{"job_id": j} for j in job_ids], {}))[1])
+    manager = RankTaskManager(workers=2, queue_depth=2)
+    monkeypatch.setattr(routes, "rank_tasks", manager)
+
+    async def fetch_employer_job_ids(employer_id, job_ids=None):
+        return [7, 8]
+
+    monkeypatch.setattr(routes.adb, "fetch_employer_job_ids", fetch_employer_job_ids)
+
+    async def scenario():
+        single, _ = manager.submit(7)
+        manager.attach(single)
+        employer = asyncio.ensure_future(routes.rank_employer(_ConnectedRequest(), employer_id=1, job_ids=None))
+        await asyncio.sleep(0)  # the employer request submits its batch and starts waiting
+        manager.detach(single)  # the single-job client disconnects
+        assert not single.cancelled  # the employer request still waits for job 7
+        release.set()
+        return await employer
+
+    try:
+        response = asyncio.run(scenario())
+        assert response.status_code == 200
+        assert sorted(job["job_id"] for job in json.loads(response.body)["jobs"]) == [7, 8]
+        assert calls == [7]
+    finally:
+        release.set()
+        manager.shutdown()
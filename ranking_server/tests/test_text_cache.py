@@ -0,0 +1,102 @@
+# tests/test_text_cache.py
+from contextlib import contextmanager
+
+import pytest
+from psycopg2.pool import PoolError
+
+from app import text_cache
+from app.extractors import CACHEABLE_OUTCOMES
+
+# extraction outcome per resume blob
+OUTCOMES = {
+    b"ok": ("ok text", "ok"),
+    b"big": ("truncated text", "truncated"),
+    b"img": ("", "unsupported"),
+    b"slow": ("", "timed_out"),
+    b"bad": ("", "failed"),
+}
+
+
+def _row(jsid, data=None, resume_hash=None, cached_text=None, cached_status=None):
+    return {"job_seeker_id": jsid, "resume_name": f"r{jsid}.pdf", "resume_data": data,
+            "resume_hash": resume_hash, "cached_text": cached_text, "cached_status": cached_status}
+
+
+@pytest.fixture
+def extracted(monkeypatch):
+    calls = []
+
+    def extract_batch(items):
+        calls.append([data for _, data in items])
+        return [OUTCOMES[data] for _, data in items]
+
+    monkeypatch.setattr(text_cache, "extract_batch", extract_batch)
+    return calls
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    entries = []
+    monkeypatch.setattr(text_cache, "store_cached_texts", lambda e, conn=None: entries.extend(e))
+    return entries
+
+
+def test_cached_rows_keep_their_status_and_skip_extraction(extracted, stored):
+    rows = [_row(1, None, "h1", cached_text="cut", cached_status="truncated"),
+            _row(2, None, "h2", cached_text="", cached_status="unsupported"),
+            _row(3, None, "h3", cached_text="legacy", cached_status=None)]
+    texts = text_cache.resolve_resume_texts(rows)
+
+    assert [(r["text"], r["extract_status"]) for r in texts] == [("cut", "truncated"), ("", "unsupported"),
+                                                                ("legacy", "ok")]
+    assert extracted == [] and stored == []
+
+
+def test_shared_resume_is_extracted_once(extracted, stored):
+    rows = [_row(1, b"ok", "same"), _row(2, b"ok", "same"), _row(3, b"bad")]
+    texts = text_cache.resolve_resume_texts(rows)
+
+    assert extracted == [[b"ok", b"bad"]]
+    assert [r["extract_status"] for r in texts] == ["ok", "ok", "failed"]
+    assert stored == [("same", "ok text", "ok")]  # unhashed rows are never cached
+
+
+def test_only_cacheable_outcomes_are_stored(extracted, stored):
+    rows = [_row(i, data, f"h{i}") for i, data in enumerate(OUTCOMES)]
+    texts = text_cache.resolve_resume_texts(rows)
+
+    assert [(r["text"], r["extract_status"]) for r in texts] == list(OUTCOMES.values())
+    assert sorted(status for _, _, status in stored) == sorted(CACHEABLE_OUTCOMES)
+    assert {h for h, _, status in stored} == {"h0", "h1", "h2"}
+    assert all(r["resume_data"] is None for r in rows)
+
+
+def test_cursor_callers_write_back_on_a_spare_connection(monkeypatch, extracted, stored):
+    conns = []
+
+    @contextmanager
+    def db_conn(timeout=None):
+        assert timeout == 0
+        conns.append(object())
+        yield conns[-1]
+
+    monkeypatch.setattr(text_cache, "db_conn", db_conn)
+    to_store = []
+    text_cache.resolve_resume_texts([_row(1, b"ok", "h1"), _row(2, b"slow", "h2")], conn="cursor-conn",
+                                    to_store=to_store)
+    assert stored == [("h1", "ok text", "ok")] and len(conns) == 1
+    assert to_store == []
+
+
+def test_cursor_callers_defer_when_no_connection_is_free(monkeypatch, extracted, stored):
+    @contextmanager
+    def db_conn(timeout=None):
+        raise PoolError("no database connection free")
+        yield
+
+    monkeypatch.setattr(text_cache, "db_conn", db_conn)
+    to_store = []
+    text_cache.resolve_resume_texts([_row(1, b"big", "h1"), _row(2, b"bad", "h2")], to_store=to_store)
+    assert stored == []
+    assert to_store == [("h1", "truncated text", "truncated")]
+
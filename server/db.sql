@@ -33,6 +33,54 @@ CREATE TABLE job_description (
 CREATE TABLE job_applied (
     id SERIAL PRIMARY KEY,
     job_id INTEGER REFERENCES job_description(job_id),
-    job_seeker_id INTEGER REFERENCES job_seeker(job_seeker_id)
+    job_seeker_id INTEGER REFERENCES job_seeker(job_seeker_id),
     rank INTEGER DEFAULT 0
-);
\ No newline at end of file
+);
+
+-- Extracted resume text keyed by sha256 of resume_data (maintained by the ranking server)
+CREATE TABLE resume_text_cache (
+    content_hash CHAR(64) NOT NULL,
+    extractor_version VARCHAR(32) NOT NULL,
+    text TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (content_hash, extractor_version)
+);
+
+-- One row per ranking run; job_applied rows point at the run that scored them
+CREATE TABLE ranking_run (
+    run_id SERIAL PRIMARY KEY,
+    job_id INTEGER REFERENCES job_description(job_id),
+    applicant_count INTEGER,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+ALTER TABLE job_applied
+    ADD COLUMN score DOUBLE PRECISION,
+    ADD COLUMN cosine_score DOUBLE PRECISION,
+    ADD COLUMN skill_ratio DOUBLE PRECISION,
+    ADD COLUMN matched_skills TEXT[],
+    ADD COLUMN ranking_run_id INTEGER REFERENCES ranking_run(run_id),
+    ADD COLUMN ranked_at TIMESTAMP;
+
+CREATE INDEX job_applied_job_rank_idx ON job_applied (job_id, rank);
+CREATE INDEX ranking_run_job_idx ON ranking_run (job_id, run_id DESC);
+
+-- Fitted TF-IDF state per job (terms, IDF and the JD vector) for incremental scoring
+CREATE TABLE job_rank_state (
+    job_id INTEGER PRIMARY KEY REFERENCES job_description(job_id),
+    ranking_run_id INTEGER REFERENCES ranking_run(run_id),
+    state BYTEA NOT NULL,
+    fitted_count INTEGER NOT NULL,
+    added_since_fit INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Outcome of resume extraction (ok, truncated, timed_out, unsupported, failed), cached with the
+-- text and copied onto the application by each ranking
+ALTER TABLE resume_text_cache ADD COLUMN extract_status VARCHAR(16) NOT NULL DEFAULT 'ok';
+ALTER TABLE job_applied ADD COLUMN extract_status VARCHAR(16);
+
+-- sha256 of resume_data, kept by Postgres whenever the resume is written, so the ranking server
+-- looks up resume_text_cache without hashing every blob on every fetch
+ALTER TABLE job_seeker
+    ADD COLUMN resume_hash CHAR(64) GENERATED ALWAYS AS (encode(sha256(resume_data), 'hex')) STORED;